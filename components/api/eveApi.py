@@ -26,6 +26,12 @@ import json
 
 import importlib
 
+# MessagePack is optional, snapshots and batches are returned as JSON otherwise
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
 
 # FIXME: We need to remove this
 from components.ctrl.auction.btsAuctionCtrl import BtsAuctionCtrl
@@ -271,6 +277,53 @@ class EveApi:
 			self.host.cmdQueue.put(dict(call))
 			return json.dumps("success")
 
+# Batches and snapshots, to handle many operations with a single request
+		# Executes a list of operations at once, see Core.executeBatch() for the format
+		@self.app.route('/batch', methods=['POST'])
+		def batch():
+			ops = self.decodeRequest()
+			return self.encodeResponse(self.host.executeBatch(ops))
+
+		# Same, but synchronized to the simulation as a single command
+		@self.app.route('/syncbatch', methods=['POST'])
+		def syncbatch():
+			ops = self.decodeRequest()
+			self.host.cmdQueue.put({'cmd': 'batch', 'ops': list(ops)})
+			return json.dumps("success")
+
+		# Variables of many entities: {"entities": [...], "vars": [...], "since": version}
+		# Omitting the entities selects all entities, with since only the values changed after that version are returned
+		# The query parameters entities=a,b&vars=x,y&since=3 can be used as well
+		@self.app.route('/snapshot', methods=['GET', 'POST'])
+		def snapshot():
+			if request.method == 'POST':
+				params = self.decodeRequest()
+			else:
+				params = {}
+				if 'entities' in request.args:
+					params['entities'] = request.args['entities'].split(',')
+				params['vars'] = request.args.get('vars', '').split(',')
+				if 'since' in request.args:
+					params['since'] = int(request.args['since'])
+
+			result = self.host.getSnapshot(params.get('entities', None), params.get('vars', []), params.get('since', None))
+			return self.encodeResponse(result)
+
+		# Server-Sent Events feed of state changes, e.g. /feed?patterns=pv*/consumption,*/soc&interval=0.5
+		@self.app.route('/feed')
+		def feed():
+			stateFeed = self.host.getStateFeed()
+			sub = stateFeed.subscribe(request.args.get('patterns', '*/*'), float(request.args.get('interval', 0.5)), int(request.args.get('buffer', 1000)))
+
+			def generate():
+				try:
+					for chunk in stateFeed.stream(sub):
+						yield chunk
+				finally:
+					sub.close()
+
+			return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 		# Raw send commands with in-order-execution
 		@self.app.route('/synccmds', methods=['POST'])
 		def synccmds():
@@ -278,4 +331,14 @@ class EveApi:
 			for e in list:
 				call = dict(e)
 				self.host.cmdQueue.put(dict(call))
-			return json.dumps("success")
\ No newline at end of file
+			return json.dumps("success")
+
+	def decodeRequest(self):
+		if msgpack is not None and request.mimetype == 'application/msgpack':
+			return msgpack.unpackb(request.get_data(), raw=False)
+		return json.loads(request.data.decode("utf-8"))
+
+	def encodeResponse(self, data):
+		if msgpack is not None and request.accept_mimetypes.best == 'application/msgpack':
+			return Response(msgpack.packb(data, use_bin_type=True), mimetype='application/msgpack')
+		return Response(json.dumps(data), mimetype='application/json')
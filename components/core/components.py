@@ -12,69 +12,87 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from dev.loadDev import LoadDev				# Static load device model
-from dev.curtDev import CurtDev				# Also a static load, but one that van be turned off (curtailed/shed)
-from dev.btsDev import BtsDev				# BufferTimeShiftable Device, used for electric vehicles
-from dev.tsDev import TsDev					# Timeshiftable Device, used for whitegoods
-from dev.bufDev import BufDev				# Buffer device, used for storage, such as batteries
-from dev.bufConvDev import BufConvDev		# BufferConverter device, used for heatpumps with heat store
-
-from dev.electricity.solarPanelDev import SolarPanelDev			# Solar panel
-from dev.thermal.solarCollectorDev import SolarCollectorDev 	# solar collector
-
-# Thermal Devices
-from dev.thermal.zoneDev2R2C import ZoneDev2R2C
-from dev.thermal.zoneDev1R1C import ZoneDev1R1C
-from dev.thermal.heatSourceDev import HeatSourceDev
-from dev.thermal.thermalBufConvDev import ThermalBufConvDev
-from dev.thermal.heatPumpDev import HeatPumpDev
-from dev.thermal.combinedHeatPowerDev import CombinedHeatPowerDev
-from dev.thermal.gasBoilerDev import GasBoilerDev
-from dev.thermal.dhwDev import DhwDev
-from ctrl.thermal.thermostat import Thermostat
-
-
-# Environment
-from environment.sunEnv import SunEnv
-from environment.weatherEnv import WeatherEnv
-
-from dev.meterDev import MeterDev			# Meter device that aggregates the load of all individual devices
-
-
-# Controllers
-from ctrl.congestionPoint import CongestionPoint	# Import a congestion point
-from ctrl.loadCtrl import LoadCtrl			# Static load controller for predictions
-from ctrl.curtCtrl import CurtCtrl			# Static Curtailable load controller for predictions
-from ctrl.btsCtrl import BtsCtrl    		# BufferTimeShiftable Controller
-from ctrl.tsCtrl import TsCtrl				# Timeshiftable controller
-from ctrl.bufCtrl import BufCtrl			# Buffer controller
-from ctrl.bufConvCtrl import BufConvCtrl 	# BufferConverter
-
-from ctrl.groupCtrl import GroupCtrl		# Group controller to control multiple devices, implements Profile Steering
-
-from ctrl.thermal.thermalBufConvCtrl import ThermalBufConvCtrl
-
-from ctrl.auction.btsAuctionCtrl import BtsAuctionCtrl
-from ctrl.auction.tsAuctionCtrl import TsAuctionCtrl
-from ctrl.auction.bufAuctionCtrl import BufAuctionCtrl
-from ctrl.auction.bufConvAuctionCtrl import BufConvAuctionCtrl
-from ctrl.auction.loadAuctionCtrl import LoadAuctionCtrl
-from ctrl.auction.curtAuctionCtrl import CurtAuctionCtrl
-from ctrl.auction.aggregatorCtrl import AggregatorCtrl
-from ctrl.auction.auctioneerCtrl import AuctioneerCtrl
-from ctrl.auction.thermal.thermalBufConvAuctionCtrl import ThermalBufConvAuctionCtrl
-
-# Planned Auction controllers, follows same reasoning
-from ctrl.plannedAuction.paBtsCtrl import PaBtsCtrl
-from ctrl.plannedAuction.paLoadCtrl import PaLoadCtrl
-from ctrl.plannedAuction.paCurtCtrl import PaCurtCtrl
-from ctrl.plannedAuction.paBufCtrl import PaBufCtrl
-from ctrl.plannedAuction.paBufConvCtrl import PaBufConvCtrl
-from ctrl.plannedAuction.paTsCtrl import PaTsCtrl
-from ctrl.plannedAuction.paGroupCtrl import PaGroupCtrl
-from ctrl.plannedAuction.thermal.thermalPaBufConvCtrl import ThermalPaBufConvCtrl
-
-# Import physical network
-from flow.el.lvNode import LvNode
-from flow.el.lvCable import LvCable
-from flow.el.elLoadFlow import ElLoadFlow
\ No newline at end of file
+# Components are imported lazily on first access, e.g. core.components.LoadDev or getattr(core.components, "LoadDev"),
+# such that a model only pays for the (heavy) dependencies of the components it actually uses.
+
+import importlib
+
+components = {
+	'LoadDev': 'dev.loadDev',	# Static load device model
+	'CurtDev': 'dev.curtDev',	# Also a static load, but one that van be turned off (curtailed/shed)
+	'BtsDev': 'dev.btsDev',	# BufferTimeShiftable Device, used for electric vehicles
+	'TsDev': 'dev.tsDev',	# Timeshiftable Device, used for whitegoods
+	'BufDev': 'dev.bufDev',	# Buffer device, used for storage, such as batteries
+	'BufConvDev': 'dev.bufConvDev',	# BufferConverter device, used for heatpumps with heat store
+
+	'SolarPanelDev': 'dev.electricity.solarPanelDev',	# Solar panel
+	'SolarCollectorDev': 'dev.thermal.solarCollectorDev',	# solar collector
+
+	# Thermal Devices
+	'ZoneDev2R2C': 'dev.thermal.zoneDev2R2C',
+	'ZoneDev1R1C': 'dev.thermal.zoneDev1R1C',
+	'ZoneSimulator': 'dev.thermal.zoneSimulator',
+	'HeatSourceDev': 'dev.thermal.heatSourceDev',
+	'ThermalBufConvDev': 'dev.thermal.thermalBufConvDev',
+	'HeatPumpDev': 'dev.thermal.heatPumpDev',
+	'CombinedHeatPowerDev': 'dev.thermal.combinedHeatPowerDev',
+	'GasBoilerDev': 'dev.thermal.gasBoilerDev',
+	'DhwDev': 'dev.thermal.dhwDev',
+	'Thermostat': 'ctrl.thermal.thermostat',
+
+
+	# Environment
+	'SunEnv': 'environment.sunEnv',
+	'WeatherEnv': 'environment.weatherEnv',
+
+	'MeterDev': 'dev.meterDev',	# Meter device that aggregates the load of all individual devices
+
+
+	# Controllers
+	'CongestionPoint': 'ctrl.congestionPoint',	# Import a congestion point
+	'LoadCtrl': 'ctrl.loadCtrl',	# Static load controller for predictions
+	'CurtCtrl': 'ctrl.curtCtrl',	# Static Curtailable load controller for predictions
+	'BtsCtrl': 'ctrl.btsCtrl',	# BufferTimeShiftable Controller
+	'TsCtrl': 'ctrl.tsCtrl',	# Timeshiftable controller
+	'BufCtrl': 'ctrl.bufCtrl',	# Buffer controller
+	'BufConvCtrl': 'ctrl.bufConvCtrl',	# BufferConverter
+
+	'GroupCtrl': 'ctrl.groupCtrl',	# Group controller to control multiple devices, implements Profile Steering
+
+	'ThermalBufConvCtrl': 'ctrl.thermal.thermalBufConvCtrl',
+
+	'BtsAuctionCtrl': 'ctrl.auction.btsAuctionCtrl',
+	'TsAuctionCtrl': 'ctrl.auction.tsAuctionCtrl',
+	'BufAuctionCtrl': 'ctrl.auction.bufAuctionCtrl',
+	'BufConvAuctionCtrl': 'ctrl.auction.bufConvAuctionCtrl',
+	'LoadAuctionCtrl': 'ctrl.auction.loadAuctionCtrl',
+	'CurtAuctionCtrl': 'ctrl.auction.curtAuctionCtrl',
+	'AggregatorCtrl': 'ctrl.auction.aggregatorCtrl',
+	'AuctioneerCtrl': 'ctrl.auction.auctioneerCtrl',
+	'ThermalBufConvAuctionCtrl': 'ctrl.auction.thermal.thermalBufConvAuctionCtrl',
+
+	# Planned Auction controllers, follows same reasoning
+	'PaBtsCtrl': 'ctrl.plannedAuction.paBtsCtrl',
+	'PaLoadCtrl': 'ctrl.plannedAuction.paLoadCtrl',
+	'PaCurtCtrl': 'ctrl.plannedAuction.paCurtCtrl',
+	'PaBufCtrl': 'ctrl.plannedAuction.paBufCtrl',
+	'PaBufConvCtrl': 'ctrl.plannedAuction.paBufConvCtrl',
+	'PaTsCtrl': 'ctrl.plannedAuction.paTsCtrl',
+	'PaGroupCtrl': 'ctrl.plannedAuction.paGroupCtrl',
+	'ThermalPaBufConvCtrl': 'ctrl.plannedAuction.thermal.thermalPaBufConvCtrl',
+
+	# Import physical network
+	'LvNode': 'flow.el.lvNode',
+	'LvCable': 'flow.el.lvCable',
+	'ElLoadFlow': 'flow.el.elLoadFlow',
+}
+
+def __getattr__(name):
+	if name in components:
+		cls = getattr(importlib.import_module(components[name]), name)
+		globals()[name] = cls	# Next time the lookup is a plain attribute
+		return cls
+	raise AttributeError("module " + __name__ + " has no attribute " + name)
+
+def __dir__():
+	return sorted(list(globals().keys()) + list(components.keys()))
@@ -14,10 +14,11 @@
 
 from usrconf import demCfg
 
-from core.components import *
+import core.components
 
 from database.influxDB import InfluxDB
 import util.helpers
+from util.deviceState import DeviceStateStore
 
 import threading
 import time
@@ -33,6 +34,7 @@ class Core:
 
 		#should contain a list with all devices, controllers etc to distribute ticks
 		self.entities = []
+		self.entityIndex = {}	# name -> entity, for fast lookups by the API
 		self.devices = []
 		self.controllers = []
 		self.meters = []
@@ -69,10 +71,20 @@ class Core:
 		self.useThreads = False	# By default we use the state of the host
 		self.maxThreads = 100
 
+		# Worker processes for parallel planning of sibling subtrees, see util/planWorkers.py
+		self.planningWorkers = None			# Number of worker processes, None: number of CPUs. Does not influence the results
+		self.planningWorkerTimeout = 600	# Seconds
+		self.planWorkers = None
+
 		# Named locks allow the dynamic creation of locks for single access blocks.
 		self.namedLocks = {}
 		self.accessNamedLock = threading.Lock()
 
+		# Keep the state of all devices in a compact array based store, see util/deviceState.py
+		# Must be set before the devices are created
+		self.compactDeviceState = False
+		self.deviceState = None
+
 		# Threads bookkeeping
 		self.activeThreads = []
 
@@ -84,6 +96,11 @@ class Core:
 		self.cmdQueue = Queue()
 		self.syncMode = True # Run external commands in synchronized manner
 
+		# Snapshots of variables for the API, with the version in which each value last changed
+		self.snapshotVersion = 0
+		self.snapshotState = {}
+		self.snapshotLock = threading.Lock()
+
 		self.quitOnError = True
 
 		# For DB loging
@@ -218,6 +235,10 @@ class Core:
 		if name == "host":
 			result = self
 
+		e = self.entityIndex.get(name, None)
+		if e is not None and e.name == name:
+			return e
+
 		for e in self.entities:
 			if e.name == name:
 				result = e
@@ -345,10 +366,16 @@ class Core:
 			except:
 				self.logWarning("Could not parse arguments for object: "+obj)
 
+			# Components are imported on demand
+			if obj in core.components.components:
+				cls = getattr(core.components, obj)
+			else:
+				cls = eval(obj)
+
 			if len(params) == 0:
-				instance = eval(obj)()
+				instance = cls()
 			else:
-				instance = eval(obj)(*params)
+				instance = cls(*params)
 
 			# instance.startup()
 			return instance
@@ -394,6 +421,104 @@ class Core:
 			self.logWarning("Could not remove object: "+obj)
 			return False
 
+# Batches of operations and snapshots, to serve many requests of the API at once
+	# Each operation is a dict with an 'op' (get, set, setObj, call), the 'entity' and the 'var', 'val', 'func' and 'args'
+	# Returns a list with a dict {'ok': bool, 'result': value} per operation, in order of execution
+	def executeBatch(self, ops):
+		results = []
+		for r in ops:
+			try:
+				op = r['op']
+				entity = r['entity']
+
+				if op == "get":
+					result = self.getVar(entity, r['var'])
+					ok = result is not None
+				elif op == "set":
+					result = self.setVar(entity, r['var'], r['val'])
+					ok = result
+				elif op == "setObj":
+					result = self.setObj(entity, r['var'], r['val'])
+					ok = result
+				elif op == "call":
+					args = r.get('args', None)
+					if args is None:
+						result = self.callFunction(entity, r['func'])
+					elif isinstance(args, dict):
+						result = self.callFunction2(entity, r['func'], args)
+					else:
+						result = self.callFunction(entity, r['func'], *args)
+					ok = True
+				else:
+					self.logWarning("Unknown batch operation: " + str(op))
+					result = None
+					ok = False
+
+				results.append({'ok': ok, 'result': self.jsonValue(result)})
+			except Exception as e:
+				results.append({'ok': False, 'result': str(e)})
+
+		return results
+
+	# Returns the variables of the given entities (all if None), together with the current version
+	# If since is given, only the values that changed after that version are returned
+	def getSnapshot(self, entities, variables, since=None):
+		if entities is None:
+			entities = [e.name for e in self.entities]
+
+		data = {}
+		self.snapshotLock.acquire()
+		version = self.snapshotVersion + 1
+		changed = False
+		for name in entities:
+			o = self.entityByName(name)
+			if o is None:
+				continue
+
+			values = {}
+			for var in variables:
+				if not hasattr(o, var):
+					continue
+
+				key = (name, var)
+				value = self.jsonValue(getattr(o, var))
+				last = self.snapshotState.get(key, None)
+				if last is None or last[1] != value:
+					self.snapshotState[key] = (version, value)
+					changed = True
+				elif since is not None and last[0] <= since:
+					continue
+
+				values[var] = value
+
+			if len(values) > 0:
+				data[name] = values
+
+		if changed:
+			self.snapshotVersion = version
+		version = self.snapshotVersion
+		self.snapshotLock.release()
+
+		return {'version': version, 'time': self.time(), 'data': data}
+
+	# Convert a value into something that can be serialized to JSON or MessagePack
+	def jsonValue(self, value):
+		if value is None or isinstance(value, (bool, int, float, str)):
+			return value
+		if isinstance(value, complex):
+			return [value.real, value.imag]
+		if isinstance(value, dict) or hasattr(value, 'items'):
+			return {str(k): self.jsonValue(v) for k, v in value.items()}
+		if isinstance(value, (list, tuple, set)):
+			return [self.jsonValue(v) for v in value]
+		if hasattr(value, 'tolist'):
+			# numpy arrays and scalars
+			return self.jsonValue(value.tolist())
+		if hasattr(value, 'name') and isinstance(getattr(value, 'name'), str):
+			# Entities by their name
+			return value.name
+		return str(value)
+
 # Executing cmds in the cmdQueue
 	def executeCmdQueue(self):
 		while not self.cmdQueue.empty():
@@ -432,6 +557,9 @@ class Core:
 					entity = r['entity']
 					self.removeObject(entity)
 
+				elif cmd == "batch":
+					self.executeBatch(r['ops'])
+
 				else:
 					self.logWarning("Unknown command.")
 
@@ -448,6 +576,7 @@ class Core:
 				self.logError("Entity with this name already exists: "+entity.name)
 			else:
 				self.entities.append(entity)
+				self.entityIndex[entity.name] = entity
 		else:
 			assert(False) #Impossible, entities live local only
 
@@ -478,6 +607,9 @@ class Core:
 			if entity in lst:
 				lst.remove(entity)
 
+		if self.entityIndex.get(entity.name, None) is entity:
+			del self.entityIndex[entity.name]
+
 		# Check if we need to detach a controller.  Should not be needed but not tested for the touchtable
 		for controller in self.controllers:
 			if entity in controller.children:
@@ -496,11 +628,21 @@ class Core:
 
 
 	def clearDatabase(self):
+		self.clearedDatabase = True	# Repeated when a model snapshot is restored
 		self.db.clearDatabase()
 
 
 
 ### Locking mechanism using object references
+	# Create a lock for the state of an entity
+	def createLock(self):
+		return threading.Lock()
+
+	def getDeviceStateStore(self):
+		if self.deviceState is None:
+			self.deviceState = DeviceStateStore()
+		return self.deviceState
+
 	def acquireLock(self, var, obj=None, blocking=True, timeout=None):
 		result = True
 		if self.useThreads:
@@ -715,6 +857,14 @@ class Core:
 		else:
 			return getattr(recv, func)(*args)
 
+	#call a function on all receivers, where the subtrees of local receivers are run concurrently in worker processes
+	def zCallParallel(self, receivers, func, *args):
+		if self.planWorkers is None:
+			from util.planWorkers import PlanWorkers
+			self.planWorkers = PlanWorkers(self, self.planningWorkers, self.planningWorkerTimeout)
+
+		return self.planWorkers.call(receivers, func, args)
+
 	#Casts are nonblocking and do not expect a return value, they will just drop
 	def zCast(self, receivers, func, *args):
 		if isinstance(receivers, list):
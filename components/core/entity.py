@@ -18,6 +18,9 @@ from util.persistence import Persistence
 import threading
 
 class Entity:
+    # Attributes that are not transferred to planning workers (see util/planWorkers.py), as these are static after
+    # construction or caches that each process keeps for itself
+    localAttributes = ()
 
     def __init__(self, name, host):
 
@@ -128,6 +131,21 @@ class Entity:
                 pass
             pass
 
+    # Copy of the persistent state, written later through persistence.write(), see LiveHost.offloadIO
+    def snapshotState(self):
+        data = None
+        try:
+            if self.persistence is not None:
+                self.accessLock.acquire()
+                data = self.persistence.snapshot()
+                self.accessLock.release()
+        except:
+            try:
+                self.accessLock.release()
+            except:
+                pass
+        return data
+
     def restoreState(self):
         try:
             if self.persistence is not None:
@@ -175,6 +193,12 @@ class Entity:
     def runInThread(self, func, *args):
         return self.host.runInThread(self, func, *args)
 
+    # Run external (blocking) I/O in the background, through the live I/O service of the host if it has one
+    def runIO(self, func, *args):
+        if getattr(self.host, 'liveIO', None) is not None:
+            return self.host.liveIO.run(getattr(self, func), *args)
+        return self.host.runInThread(self, func, *args)
+
     def zCall(self, receivers, func, *args):
         return self.host.zCall(receivers, func, *args)
 
@@ -60,6 +60,12 @@ class ZCore(Core):
 		self.zConnected = False
 		self.connectionLock = threading.Lock()
 
+		# Pickle protocol 5 with out-of-band buffers, numpy arrays (e.g. the block of ArrayPSData) are sent as extra frames
+		self.zOutOfBand = True
+
+		# Sockets cannot be shared with forked planning workers, parallel planning uses the slave hosts instead
+		self.planningWorkers = 0
+
 #        Normal ZMQ message format for DEMKit function calls:
 #        [0]: topic / receiver
 #        [1]: sending host
@@ -68,6 +74,7 @@ class ZCore(Core):
 #        [4]: What? (func | setvar | getvar | retval)
 #        [5]: function name
 #        [6]: function arguments in a list
+#        [7:]: out-of-band buffers of the pickled arguments (optional)
 
 #        Normal ZMQ message format for DEMKit return values:
 #        [0]: topic                 # should be the original function call
@@ -91,7 +98,7 @@ class ZCore(Core):
 		msgid = data[2].decode()
 
 		func = data[5].decode()
-		args = pickle.loads(data[6])
+		args = self.zLoads(data[6:])
 
 		r = self.callFunction(receiver, func, *args)
 
@@ -106,7 +113,7 @@ class ZCore(Core):
 		msgid = data[2].decode()
 
 		func = data[5].decode()
-		args = pickle.loads(data[6])
+		args = self.zLoads(data[6:])
 
 		r = getattr(self, func)(*args)
 
@@ -136,7 +143,7 @@ class ZCore(Core):
 		msgid = data[2].decode()
 
 		var = data[5].decode()
-		val = pickle.loads(data[6])
+		val = self.zLoads(data[6:])
 
 		r = self.setVar(receiver, var, val)
 		if ret != None:
@@ -160,7 +167,7 @@ class ZCore(Core):
 
 		what = "retval"
 		snd = sender+'#'
-		msg = [snd.encode(), receiver.encode(), str(msgid).encode(), pickle.dumps(None), what.encode(), func.encode(), pickle.dumps(r)]
+		msg = [snd.encode(), receiver.encode(), str(msgid).encode(), pickle.dumps(None), what.encode(), func.encode()] + self.zDumps(r)
 
 		success = False
 		retries = 2
@@ -203,7 +210,7 @@ class ZCore(Core):
 				if e != None:
 					result[recv] = getattr(e, func)(*args)
 				else:
-					msgId = self.zSendData(recv, "func", func, pickle.dumps(args), msgId, result)
+					msgId = self.zSendData(recv, "func", func, self.zDumps(args), msgId, result)
 
 			#assuming object here!
 			else:
@@ -214,6 +221,26 @@ class ZCore(Core):
 		else:
 			return result
 
+	#call a function on all receivers, remote receivers are called first such that they run concurrently with the local ones
+	def zCallParallel(self, receivers, func, *args):
+		result = {}
+		msgId = -1
+
+		local = []
+		for recv in receivers:
+			if isinstance(recv, str) and self.entityByName(recv) is None:
+				msgId = self.zSendData(recv, "func", func, self.zDumps(args), msgId, result)
+			else:
+				local.append(recv)
+
+		result.update(Core.zCallParallel(self, local, func, *args))
+
+		if msgId != -1:
+			result = self.zRetCollector(msgId, len(receivers), useDict = True)
+
+		# Results in the order of the receivers, such that the selection of winners is deterministic
+		return {recv: result[recv] for recv in receivers if recv in result}
+
 	def zCallSingle(self, recv, func, *args):
 		if isinstance(recv, str):
 			e = self.entityByName(recv)
@@ -221,7 +248,7 @@ class ZCore(Core):
 				return getattr(e, func)(*args)
 			else:
 				result = {}
-				msgId = self.zSendData(recv, "func", func, pickle.dumps(args), -1, result)
+				msgId = self.zSendData(recv, "func", func, self.zDumps(args), -1, result)
 				return self.zRetCollector(msgId, 1)
 
 		#assuming object here!
@@ -248,7 +275,7 @@ class ZCore(Core):
 				if e != None:
 					getattr(e, func)(*args)
 				else:
-					self.zSendData(recv, "func", func, pickle.dumps(args))
+					self.zSendData(recv, "func", func, self.zDumps(args))
 
 			#assuming object here!
 			else:
@@ -260,7 +287,7 @@ class ZCore(Core):
 			if e != None:
 				getattr(e, func)(*args)
 			else:
-				self.zSendData(recv, "func", func, pickle.dumps(args))
+				self.zSendData(recv, "func", func, self.zDumps(args))
 
 		#assuming object here!
 		else:
@@ -300,7 +327,7 @@ class ZCore(Core):
 					else:
 						result[recv] = False
 				else:
-					msgId = self.zSendData(recv, "setvar", var, pickle.dumps(val), msgId, result)
+					msgId = self.zSendData(recv, "setvar", var, self.zDumps(val), msgId, result)
 
 			#assuming object here!
 			else:
@@ -340,7 +367,7 @@ class ZCore(Core):
 					return False
 			else:
 				result = {}
-				msgId = self.zSendData(recv, "setvar", var, pickle.dumps(val), -1, result)
+				msgId = self.zSendData(recv, "setvar", var, self.zDumps(val), -1, result)
 				return self.zRetCollector(msgId, 1)
 		else:
 			if hasattr(recv, var):
@@ -525,7 +552,11 @@ class ZCore(Core):
 
 		# Dispatch the data to the queue, such that it will be published and return values can be read out.
 		recvh = recvh + "#"
-		msg = [recvh.encode(), self.name.encode(), str(msgId).encode(), pickle.dumps(self.zResultAddress), what.encode(), func.encode(), data]
+		msg = [recvh.encode(), self.name.encode(), str(msgId).encode(), pickle.dumps(self.zResultAddress), what.encode(), func.encode()]
+		if isinstance(data, list):
+			msg += data
+		else:
+			msg.append(data)
 
 
 		success = False
@@ -552,6 +583,17 @@ class ZCore(Core):
 		# Return the message id, such that the results can be tracked
 		return msgId # The message ID is the unique identifier to track the data
 
+	def zDumps(self, obj):
+		# Returns the frames of a pickled object: the pickle data followed by its out-of-band buffers
+		if self.zOutOfBand:
+			buffers = []
+			data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+			return [data] + [b.raw() for b in buffers]
+		return [pickle.dumps(obj)]
+
+	def zLoads(self, frames):
+		return pickle.loads(frames[0], buffers=frames[1:])
+
 	def zRetData(self):
 		if True: #try:
 			while True:
@@ -590,7 +632,7 @@ class ZCore(Core):
 				self.retData[msgId] = True
 			else:
 				client = data[1].decode()
-				self.retData[msgId][client] = pickle.loads(data[6])
+				self.retData[msgId][client] = self.zLoads(data[6:])
 
 	def zHeartBeat(self):
 		while True:# heartbeat timeout
@@ -15,7 +15,7 @@
 
 import numpy as np
 from ctrl.groupCtrl import GroupCtrl
-from data.psData import PSData
+from data.psData import PSData, ArrayPSData
 
 import copy
 
@@ -86,6 +86,8 @@ class AdmmGroupCtrl(GroupCtrl):
 
 		s.averageProfile = self.genZeroes(s.planHorizon)
 		s.scaledLagrangian = self.genZeroes(s.planHorizon)
+		if self.useArrayPSData:
+			s = ArrayPSData(s)
 
 		# Synchronize data used for planning
 		self.startSynchronizedPlanning(s)
@@ -129,7 +131,7 @@ class AdmmGroupCtrl(GroupCtrl):
 		#make sure all dicts are there:
 		for c in signal.commodities:
 			if c not in self.plan:
-				self.plan[c] = {}
+				self.plan[c] = self.createPlanStore()
 
 		self.candidatePlanning[self.name] = self.genZeroes(signal.planHorizon)
 		for p in parents:
@@ -51,11 +51,11 @@ class AggregatorCtrl(Entity):
 	def setClearingPrice(self, price):
 		if self.congestionPoint is not None:
 			if self.congestionPoint.hasUpperLimit(self.commodities[0]):
-				if self.currentFunction.demandForPrice(price) > self.congestionPoint.getUpperLimit(self.commodities[0]):
-					price = self.currentFunction.priceForDemand(self.congestionPoint.getUpperLimit(self.commodities[0]))
+				if self.currentFunction.demandForPrice(price) > self.congestionPoint.getUpperLimit(self.commodities[0], self.host.time()):
+					price = self.currentFunction.priceForDemand(self.congestionPoint.getUpperLimit(self.commodities[0], self.host.time()))
 			if self.congestionPoint.hasLowerLimit(self.commodities[0]):
-				if self.currentFunction.demandForPrice(price) < self.congestionPoint.getLowerLimit(self.commodities[0]):
-					price = self.currentFunction.priceForDemand(self.congestionPoint.getLowerLimit(self.commodities[0]))
+				if self.currentFunction.demandForPrice(price) < self.congestionPoint.getLowerLimit(self.commodities[0], self.host.time()):
+					price = self.currentFunction.priceForDemand(self.congestionPoint.getLowerLimit(self.commodities[0], self.host.time()))
 
 		# Round if we have discrete bids:
 		if self.discreteBids:
@@ -83,13 +83,13 @@ class AggregatorCtrl(Entity):
 			limitedFunction = copy.deepcopy(self.currentFunction)
 
 			if self.congestionPoint.hasUpperLimit(self.commodities[0]):
-				if limitedFunction.demandForPrice(limitedFunction.minPrice) > self.congestionPoint.getUpperLimit(self.commodities[0]):
-					upperPowerLimit = self.congestionPoint.getUpperLimit(self.commodities[0])
+				if limitedFunction.demandForPrice(limitedFunction.minPrice) > self.congestionPoint.getUpperLimit(self.commodities[0], self.host.time()):
+					upperPowerLimit = self.congestionPoint.getUpperLimit(self.commodities[0], self.host.time())
 					limitedFunction.priceForDemand(upperPowerLimit)
 					limitedFunction.addLine(upperPowerLimit, upperPowerLimit, limitedFunction.minPrice, limitedFunction.priceForDemand(upperPowerLimit))
 			if self.congestionPoint.hasLowerLimit(self.commodities[0]):
-				if limitedFunction.demandForPrice(limitedFunction.maxPrice) < self.congestionPoint.getLowerLimit(self.commodities[0]):
-					lowerPowerLimit = self.congestionPoint.getLowerLimit(self.commodities[0])
+				if limitedFunction.demandForPrice(limitedFunction.maxPrice) < self.congestionPoint.getLowerLimit(self.commodities[0], self.host.time()):
+					lowerPowerLimit = self.congestionPoint.getLowerLimit(self.commodities[0], self.host.time())
 					limitedFunction.priceForDemand(lowerPowerLimit)
 					limitedFunction.addLine(lowerPowerLimit, lowerPowerLimit, limitedFunction.priceForDemand(lowerPowerLimit), limitedFunction.maxPrice)
 
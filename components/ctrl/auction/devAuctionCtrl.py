@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from ctrl.auction.aggregatorCtrl import AggregatorCtrl
+from util.deviceState import PropertiesView
 
 import copy
 
@@ -102,8 +103,13 @@ class DevAuctionCtrl(AggregatorCtrl):
 		self.zCall(self.dev, 'setPlan', result)
 
 	def updateDeviceProperties(self):
-		if self.devDataUpdate < self.host.time():
-			self.devData = self.zCall(self.dev, 'getProperties')
+		if isinstance(self.devData, PropertiesView):
+			self.devData.refresh()
+		elif self.devDataUpdate < self.host.time():
+			if self.host.compactDeviceState:
+				self.devData = self.zCall(self.dev, 'getPropertiesView')
+			else:
+				self.devData = self.zCall(self.dev, 'getProperties')
 
 		return self.devData
 
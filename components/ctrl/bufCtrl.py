@@ -20,6 +20,7 @@ import numpy as np
 import random
 import copy
 import math
+import bisect
 
 #Buffer vehicle controller
 class BufCtrl(DevCtrl):
@@ -46,6 +47,12 @@ class BufCtrl(DevCtrl):
 		# temporary test
 		self.capacitylimits = None
 
+		self.useImprovementBound = True		# Skip the buffer planning if an upper bound shows that it cannot improve the candidate
+		self.lastBufPlanning = None			# Problem, desired profile and result of the last continuous planning, see improvementBound()
+		self.restrictedSchedules = {}		# Cached restricted capacities and charging powers per position in the cycle
+
+		self.solver = 'greedy'				# Solver for continuous buffers, 'greedy' or 'qp' (warm started from the candidate planning), see OptAlg
+
 
 	def timeTick(self, time, deltatime=0):
 		if self.useEventControl:
@@ -95,13 +102,7 @@ class BufCtrl(DevCtrl):
 
 		currentPlan = {}
 		for c in self.commodityIntersection(signal.commodities):
-			currentPlan[c] = []
-			for i in range(0,  len(signal.desired[c])):
-				t = int((signal.time - (signal.time%signal.timeBase)) + i*self.timeBase)
-				try:
-					currentPlan[c].append(self.realized[c][t])
-				except:
-					currentPlan[c].append(complex(0,0))
+			currentPlan[c] = self.readPlanRange(self.realized.get(c, {}), signal.time - (signal.time%signal.timeBase), self.timeBase, len(signal.desired[c]), complex(0,0))
 
 		result = self.bufPlanning(signal, copy.deepcopy(currentPlan), consumption, False, None, self.eventPlanningCapacity, self.eventPlanningPower)
 		plan = copy.deepcopy(result['profile'])
@@ -153,6 +154,7 @@ class BufCtrl(DevCtrl):
 
 		# Now we call Thijs vd Klauw's buffer planning magic
 		opt = OptAlg()
+		opt.solver = self.solver
 
 		# Adjust the target SoC according to the desired profile
 		# This automatically ensures that the buffers act based on powerlimits as well
@@ -182,17 +184,8 @@ class BufCtrl(DevCtrl):
 
 		if devData['restrictedCapacity'] is not None:
 			assert(len(self.commodities) == 1) # Not yet supported for multiple commodities
-			capacity = []
-			l = list(devData['restrictedCapacity'].keys())
-			l.sort() # Not the most efficient manner yet
-			for t in range(0,len(desired)):
-				idx = 0	# on error, element [0] must be defined
-				for i in l:
-					if i <= (signal.time+(t*signal.timeBase)) % devData['restrictedCycleTime']:
-						idx = i
-					else:
-						break
-				capacity.append( (devData['restrictedCapacity'][idx] * (3600.0 / signal.timeBase) ) / devData['cop'] )
+			restrictedCapacity = self.restrictedSchedule('capacity', devData['restrictedCapacity'], signal.time, signal.timeBase, len(desired), devData['restrictedCycleTime'])
+			capacity = [(c * (3600.0 / signal.timeBase)) / devData['cop'] for c in restrictedCapacity]
 
 			for i in range(0, len(capacity)):
 				capacity[i] = min(capacity[i], capacity[(i+1) % len(capacity) ] )
@@ -208,24 +201,37 @@ class BufCtrl(DevCtrl):
 		# Check if we need to apply restricted charging powers
 		if devData['restrictedChargingPowers'] is not None:
 			assert(len(self.commodities) == 1) # Not yet supported for multiple commodities
-			l = list(devData['restrictedChargingPowers'].keys())
-			l.sort() # Not the most efficient manner yet
+			restrictedChargingPowers = self.restrictedSchedule('chargingPowers', devData['restrictedChargingPowers'], signal.time, signal.timeBase, len(desired), devData['restrictedCycleTime'])
 			for t in range(0,len(desired)):
-				idx = 0	# on error, element [0] must be defined
-				for i in l:
-					if i <= (signal.time+(t*signal.timeBase)) % devData['restrictedCycleTime']:
-						idx = i
-					else:
-						break
-				if len(upperLimits >= t):
+				if len(upperLimits) > t:
 					# overwrite limits
-					upperLimits[t] = min(upperLimits[t], devData['restrictedChargingPowers'][idx][-1])
-					lowerLimits[t] = max(lowerLimits[t], devData['restrictedChargingPowers'][idx][0])
+					upperLimits[t] = min(upperLimits[t], restrictedChargingPowers[t][-1])
+					lowerLimits[t] = max(lowerLimits[t], restrictedChargingPowers[t][0])
 				else:
-					upperLimits.append(devData['restrictedChargingPowers'][idx][-1])
-					lowerLimits.append(devData['restrictedChargingPowers'][idx][0])
-
-
+					upperLimits.append(restrictedChargingPowers[t][-1])
+					lowerLimits.append(restrictedChargingPowers[t][0])
+
+
+
+		# Early exit when the planning cannot improve upon the current candidate
+		problem = None
+		# NOTE: The bound assumes exact plannings, hence it is not used with the approximate QP solver
+		if requireImprovement and self.useImprovementBound and self.solver != 'qp' and not devData['discrete'] and not self.useReactiveControl and not signal.allowDiscomfort and len(commodities) == 1:
+			# SoC feasibility precheck: if no demand exceeds the maximum power, the SoC never has to drop below zero
+			# The planning is then a projection of the desired profile onto the feasible profiles
+			powerMin = self.devData['chargingPowers'][0]*useablePower
+			powerMax = devData['chargingPowers'][-1]*useablePower
+			if len(cons) == 0 or max(cons) <= powerMax:
+				problem = (signal.time, signal.timeBase, soc, target, capacity if not isinstance(capacity, list) else tuple(capacity), tuple(cons), powerMin, powerMax,
+						   tuple(lowerLimits), tuple(upperLimits), tuple(prices), s.profileWeight)
+				bound = self.improvementBound(signal, commodities[0], problem, desired)
+				if bound is not None and bound <= 0.0:
+					self.nextPlan = self.host.time() + random.randint(self.replanInterval[0], self.replanInterval[1])
+					result['boundImprovement'] = 0.0
+					result['improvement'] = 0.0
+					result['profile'] = copy.deepcopy(self.candidatePlanning[self.name])
+					return result
+				desiredPlanning = list(desired)
 
 		# This is where the magic happens: Planning the buffer
 		if devData['discrete']:
@@ -266,6 +272,10 @@ class BufCtrl(DevCtrl):
 						p[i] = p[i].real / eff
 
 		else:
+			warmStart = None
+			if self.solver == 'qp' and self.name in self.candidatePlanning:
+				warmStart = self.weaveDict(self.candidatePlanning[self.name], commodities)
+
 			p = opt.bufferPlanning(desired,
 								   target,
 								   soc, #devData['soc']*(3600.0/signal.timeBase)/devData['cop'],
@@ -275,10 +285,13 @@ class BufCtrl(DevCtrl):
 								   lowerLimits, upperLimits,
 								   self.useReactiveControl,
 								   prices,
-								   s.profileWeight )
+								   s.profileWeight,
+								   warmStart = warmStart )
 
 		# Sort back the result
 		profileResult = self.unweaveVec(p, commodities)
+		if problem is not None:
+			self.lastBufPlanning = (problem, desiredPlanning, list(p))
 
 		# select a random new plan interval
 		self.nextPlan = self.host.time() + random.randint(self.replanInterval[0], self.replanInterval[1])
@@ -304,6 +317,47 @@ class BufCtrl(DevCtrl):
 		return result
 
 
+	# Upper bound on the improvement of the planning for the desired profile, based on the last planning of the same problem
+	# Projections onto a convex set are non-expansive, hence the result is within |desired - last desired| of the last result
+	def improvementBound(self, signal, c, problem, desired):
+		if self.lastBufPlanning is None or self.lastBufPlanning[0] != problem or c not in self.candidatePlanning[self.name]:
+			return None
+
+		(lastProblem, lastDesired, lastResult) = self.lastBufPlanning
+		delta = np.linalg.norm(np.array(desired) - np.array(lastDesired), ord=2)
+		old = np.array(self.candidatePlanning[self.name][c])
+		a = np.linalg.norm(np.array(signal.desired[c]) - old, ord=2)
+		b = np.linalg.norm(np.array(signal.desired[c]) - np.array(lastResult), ord=2)
+		return self.weights[c] * (a - max(0.0, b - delta))
+
+	# Values of a restricted table (dict with the start of each period within the cycle as key) for n intervals starting at time
+	# The values per position in the cycle are determined once and reused as long as the table and time base do not change
+	def restrictedSchedule(self, name, table, time, timeBase, n, cycleTime):
+		phase = time % timeBase
+		positions = int(cycleTime // timeBase)
+		if cycleTime % timeBase != 0:
+			# Positions do not repeat, look up every interval
+			keys = sorted(table.keys())
+			return [table[self.restrictedKey(keys, (time + t*timeBase) % cycleTime)] for t in range(0, n)]
+
+		cached = self.restrictedSchedules.get(name, None)
+		if cached is None or cached[0] != (timeBase, cycleTime, phase) or cached[1] != table:
+			keys = sorted(table.keys())
+			schedule = [table[self.restrictedKey(keys, phase + k*timeBase)] for k in range(0, positions)]
+			cached = ((timeBase, cycleTime, phase), copy.deepcopy(table), schedule)
+			self.restrictedSchedules[name] = cached
+
+		schedule = cached[2]
+		m = int((time % cycleTime) // timeBase)
+		return [schedule[(m + t) % positions] for t in range(0, n)]
+
+	def restrictedKey(self, keys, offset):
+		# Last key at or before the offset, element 0 must be defined otherwise
+		i = bisect.bisect_right(keys, offset)
+		if i == 0:
+			return 0
+		return keys[i-1]
+
 	#Override setPlan to include expected SoC:
 	def setPlan(self, plan, time, timeBase, update=False):
 		DevCtrl.setPlan(self, plan, time, timeBase)
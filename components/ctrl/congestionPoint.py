@@ -12,6 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+
+import numpy as np
+
+from util.reader import Reader
+
+# Limits are either constant, or time-varying. Time-varying limits are given as:
+#  - a Reader, e.g. a CsvReader with per-interval transformer limits
+#  - a list/array of values starting at startTime with the given timeBase, which repeats after the last value (e.g. a daily profile)
+# Controllers obtain the limits for a planning horizon as arrays with getUpperLimits() and getLowerLimits(),
+# which are compiled once per horizon and reused by all iterations and children.
 class CongestionPoint():
 	def __init__(self):
 		self.commodities = []
@@ -19,13 +30,19 @@ class CongestionPoint():
 		self.upperLimits = {}
 		self.lowerLimits = {}
 
-	def setUpperLimit(self, c, limit):
-		self.upperLimits[c] = limit
+		# Read-only arrays of compiled limits, (bound, commodity, time, timeBase, n) -> array, oldest first
+		self.compiled = OrderedDict()
+		self.compiledSize = 8
+
+	def setUpperLimit(self, c, limit, startTime=0, timeBase=900):
+		self.upperLimits[c] = self.limitProfile(limit, startTime, timeBase)
+		self.invalidate('upper', c)
 		if c not in self.commodities:
 			self.commodities.append(c)
 
-	def setLowerLimit(self, c, limit):
-		self.lowerLimits[c] = limit
+	def setLowerLimit(self, c, limit, startTime=0, timeBase=900):
+		self.lowerLimits[c] = self.limitProfile(limit, startTime, timeBase)
+		self.invalidate('lower', c)
 		if c not in self.commodities:
 			self.commodities.append(c)
 
@@ -35,13 +52,84 @@ class CongestionPoint():
 	def hasLowerLimit(self, c):
 		return c in self.lowerLimits
 
-	def getUpperLimit(self, c):
+	def isTimeVarying(self, c):
+		return isinstance(self.upperLimits.get(c, None), tuple) or isinstance(self.lowerLimits.get(c, None), tuple)
+
+	def getUpperLimit(self, c, time=None):
+		if c in self.upperLimits:
+			return self.limitValue(self.upperLimits[c], time, 'upper')
+
+	def getLowerLimit(self, c, time=None):
+		if c in self.lowerLimits:
+			return self.limitValue(self.lowerLimits[c], time, 'lower')
+
+	def getUpperLimits(self, c, time, timeBase, n):
+		# Upper limits of n intervals starting at time as complex array, None if there is no upper limit
 		if c in self.upperLimits:
-			return self.upperLimits[c]
+			return self.compile('upper', c, self.upperLimits[c], time, timeBase, n)
 
-	def getLowerLimit(self, c):
+	def getLowerLimits(self, c, time, timeBase, n):
+		# Lower limits of n intervals starting at time as complex array, None if there is no lower limit
 		if c in self.lowerLimits:
-			return self.lowerLimits[c]
+			return self.compile('lower', c, self.lowerLimits[c], time, timeBase, n)
 
 	# FIXME: We should implement something to check whether the constraints are met in real-time in the future.
-	# FIXME 	For now we just use this class as a placeholder for input into the controller
\ No newline at end of file
+	# FIXME 	For now we just use this class as a placeholder for input into the controller.
+
+# Internal functions
+	def limitProfile(self, limit, startTime, timeBase):
+		# Constant limits are stored as is, time-varying limits as tuple (kind, data, startTime, timeBase)
+		if isinstance(limit, Reader):
+			return ('reader', limit, startTime, limit.timeBase)
+		if isinstance(limit, (list, tuple, np.ndarray)):
+			assert(len(limit) > 0)
+			return ('array', np.array(limit, dtype=complex), int(startTime), int(timeBase))
+		return limit
+
+	def limitValue(self, limit, time, bound):
+		if not isinstance(limit, tuple):
+			return limit
+		assert(time is not None) # Time-varying limits require the time of the interval
+		value = self.compile(bound, None, limit, time - (time % limit[3]), limit[3], 1)[0]
+		# Real limits are returned as float, such that they can be compared like constant limits
+		if value.imag == 0:
+			return float(value.real)
+		return complex(value)
+
+	def compile(self, bound, c, limit, time, timeBase, n):
+		if not isinstance(limit, tuple):
+			return np.full(n, limit, dtype=complex)
+
+		key = (bound, c, int(time), int(timeBase), int(n))
+		if c is not None and key in self.compiled:
+			self.compiled.move_to_end(key)
+			return self.compiled[key]
+
+		(kind, data, startTime, dataTimeBase) = limit
+		if kind == 'reader':
+			values = np.array(data.readValues(time, time + n * timeBase, timeBase=timeBase), dtype=complex)
+		else:
+			# The strictest value of the profile within each interval
+			steps = max(1, int(timeBase // dataTimeBase))
+			times = int(time) + np.arange(0, n * steps) * (int(timeBase) // steps)
+			idx = (times - startTime) // dataTimeBase
+			values = data[idx % len(data)].reshape(n, steps)
+			if steps > 1:
+				if bound == 'upper':
+					values = values[np.arange(n), np.argmin(values.real, axis=1)]
+				else:
+					values = values[np.arange(n), np.argmax(values.real, axis=1)]
+			else:
+				values = values[:, 0]
+
+		if c is not None:
+			# Shared by all callers, hence it must not be changed
+			values.flags.writeable = False
+			self.compiled[key] = values
+			if len(self.compiled) > self.compiledSize:
+				self.compiled.popitem(last=False)
+		return values
+
+	def invalidate(self, bound, c):
+		for key in [key for key in self.compiled if key[0] == bound and key[1] == c]:
+			del self.compiled[key]
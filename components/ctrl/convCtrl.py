@@ -61,13 +61,7 @@ class ConvCtrl(DevCtrl):
 
 		currentPlan = {}
 		for c in self.commodityIntersection(signal.commodities):
-			currentPlan[c] = []
-			for i in range(0,  len(signal.desired[c])):
-				t = int((signal.time - (signal.time%signal.timeBase)) + i*self.timeBase)
-				try:
-					currentPlan[c].append(self.realized[c][t])
-				except:
-					currentPlan[c].append(complex(0,0))
+			currentPlan[c] = self.readPlanRange(self.realized.get(c, {}), signal.time - (signal.time%signal.timeBase), self.timeBase, len(signal.desired[c]), complex(0,0))
 
 
 		result = self.convPlanning(signal, copy.deepcopy(currentPlan), False)
@@ -15,6 +15,7 @@
 
 from ctrl.optCtrl import OptCtrl
 from util.funcReader import FuncReader
+from util.deviceState import PropertiesView
 
 import copy
 import numpy as np
@@ -41,6 +42,7 @@ class DevCtrl(OptCtrl):
         self.devDataPlanning = None
 
         self.staticDevice = True  # True if the device is always available
+        self.useLocalizedEvents = True  # Request incentives for event planning only for the intervals given by eventHorizon()
 
         self.localDesired = None
         self.localPrices = None
@@ -154,10 +156,8 @@ class DevCtrl(OptCtrl):
                                       )
 
             for c in self.commodities:
-                self.realized[c] = {}
-                for i in range(0, len(r['profile'][c])):
-                    t = int(signal.time - (signal.time % self.timeBase) + i * self.timeBase)
-                    self.realized[c][t] = r['profile'][c][i]
+                self.realized[c] = self.createPlanStore()
+                self.writePlanRange(self.realized[c], signal.time - (signal.time % self.timeBase), self.timeBase, r['profile'][c])
 
             self.planningTimestamp = self.host.time()
             if self.staticDevice:
@@ -215,7 +215,14 @@ class DevCtrl(OptCtrl):
     def requestIncentive(self):
         if self.useEventControl:
             time = self.host.time()
-            s = self.zCall(self.parent, 'requestIncentive', time)
+            horizonEnd = None
+            if self.useLocalizedEvents:
+                horizonEnd = self.eventHorizon(time)
+
+            if horizonEnd is None:
+                s = self.zCall(self.parent, 'requestIncentive', time)
+            else:
+                s = self.zCall(self.parent, 'requestIncentive', time, horizonEnd)
 
             # FIXME: Should be removed, async processes not allowed in PS itself. This should be resolved agent-side
             # FIXME: For now we keep a placeholder and test whether we get hre
@@ -226,6 +233,10 @@ class DevCtrl(OptCtrl):
 
             self.doEventPlanning(s)
 
+    def eventHorizon(self, time):
+        # Timestamp up to which the event planning of this device affects its profile, None for the complete horizon
+        return None
+
     def requestCancelation(self):
         print("this function must be overridden")
         assert (False)
@@ -265,29 +276,30 @@ class DevCtrl(OptCtrl):
             devPlan = []
 
             if c not in self.realized:
-                self.realized[c] = {}
+                self.realized[c] = self.createPlanStore(timeBase=timeBase)
             if c not in self.plan:
-                self.plan[c] = {}
+                self.plan[c] = self.createPlanStore()
 
+            startTime = int(time - (time % timeBase))
             for i in range(0, len(plan[c])):
                 #create the local plan for the device.
-                t = int(time - (time % timeBase) + i * timeBase)  #int(time + i*timeBase)
+                t = int(startTime + i * timeBase)  #int(time + i*timeBase)
                 tup = (t, plan[c][i])
                 devPlan.append(tup)
 
-                #create the plan for the controller, which has to synchronize with the timebase of the controller
-                if self.useEventControl:
-                    t = int(time - (time % timeBase) + i * timeBase)
-                    self.realized[c][t] = plan[c][i]
+            #create the plan for the controller, which has to synchronize with the timebase of the controller
+            if self.useEventControl:
+                self.writePlanRange(self.realized[c], startTime, timeBase, plan[c])
 
-                    if self.forwardLogging:
+                if self.forwardLogging:
+                    for (t, v) in devPlan:
                         self.logValue("realized.POW",  # "W-power.realized.real.c." + c
-                                      self.realized[c][t].real, t,
+                                      v.real, t,
                                       tags={"CTYPE": str(c).lower()}
                                       )
                         if self.host.extendedLogging:
                             self.logValue("realized.POW_REAC",  # "W-power.realized.imag.c." + c
-                                          self.realized[c][t].imag, t,
+                                          v.imag, t,
                                           tags={"CTYPE": str(c).lower()}
                                           )
 
@@ -300,8 +312,14 @@ class DevCtrl(OptCtrl):
         self.zCall(self.dev, 'setPlan', result)
 
     def updateDeviceProperties(self):
-        if self.devDataUpdate < self.host.time():
-            self.devData = self.zCall(self.dev, 'getProperties')
+        if isinstance(self.devData, PropertiesView):
+            # Keep the read-only view on the device state, only refresh its snapshot of the properties
+            self.devData.refresh()
+        elif self.devDataUpdate < self.host.time():
+            if self.host.compactDeviceState:
+                self.devData = self.zCall(self.dev, 'getPropertiesView')
+            else:
+                self.devData = self.zCall(self.dev, 'getProperties')
 
         return self.devData
 
@@ -357,35 +375,34 @@ class DevCtrl(OptCtrl):
 
     ##### GENERAL HELPER FUNCTIONS
     # Weave a dict multiple commodities into one vector of a single commodity
+    # The woven vector holds the commodities of an interval consecutively, such that commodity j is the slice [j::len(commodities)]
     def weaveDict(self, d, commodities):
-        result = []
         try:
-            for i in range(0, len(d[commodities[0]])):
-                for c in commodities:
-                    result.append(d[c][i])
+            n = len(d[commodities[0]])
+            if len(commodities) == 1:
+                return list(d[commodities[0]])
+            result = [None] * (n * len(commodities))
+            for j in range(0, len(commodities)):
+                if len(d[commodities[j]]) < n:
+                    return []
+                result[j::len(commodities)] = d[commodities[j]][0:n]
+            return result
         except:
             return []
 
-        return result
-
     def weaveMultiply(self, v, commodities):
-        result = []
         try:
-            for i in range(0, len(v)):
-                for c in commodities:
-                    result.append(v[i] / float(len(commodities)))
+            v = [x / float(len(commodities)) for x in v]
+            result = [None] * (len(v) * len(commodities))
+            for j in range(0, len(commodities)):
+                result[j::len(commodities)] = v
+            return result
         except:
             return []
 
-        return result
-
     def unweaveVec(self, v, commodities):
         result = {}
-        for c in commodities:
-            result[c] = []
-
-        for i in range(0, len(v)):
-            c = commodities[i % (len(commodities))]
-            result[c].append(v[i])
+        for j in range(0, len(commodities)):
+            result[commodities[j]] = list(v[j::len(commodities)])
 
         return result
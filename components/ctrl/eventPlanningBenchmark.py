@@ -0,0 +1,100 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Benchmark of localized event planning, but not a unit test!
+# Simulates one day of a street with many EV charging sessions, which results in thousands of events per simulated day.
+# Each session triggers an event planning at arrival, with and without localized event planning (DevCtrl.useLocalizedEvents).
+# Run from the components folder with the components and conf folders on the PYTHONPATH
+
+import random
+import time
+
+from hosts.simHost import SimHost
+from dev.btsDev import BtsDev
+from ctrl.btsCtrl import BtsCtrl
+from ctrl.groupCtrl import GroupCtrl
+
+houses = 10
+evsPerHouse = 20
+startTime = 1675033200	# Aligned with the day start in UTC
+
+def run(localized):
+	random.seed(42)
+
+	sim = SimHost()
+	sim.timeBase = 60
+	sim.startTime = startTime
+	sim.timeOffset = 0
+	sim.intervals = 24*60
+	sim.writeData = False
+	sim.enableDebug = False
+	sim.shutdown = lambda: None		# SimHost.shutdown() exits the interpreter
+
+	root = GroupCtrl("StreetController", sim)
+	root.useEventControl = True
+	root.planHorizon = 192
+	root.planInterval = 96
+	root.maxIters = 4
+
+	ctrls = []
+	for h in range(0, houses):
+		house = GroupCtrl("HouseController-" + str(h), sim, root)
+		house.useEventControl = True
+		house.planHorizon = 192
+		house.planInterval = 96
+		house.maxIters = 4
+
+		for e in range(0, evsPerHouse):
+			ev = BtsDev("EV-" + str(h) + "-" + str(e), sim)
+			ev.capacity = 20000
+			ev.chargingPowers = [0, 7400]
+			ev.discrete = False
+
+			# Short charging sessions during the day, e.g. at a charging hub
+			t = startTime + random.randint(0, 3600)
+			while t < startTime + 23*3600:
+				stay = random.randint(3600, 4*3600)
+				ev.addJob(t, t + stay, random.randint(2000, 10000))
+				t += stay + random.randint(600, 3600)
+
+			evc = BtsCtrl("EVController-" + str(h) + "-" + str(e), ev, house, sim)
+			evc.useEventControl = True
+			evc.useLocalizedEvents = localized
+			ctrls.append(evc)
+
+	# Measure the event planning chains of the EV controllers
+	stats = {'events': 0, 'time': 0.0}
+	for evc in ctrls:
+		def requestIncentive(evc=evc):
+			t = time.time()
+			BtsCtrl.requestIncentive(evc)
+			stats['time'] += time.time() - t
+			stats['events'] += 1
+		evc.requestIncentive = requestIncentive
+
+	start = time.time()
+	sim.startSimulation()
+	duration = time.time() - start
+
+	realized = root.readPlanRange(root.realized["ELECTRICITY"], startTime, root.timeBase, 96)
+	return (stats, duration, realized)
+
+(full, fullDuration, fullRealized) = run(False)
+(local, localDuration, localRealized) = run(True)
+
+print("Events per simulated day:", full['events'])
+print("%-24s %8.2f ms per event, simulation %6.1f s" % ("full horizon", full['time'] / max(1, full['events']) * 1000, fullDuration))
+print("%-24s %8.2f ms per event, simulation %6.1f s" % ("localized", local['time'] / max(1, local['events']) * 1000, localDuration))
+print("Equal realized profile of the street:", max(abs(a - b) for (a, b) in zip(fullRealized, localRealized)) < 0.001)
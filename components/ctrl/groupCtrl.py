@@ -20,7 +20,7 @@ import threading
 import copy
 
 from ctrl.optCtrl import OptCtrl
-from data.psData import PSData
+from data.psData import PSData, ArrayPSData
 from util.funcReader import FuncReader
 
 class GroupCtrl(OptCtrl):
@@ -53,6 +53,13 @@ class GroupCtrl(OptCtrl):
 		self.desired = None
 		self.prices = None
 		self.profileWeight = 1  	# Beta in the work by Thijs van der Klauw, should be between 0-1. 1 = normal profile steering, 0 = prices only
+		self.useArrayPSData = False	# Send steering signals as ArrayPSData, which shares the profiles between copies
+		self.useCandidateCache = False	# Reuse the candidate of a child in the next iteration if its commodities did not change, only pays off with multiple commodities
+		self.parallelPlanning = False	# Plan the subtrees of the children concurrently in worker processes, see Core.zCallParallel()
+
+		# Candidate cache statistics
+		self.candidateCacheHits = 0
+		self.candidateCacheMisses = 0
 		self.congestionPoint = congestionPoint
 
 		self.localWeight = {'ELECTRICITY': 0, 'EL1': 0, 'EL2': 0, 'EL3': 0, 'HEAT': 0, 'NATGAS': 0}
@@ -141,6 +148,9 @@ class GroupCtrl(OptCtrl):
 				except:
 					pass
 
+			if self.useCandidateCache and self.candidateCacheHits + self.candidateCacheMisses > 0:
+				self.logValue("n-planning.cache.hitrate", self.candidateCacheHits / (self.candidateCacheHits + self.candidateCacheMisses))
+
 
 
 
@@ -218,6 +228,8 @@ class GroupCtrl(OptCtrl):
 
 		s.desired = copy.deepcopy(desired)
 		s.prices = copy.deepcopy(prices)
+		if self.useArrayPSData:
+			s = ArrayPSData(s)
 
 		# Synchronize data used for planning
 		self.startSynchronizedPlanning(s)
@@ -249,7 +261,7 @@ class GroupCtrl(OptCtrl):
 		# Preparing the dictionaries
 		for c in signal.commodities:
 			if c not in self.plan:
-				self.plan[c] = {}
+				self.plan[c] = self.createPlanStore()
 
 		# Resetting the intermediate vectors for the new planning
 		self.candidatePlanning[self.name] = self.genZeroes(signal.planHorizon)
@@ -259,7 +271,7 @@ class GroupCtrl(OptCtrl):
 		s = copy.deepcopy(signal)
 
 		# Initialization of all children by requesting theur planning
-		results = self.zCall(self.children, 'doInitialPlanning', s, list(parents))
+		results = self.zCallPlanning(self.children, 'doInitialPlanning', s, list(parents))
 
 		for k, r in results.items():
 			for c in self.commodityIntersection(r['profile'].keys()):
@@ -290,13 +302,11 @@ class GroupCtrl(OptCtrl):
 		result['profile'] = copy.deepcopy(self.candidatePlanning[self.name])
 		s = copy.deepcopy(signal)
 
-		# FIXME congestionpoints should have the option to provide a vector of bounds instead. T211
 		if self.congestionPoint is not None and not self.allowDiscomfort: # DOn't know the usage of the latter part
 			for c in self.commodities:
-				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c]):
+				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c], s.time, s.timeBase):
 					# Adapt the steering signal to steer towards a feasible solution
-					for i in range(0, len(s.desired[c])):
-						s.desired[c][i] = max(self.congestionPoint.getLowerLimit(c).real, min(s.desired[c][i].real, self.congestionPoint.getUpperLimit(c).real))
+					s.desired[c] = self.clipToLimits(c, s.desired[c], s.time, s.timeBase)
 
 		# Perform a normal planning with bounds imposed when applicable
 		if self.parent is None:
@@ -306,11 +316,10 @@ class GroupCtrl(OptCtrl):
 		if self.congestionPoint is not None and not self.strictComfort: # and not self.allowDiscomfort
 			withinLimits = True
 			for c in self.commodities:
-				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c]):
+				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c], s.time, s.timeBase):
 					withinLimits = False
 					# Adapt the steering signal to steer towards a feasible solution
-					for i in range(0, len(s.desired[c])):
-						s.desired[c][i] = max(self.congestionPoint.getLowerLimit(c).real, min(s.desired[c][i].real, self.congestionPoint.getUpperLimit(c).real))
+					s.desired[c] = self.clipToLimits(c, s.desired[c], s.time, s.timeBase)
 
 			if not withinLimits:
 				s = copy.deepcopy(signal)
@@ -371,17 +380,41 @@ class GroupCtrl(OptCtrl):
 
 		signal = copy.deepcopy(signal)
 
+		# Cache of the last result of each child, together with the versions of the commodities it was based on
+		# The steering input of a commodity only changes when a winner commits a profile for it, or when the number
+		# of simultaneous commits changes. Children that did not win and whose commodities did not change give the same result
+		candidateCache = {}
+		childCommodities = {}
+		commodityVersions = {}
+		if self.useCandidateCache:
+			childCommodities = self.zCall(participatingChildren, 'getCommodities')
+			commodityVersions = dict.fromkeys(self.commodities, 0)
+		previousCommits = simultaneousCommits
+
+		# The limits of the congestion point combined with the limits of the parent are the same in all iterations
+		limits = {}
+		if self.congestionPoint is not None:
+			for c in self.commodities:
+				limits[c] = self.combinedLimits(c, signal)
+
 		#####################################
 		#  Iterative Profile Steering algorithm
 		#####################################
 		for i in range(0, maxIters):
 			if self.parent == None or self.parentConnected == False:
 				self.logMsg("Planning iteration: " + str(i))
-				# Peform a reset on all children
-				self.resetPlanning([])
+				# Peform a reset on all children, with the candidate cache only on the children that are re-evaluated (see below)
+				if not self.useCandidateCache:
+					self.resetPlanning([])
 
 			assert (simultaneousCommits > 0)
 
+			if simultaneousCommits != previousCommits:
+				# The steering signal is divided by the number of simultaneous commits
+				for c in commodityVersions:
+					commodityVersions[c] += 1
+				previousCommits = simultaneousCommits
+
 			# Adapting the local steering signal
 			s = copy.deepcopy(signal)
 			s.source = self.name
@@ -394,30 +427,11 @@ class GroupCtrl(OptCtrl):
 				s.desired[c] = list(np.array(s.desired[c]) - np.array(iterationPlanning[c]))
 
 				# Determining the sctricter bounds
-				if self.congestionPoint is not None:
-					ub = {}
-					lb = {}
-					if self.congestionPoint.hasLowerLimit(c):
-						lb[c] = list(np.array(([self.congestionPoint.getLowerLimit(c)] * s.planHorizon)))
-					if self.congestionPoint.hasUpperLimit(c):
-						ub[c] = list(np.array(([self.congestionPoint.getUpperLimit(c)] * s.planHorizon)))
-
-					if self.congestionPoint.hasLowerLimit(c):
-						if c in signal.lowerLimits and len(signal.lowerLimits[c]) == signal.planHorizon:
-							for j in range(0, signal.planHorizon):
-								s.lowerLimits[c][j] = complex(min(ub[c][j].real, max(lb[c][j].real, signal.lowerLimits[c][j].real)), min(ub[c][j].imag, max(lb[c][j].imag, signal.lowerLimits[c][j].imag)))
-						else:
-							s.lowerLimits[c] = list(lb[c])
-
-					if self.congestionPoint.hasUpperLimit(c):
-						if c in signal.upperLimits and len(signal.upperLimits[c]) == signal.planHorizon:
-							for j in range(0, signal.planHorizon):
-								s.upperLimits[c][j] = complex(max(lb[c][j].real, min(ub[c][j].real, signal.upperLimits[c][j].real)), max(lb[c][j].imag, min(ub[c][j].imag, signal.upperLimits[c][j].imag)))
-						else:
-							s.upperLimits[c] = list(ub[c])
-
-
-
+				if c in limits:
+					if limits[c][0] is not None:
+						s.lowerLimits[c] = list(limits[c][0])
+					if limits[c][1] is not None:
+						s.upperLimits[c] = list(limits[c][1])
 
 				# Determining the steering signals that should be sent to the children.
 				if simultaneousCommits > 0:
@@ -425,12 +439,10 @@ class GroupCtrl(OptCtrl):
 						s.desired[c][j] = (s.desired[c][j] / simultaneousCommits)
 
 					if c in s.upperLimits and len(s.upperLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.upperLimits[c])):
-							s.upperLimits[c][j] = (s.upperLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+						s.upperLimits[c] = self.headroom(s.upperLimits[c], iterationPlanning[c], simultaneousCommits)
 
 					if c in s.lowerLimits and len(s.lowerLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.lowerLimits[c])):
-							s.lowerLimits[c][j] = (s.lowerLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+						s.lowerLimits[c] = self.headroom(s.lowerLimits[c], iterationPlanning[c], simultaneousCommits)
 
 			improvements = {}
 			boundImprovements = {}
@@ -442,8 +454,33 @@ class GroupCtrl(OptCtrl):
 			#  Sending the signals and selecting the iteration winners
 			#####################################
 			# Ask all children to perform a planning
-			self.zCall(participatingChildren, "resetIteration", self.name)
-			results = self.zCall(participatingChildren, 'doPlanning', s)
+			if not self.useCandidateCache:
+				self.zCall(participatingChildren, "resetIteration", self.name)
+				results = self.zCallPlanning(participatingChildren, 'doPlanning', s)
+			else:
+				versions = {}
+				evaluate = []
+				for child in participatingChildren:
+					versions[child] = tuple(commodityVersions.get(c, 0) for c in childCommodities[child])
+					if child not in candidateCache or candidateCache[child][0] != versions[child]:
+						evaluate.append(child)
+
+				self.candidateCacheHits += len(participatingChildren) - len(evaluate)
+				self.candidateCacheMisses += len(evaluate)
+
+				if self.parent is None or self.parentConnected == False:
+					self.planningWinners = []
+					self.zCall(evaluate, 'resetPlanning', [self.name])
+
+				# Skipped children keep their candidate, so they must not be reset either
+				self.zCall(evaluate, "resetIteration", self.name)
+				evaluated = self.zCallPlanning(evaluate, 'doPlanning', s)
+				for child in evaluate:
+					candidateCache[child] = (versions[child], evaluated[child])
+
+				results = OrderedDict()
+				for child in participatingChildren:
+					results[child] = candidateCache[child][1]
 
 			# Sort the contribution of all devices
 			for child, val in results.items():
@@ -467,9 +504,12 @@ class GroupCtrl(OptCtrl):
 								bestImprovement = improvement
 
 							# Perform bookkeeping and updating profiles
+							candidateCache.pop(child, None)
 							childData = self.zCall(child, 'setIterationWinner', self.name, None)
 							for c in self.commodityIntersection(childData['profile'].keys()):
 								iterationPlanning[c] = list(np.array(iterationPlanning[c]) + np.array(childData['profile'][c]))
+								if c in commodityVersions:
+									commodityVersions[c] += 1
 
 							# Finalize the planning when we are the root controller
 							if self.parent is None or self.parentConnected == False:
@@ -487,9 +527,12 @@ class GroupCtrl(OptCtrl):
 							bestImprovement = improvement
 
 						# Perform bookkeeping and updating profiles
+						candidateCache.pop(child, None)
 						childData = self.zCall(child, 'setIterationWinner', self.name, None)
 						for c in self.commodityIntersection(childData['profile'].keys()):
 							iterationPlanning[c] = list(np.array(iterationPlanning[c]) + np.array(childData['profile'][c]))
+							if c in commodityVersions:
+								commodityVersions[c] += 1
 
 						# Finalize the planning when we are the root controller
 						if self.parent is None or self.parentConnected == False:
@@ -532,6 +575,12 @@ class GroupCtrl(OptCtrl):
 
 
 
+	def zCallPlanning(self, receivers, func, *args):
+		# Fan out a planning call to the children, concurrently if enabled
+		if self.parallelPlanning:
+			return self.host.zCallParallel(receivers, func, *args)
+		return self.zCall(receivers, func, *args)
+
 	# Trigger a new planning
 	def doReplanning(self):
 		if self.parent is None or self.parentConnected == False:
@@ -550,13 +599,16 @@ class GroupCtrl(OptCtrl):
 
 
 	#### EVENT BASED PROFILE STEERING
-	def sendIncentive(self):
+	def sendIncentive(self, horizonEnd=None):
 		s = PSData()
 		s.copyFrom(self)
 		self.lockPlanning.acquire()
 
 		# Selecting hte timeframe
 		intervals = int((self.lastPlannedTime - (self.host.time() - (self.host.time() % self.timeBase))) / self.timeBase)
+		if horizonEnd is not None:
+			# Localized event planning, only the intervals up to the end requested by the device
+			intervals = max(0, min(intervals, int(math.ceil((horizonEnd - (self.host.time() - (self.host.time() % self.timeBase))) / self.timeBase))))
 		startTime = int(self.lastPlannedTime - (self.host.time() % self.timeBase))
 		s.planHorizon = intervals
 
@@ -577,20 +629,23 @@ class GroupCtrl(OptCtrl):
 					s.lowerLimits[c] = []
 
 			# Now fill the vectors with the steering signal and the limits
+			(cpLower, cpUpper) = self.congestionLimits(c, self.host.time() - (self.host.time() % self.timeBase), self.timeBase, intervals)
 			# FIXME: HAVE ANOTHER LOOK AT THE TRY-EXCEPT STATEMENTS. THEY SHOULD NOT BE REQUIRED
+			# Missing intervals are None, such that they end up in the except clause
+			plan = self.readPlanRange(self.plan.get(c, {}), time, self.timeBase, intervals, None)
+			realized = self.readPlanRange(self.realized.get(c, {}), time, self.timeBase, intervals, None)
 			for i in range(0, intervals):
 				try:
 					desiredPlan[c].append(complex(0, 0))
-					time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
-					desiredPlan[c][i] = (self.plan[c][time] - self.realized[c][time])
+					desiredPlan[c][i] = (plan[i] - realized[i])
 
 					try:
 						# Add limits:
 						if self.congestionPoint is not None:
 							if self.congestionPoint.hasUpperLimit(c):
-								s.upperLimits[c].append(complex(self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real, self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag))
+								s.upperLimits[c].append(complex(cpUpper[i].real - realized[i].real, cpUpper[i].imag - realized[i].imag))
 							if self.congestionPoint.hasLowerLimit(c):
-								s.lowerLimits[c].append(complex(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real, self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag))
+								s.lowerLimits[c].append(complex(cpLower[i].real - realized[i].real, cpLower[i].imag - realized[i].imag))
 
 							# Make sure that the steering signal obeys the bounds
 							if desiredPlan[c][i].real > s.upperLimits[c][i].real or desiredPlan[c][i].real < s.lowerLimits[c][i].real:
@@ -609,6 +664,8 @@ class GroupCtrl(OptCtrl):
 		s.prices = prices
 		s.time = int(self.host.time() - (self.host.time() % self.timeBase))
 		s.originalTimestamp = self.host.time()
+		if self.useArrayPSData:
+			s = ArrayPSData(s)
 
 		return s
 
@@ -629,7 +686,7 @@ class GroupCtrl(OptCtrl):
 		else:
 			self.zCall(self.parent, 'requestCancelation', childData)
 
-	def requestIncentive(self, timestamp):
+	def requestIncentive(self, timestamp, horizonEnd=None):
 		# FIXME: Warning, original (v3) code had statements regarding multithreading and time (de-) synchronization
 		# This probably has to do with cases where processes (on different machines) run unsynchronized, and hence time issues may arise
 		# For now we do not use such functionality
@@ -640,7 +697,7 @@ class GroupCtrl(OptCtrl):
 				self.doReplanning()
 				self.lockSyncPlanning.release()
 
-			return self.sendIncentive()
+			return self.sendIncentive(horizonEnd)
 
 		# Otherwise, check if we are a fleet controller and should send the incentive on behalf of the root controller:
 		# This is only done if the local problem is still large enough
@@ -661,10 +718,13 @@ class GroupCtrl(OptCtrl):
 			# The local problem (i.e. difference between planning and realization) is large enough
 			# Hence, we send the current problem to the devices
 			if (diff / intervals) > self.minProblem:
-				return self.sendIncentive()
+				return self.sendIncentive(horizonEnd)
 
 		# Otherwise, we have not ran into a return statement, so we should ask the higher level controller to return the incentive
-		signal = self.zCall(self.parent, 'requestIncentive', timestamp)
+		if horizonEnd is None:
+			signal = self.zCall(self.parent, 'requestIncentive', timestamp)
+		else:
+			signal = self.zCall(self.parent, 'requestIncentive', timestamp, horizonEnd)
 
 		self.lockPlanning.acquire()
 		s = copy.deepcopy(signal)
@@ -678,39 +738,40 @@ class GroupCtrl(OptCtrl):
 				if self.congestionPoint.hasLowerLimit(c):
 					s.lowerLimits[c] = []
 
+				(cpLower, cpUpper) = self.congestionLimits(c, self.host.time() - (self.host.time() % self.timeBase), self.timeBase, s.planHorizon)
 				# Fill vectors
 				for i in range(0, s.planHorizon):
 					time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
 					# Check the strictness of bounds and correct them if applicable
 					if self.congestionPoint.hasUpperLimit(c):
-						s.upperLimits[c].append(self.congestionPoint.getUpperLimit(c))
+						s.upperLimits[c].append(cpUpper[i])
 						try:
 							if c in signal.upperLimits:
 								# The else clause is the original (v3) code. Event based with limits must be tested!
 								if self.congestionPoint.hasLowerLimit(c):
-									s.upperLimits[c][i] = complex(min((self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real), max(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real), signal.upperLimits[c][i].real),
-																  min((self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag), max(self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag), signal.upperLimits[c][i].imag))
+									s.upperLimits[c][i] = complex(min((cpUpper[i].real - self.realized[c][time].real), max(cpLower[i].real - self.realized[c][time].real), signal.upperLimits[c][i].real),
+																  min((cpUpper[i].imag - self.realized[c][time].imag), max(cpLower[i].imag - self.realized[c][time].imag), signal.upperLimits[c][i].imag))
 								else:
-									s.upperLimits[c][i] = complex(min(signal.upperLimits[c][i].real, (self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real)),
-															  	   min(signal.upperLimits[c][i].imag, (self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag)))
+									s.upperLimits[c][i] = complex(min(signal.upperLimits[c][i].real, (cpUpper[i].real - self.realized[c][time].real)),
+															  	   min(signal.upperLimits[c][i].imag, (cpUpper[i].imag - self.realized[c][time].imag)))
 							else:
-								s.upperLimits[c][i] = complex(self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real, self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag)
+								s.upperLimits[c][i] = complex(cpUpper[i].real - self.realized[c][time].real, cpUpper[i].imag - self.realized[c][time].imag)
 						except:
 							pass
 
 					if self.congestionPoint.hasLowerLimit(c):
-						s.lowerLimits[c].append(self.congestionPoint.getLowerLimit(c))
+						s.lowerLimits[c].append(cpLower[i])
 						try:
 							if c in signal.lowerLimits:
 								# The else clause is the original (v3) code. Event based with limits must be tested!
 								if self.congestionPoint.hasUpperLimit(c):
-									s.lowerLimits[c][i] = complex(max((self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real), min((self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real), signal.lowerLimits[c][i].real)),
-																  max((self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag), min((self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag), signal.lowerLimits[c][i].imag)))
+									s.lowerLimits[c][i] = complex(max((cpLower[i].real - self.realized[c][time].real), min((cpUpper[i].real - self.realized[c][time].real), signal.lowerLimits[c][i].real)),
+																  max((cpLower[i].imag - self.realized[c][time].imag), min((cpUpper[i].imag - self.realized[c][time].imag), signal.lowerLimits[c][i].imag)))
 								else:
-									s.lowerLimits[c][i] = complex(max(signal.lowerLimits[c][i].real, (self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real)),
-																   max(signal.lowerLimits[c][i].imag, (self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag)))
+									s.lowerLimits[c][i] = complex(max(signal.lowerLimits[c][i].real, (cpLower[i].real - self.realized[c][time].real)),
+																   max(signal.lowerLimits[c][i].imag, (cpLower[i].imag - self.realized[c][time].imag)))
 							else:
-								s.lowerLimits[c][i] = complex(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real, self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag)
+								s.lowerLimits[c][i] = complex(cpLower[i].real - self.realized[c][time].real, cpLower[i].imag - self.realized[c][time].imag)
 						except:
 							pass
 
@@ -728,8 +789,10 @@ class GroupCtrl(OptCtrl):
 		self.lockPlanning.acquire()
 
 		for c in self.commodityIntersection(profile.keys()):
+			startTime = self.host.time() - (self.host.time() % self.timeBase)
+			realized = self.readPlanRange(self.realized.get(c, {}), startTime, self.timeBase, len(profile[c]), None)
 			for i in range(0, len(profile[c])):
-				time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
+				time = startTime + i * self.timeBase
 				# FIXME: Check why this try is required here. Shouldn't be required (perhaps the profiles class will resolve this)
 				try:
 					if i == 0:
@@ -737,32 +800,84 @@ class GroupCtrl(OptCtrl):
 						w = (self.timeBase - (self.host.time() % self.timeBase)) / self.timeBase
 						profile[c][i] *= w
 
-					self.realized[c][time] += profile[c][i]
+					realized[i] += profile[c][i]
 
 					# Write the result for real-time tracking on a grafana dasboard
 					if self.forwardLogging:
-						self.logValue("W-power.realized.real.c." + c, self.realized[c][time].real, time)
+						self.logValue("W-power.realized.real.c." + c, realized[i].real, time)
 						if self.host.extendedLogging:
-							self.logValue("W-power.realized.imag.c." + c, self.realized[c][time].imag, time)
+							self.logValue("W-power.realized.imag.c." + c, realized[i].imag, time)
 				except:
 					pass
 
+			if c in self.realized:
+				self.writePlanRange(self.realized[c], startTime, self.timeBase, realized)
+
 		self.lockPlanning.release()
 
 		if self.parent != None and self.parentConnected == True:
 			self.zCall(self.parent, 'updateRealized', profile)
 
 	# Check whether a profile does meet the bounds set by a congestionpoint
-	def checkBoundViolations(self, commodity, profile):
+	def checkBoundViolations(self, commodity, profile, time=None, timeBase=None):
 		if self.congestionPoint is not None:
-			if self.congestionPoint.hasUpperLimit(commodity):
-				for cons in profile:
-					if cons.real - 0.00001 > self.congestionPoint.getUpperLimit(commodity).real:
-						return False
-
-			if self.congestionPoint.hasLowerLimit(commodity):
-				for cons in profile:
-					if cons.real + 0.00001 < self.congestionPoint.getLowerLimit(commodity).real:
-						return False
-
-		return True
\ No newline at end of file
+			if time is None:
+				time = self.host.time() - (self.host.time() % self.timeBase)
+			if timeBase is None:
+				timeBase = self.timeBase
+			(lower, upper) = self.congestionLimits(commodity, time, timeBase, len(profile))
+			values = np.real(profile)
+
+			if upper is not None and np.any(values - 0.00001 > upper.real):
+				return False
+
+			if lower is not None and np.any(values + 0.00001 < lower.real):
+				return False
+
+		return True
+
+	# Limits of the congestion point for n intervals starting at time as arrays (lower, upper), None if a limit does not exist
+	def congestionLimits(self, commodity, time, timeBase, n):
+		if self.congestionPoint is None:
+			return (None, None)
+		return (self.congestionPoint.getLowerLimits(commodity, time, timeBase, n), self.congestionPoint.getUpperLimits(commodity, time, timeBase, n))
+
+	# Clip the real part of a desired profile to the limits of the congestion point
+	def clipToLimits(self, commodity, desired, time, timeBase):
+		(lower, upper) = self.congestionLimits(commodity, time, timeBase, len(desired))
+		values = np.real(desired)
+		if upper is not None:
+			values = np.minimum(values, upper.real)
+		if lower is not None:
+			values = np.maximum(lower.real, values)
+		return values.tolist()
+
+	# Limits of the congestion point combined with the limits of the signal for its planning horizon as arrays (lower, upper)
+	# Limits of the signal are kept within the limits of the congestion point, None if the congestion point has no such limit
+	def combinedLimits(self, commodity, signal):
+		(lb, ub) = self.congestionLimits(commodity, signal.time, signal.timeBase, signal.planHorizon)
+		lowest = lb if lb is not None else np.full(signal.planHorizon, complex(-math.inf, -math.inf))
+		highest = ub if ub is not None else np.full(signal.planHorizon, complex(math.inf, math.inf))
+
+		lower = lb
+		if lb is not None and commodity in signal.lowerLimits and len(signal.lowerLimits[commodity]) == signal.planHorizon:
+			limit = np.array(signal.lowerLimits[commodity], dtype=complex)
+			lower = np.minimum(highest.real, np.maximum(lowest.real, limit.real)).astype(complex)
+			lower.imag = np.minimum(highest.imag, np.maximum(lowest.imag, limit.imag))
+
+		upper = ub
+		if ub is not None and commodity in signal.upperLimits and len(signal.upperLimits[commodity]) == signal.planHorizon:
+			limit = np.array(signal.upperLimits[commodity], dtype=complex)
+			upper = np.maximum(lowest.real, np.minimum(highest.real, limit.real)).astype(complex)
+			upper.imag = np.maximum(lowest.imag, np.minimum(highest.imag, limit.imag))
+
+		return (lower, upper)
+
+	# Share of the limits that remains next to the current planning, for each of the simultaneous commits
+	def headroom(self, limits, planning, simultaneousCommits):
+		planning = np.array(planning, dtype=complex)
+		result = np.empty(len(limits), dtype=complex)
+		# Real and imaginary parts are divided separately, as numpy divides complex values slightly differently
+		result.real = (np.real(limits) / simultaneousCommits) - (planning.real / simultaneousCommits)
+		result.imag = -(planning.imag / simultaneousCommits)
+		return result.tolist()
\ No newline at end of file
@@ -16,7 +16,8 @@
 import copy
 import threading
 from ctrl.loadCtrl import LoadCtrl
-from sklearn import linear_model
+
+import numpy as np
 
 
 
@@ -50,12 +51,28 @@ class LivePvCtrl(LoadCtrl):
 		self.lockModel = threading.Lock()
 		self.training = False
 
+		# Incremental training: the sufficient statistics of the regression are updated with each new sample.
+		# Each day, the statistics are decayed (exponential forgetting, memory of about historySize) and the model is
+		# solved per bin. The history is only read to bootstrap the statistics.
+		self.incrementalTraining = True
+		self.forgetting = None			# Daily decay factor of the statistics, by default 1 - 1 day / historySize
+		self.statsXX = None				# Per bin: X^T X with X = [1, GHI, DNI]
+		self.statsXy = None				# Per bin: X^T y with y the production
+		self.dailyMaxProduction = None	# Per day (rows, newest last) and bin: the maximum observed production (negative)
+		self.lastSample = -1
+
+		# Use the shared forecast cache of the sun (getForecast) instead of a private copy of the prediction
+		self.sharedForecast = True
+
 		if self.persistence != None:
 			self.watchlist += ["lastModelTraining", "model", "bins", "binSize", "regressionTimeBase", "historySize"]
+			self.watchlist += ["statsXX", "statsXy", "dailyMaxProduction", "lastSample"]
 			self.persistence.setWatchlist(self.watchlist)
 
 	def startup(self):
 		self.bins = int(86400/self.binSize) # 1 day = 86400 seconds
+		if self.forgetting is None:
+			self.forgetting = 1.0 - 86400.0 / self.historySize
 
 		LoadCtrl.startup(self)
 
@@ -69,15 +86,26 @@ class LivePvCtrl(LoadCtrl):
 
 		LoadCtrl.timeTick(self, time)
 
+		if self.incrementalTraining and self.statsXX is not None:
+			self.addSample(time)
+
 		# Retrain the model if it is too "old" (1 day now)
 		if self.lastModelTraining < self.host.time() - 24*3600 and not self.training:
 			self.training = True
-			self.runInThread('trainModel')
+			if self.incrementalTraining and self.statsXX is not None:
+				self.updateModel() # Cheap, no need for a thread
+			else:
+				self.runInThread('trainModel')
 
 
 
 #### PREDICTION CODE
 	def doPrediction(self,  startTime,  endTime, adapt=False):
+		if self.sharedForecast:
+			# Read-only arrays shared with the other controllers using this sun, no copy required
+			version, sunForecast = self.zCall(self.sun, 'getForecast', startTime, endTime, self.timeBase)
+			return self.predictProductionArrays(sunForecast, startTime, endTime)
+
 		# Get the sun prediction
 		sunPrediction = copy.deepcopy( self.zCall(self.sun, 'doPrediction', startTime , endTime, self.timeBase) )
 		result = self.predictProduction(sunPrediction, startTime,  endTime)
@@ -86,6 +114,9 @@ class LivePvCtrl(LoadCtrl):
 
 ### Training the model based on the historical data
 	def trainModel(self):
+		if self.incrementalTraining:
+			self.bootstrapModel()
+			return
 
 		self.host.logDebug("[LivePVCtrl.trainModel] initialized")
 
@@ -146,7 +177,8 @@ class LivePvCtrl(LoadCtrl):
 
 		self.lockModel.acquire()
 
-		# Now apply a linear regression:
+		# Now apply a linear regression, sklearn is only needed here:
+		from sklearn import linear_model
 		self.model = []
 		for b in range(0, self.bins):
 			learning = linear_model.LinearRegression()
@@ -162,6 +194,113 @@ class LivePvCtrl(LoadCtrl):
 		self.training = False
 
 
+### Incremental training
+	def bootstrapModel(self):
+		# Initialize the statistics from the history with a single read per series
+		self.host.logDebug("[LivePVCtrl.bootstrapModel] initialized")
+
+		self.lastModelTraining = self.host.time()
+
+		time = self.host.time()
+		time -= time%(24*3600) # Align data to start of a day
+
+		pvData = list(self.zCall(self.dev, 'readValues', time - self.historySize, time, None, self.regressionTimeBase ) )
+		ghi = list(self.zCall(self.sun, 'readValues', time - self.historySize, time, "irradiationGHI", self.regressionTimeBase ) )
+		dni = list(self.zCall(self.sun, 'readValues', time - self.historySize, time, "irradiationDNI", self.regressionTimeBase ) )
+
+		n = min(len(pvData), len(ghi), len(dni))
+		y = np.array([0.0 if v is None else complex(v).real for v in pvData[0:n]])
+		ghi = np.array([0.0 if v is None else v for v in ghi[0:n]], dtype=float)
+		dni = np.array([0.0 if v is None else v for v in dni[0:n]], dtype=float)
+
+		startTime = time - self.historySize
+		times = startTime + np.arange(n) * self.regressionTimeBase
+		b = ((times % 86400) // self.binSize).astype(int)
+
+		X = np.stack((np.ones(n), ghi, dni), axis=1)
+
+		statsXX = np.zeros((self.bins, 3, 3))
+		statsXy = np.zeros((self.bins, 3))
+
+		# Add the trivial solution: No irradiance is no production
+		statsXX[:, 0, 0] = 1.0
+
+		# Older samples have been forgotten partially
+		weights = self.forgetting ** ((time - times) // 86400)
+		np.add.at(statsXX, b, weights[:, None, None] * X[:, :, None] * X[:, None, :])
+		np.add.at(statsXy, b, (weights * y)[:, None] * X)
+
+		days = int(self.historySize / 86400)
+		dailyMaxProduction = np.zeros((days, self.bins))
+		d = np.clip(((times - startTime) // 86400).astype(int), 0, days - 1)
+		np.minimum.at(dailyMaxProduction, (d, b), y)
+
+		self.lockModel.acquire()
+		self.statsXX = statsXX
+		self.statsXy = statsXy
+		self.dailyMaxProduction = dailyMaxProduction
+		self.lastSample = time - self.regressionTimeBase
+		self.lockModel.release()
+
+		self.solveModel()
+		self.training = False
+
+	def addSample(self, time):
+		if time - self.lastSample < self.regressionTimeBase:
+			return
+		self.lastSample = time - (time % self.regressionTimeBase)
+
+		try:
+			y = complex(self.devData['consumption'][self.devData['commodities'][0]]).real
+			ghi = float(self.zGet(self.sun, 'irradiationGHI'))
+			dni = float(self.zGet(self.sun, 'irradiationDNI'))
+		except:
+			return # no data yet
+
+		b = int( ( time % 86400 ) / self.binSize )
+		x = np.array([1.0, ghi, dni])
+
+		self.lockModel.acquire()
+		self.statsXX[b] += np.outer(x, x)
+		self.statsXy[b] += y * x
+		self.dailyMaxProduction[-1][b] = min(self.dailyMaxProduction[-1][b], y)
+		self.lockModel.release()
+
+	def updateModel(self):
+		# Daily update: forget a bit of the past, start a new day for the maximum production and solve
+		self.lastModelTraining = self.host.time()
+
+		self.lockModel.acquire()
+		self.statsXX *= self.forgetting
+		self.statsXy *= self.forgetting
+		self.dailyMaxProduction = np.roll(self.dailyMaxProduction, -1, axis=0)
+		self.dailyMaxProduction[-1] = 0.0
+		self.lockModel.release()
+
+		self.solveModel()
+		self.training = False
+
+	def solveModel(self):
+		# Ordinary least squares with intercept for each bin, equivalent to the sklearn LinearRegression used before
+		# Only the coefficients are used in the prediction, the intercept is dropped as in the original model
+		self.lockModel.acquire()
+		model = []
+		for b in range(0, self.bins):
+			n = self.statsXX[b][0][0]
+			meanX = self.statsXX[b][0][1:] / n
+			meanY = self.statsXy[b][0] / n
+
+			# Centered statistics
+			Sxx = self.statsXX[b][1:, 1:] - n * np.outer(meanX, meanX)
+			Sxy = self.statsXy[b][1:] - n * meanX * meanY
+
+			coef = np.linalg.lstsq(Sxx, Sxy, rcond=None)[0]
+			model.append([float(c) for c in coef])
+
+		self.model = model
+		self.maxProduction = [float(v) for v in self.dailyMaxProduction.min(axis=0)]
+		self.lockModel.release()
+
 	def predictProduction(self, sunData, startTime, endTime):
 		result = []
 
@@ -180,3 +319,18 @@ class LivePvCtrl(LoadCtrl):
 		self.lockModel.release()
 
 		return result
+
+	def predictProductionArrays(self, sunForecast, startTime, endTime):
+		times = np.arange(startTime, endTime, self.timeBase)
+		b = ((times % 86400) // self.binSize).astype(int)
+		ghi = np.nan_to_num(sunForecast['GHI'][:len(times)])
+		dni = np.nan_to_num(sunForecast['DNI'][:len(times)])
+		b = b[:len(ghi)]
+
+		self.lockModel.acquire()
+		model = np.array(self.model)
+		maxProduction = np.array(self.maxProduction)
+		self.lockModel.release()
+
+		result = np.minimum(0, np.maximum(ghi*model[b, 0] + dni*model[b, 1], maxProduction[b]))
+		return result.tolist()
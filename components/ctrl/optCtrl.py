@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from core.entity import Entity
+from util.planBuffer import PlanBuffer
 
 import numpy as np
 import math
@@ -41,6 +42,7 @@ class OptCtrl(Entity):
         self.plan = {}
         self.realized = {}
         self.planningTimestamp = -1
+        self.usePlanBuffer = True  # Store plan and realized profiles in ring buffers (PlanBuffer) instead of dicts
 
         self.planningWinners = []
         self.lastPlannedTime = -1  # Holds the start time of the last planned block
@@ -141,33 +143,39 @@ class OptCtrl(Entity):
                                 result[c][t] += data[c][t]
                             else:
                                 result[c][t] = data[c][t]
-            self.realized = copy.deepcopy(result)
+            self.realized = {}
+            for c in result:
+                self.realized[c] = self.createPlanStore(result[c])
 
         # Perform forward logging to track the results
         if self.forwardLogging and self.host.logControllers:
             for c in signal.commodities:
+                plan = self.readPlanRange(self.plan[c], signal.time, signal.timeBase, signal.planHorizon)
+                if self.useEventControl:
+                    realized = self.readPlanRange(self.realized[c], signal.time, signal.timeBase, signal.planHorizon)
+
                 for i in range(0, signal.planHorizon):
 
                     self.logValue("plan.POW",  # "W-power.plan.real.c."+c
-                                  self.plan[c][int(signal.time + i * signal.timeBase)].real,
+                                  plan[i].real,
                                   int(signal.time + i * signal.timeBase),
                                   tags={"CTYPE": str(c).lower()})
                     if self.host.extendedLogging:
                         self.logValue("plan.POW_REAC",  # "W-power.plan.imag.c."+c
-                                      self.plan[c][int(signal.time + i * signal.timeBase)].imag,
+                                      plan[i].imag,
                                       int(signal.time + i * signal.timeBase),
                                       tags={"CTYPE": str(c).lower()}
                                       )
 
                     if self.useEventControl:
                         self.logValue("realized.POW",  # "W-power.realized.real.c." + c
-                                      self.realized[c][int(signal.time + i * signal.timeBase)].real,
+                                      realized[i].real,
                                       int(signal.time + i * signal.timeBase),
                                       tags={"CTYPE": str(c).lower()}
                                       )
                         if self.host.extendedLogging:
                             self.logValue("realized.POW_REAC",  # "W-power.realized.imag.c." + c
-                                          self.realized[c][int(signal.time + i * signal.timeBase)].imag,
+                                          realized[i].imag,
                                           int(signal.time + i * signal.timeBase),
                                           tags={"CTYPE": str(c).lower()}
                                           )
@@ -203,21 +211,19 @@ class OptCtrl(Entity):
         # Create timestamped plan (FIXME to be removed with the new library)
         for c in self.commodities:
             if c not in self.plan:
-                self.plan[c] = {}
-
-            for i in range(0, len(self.planning[c])):
-                t = int((time - time % timeBase) + i * timeBase)
-                self.plan[c][t] = self.planning[c][i]
+                self.plan[c] = self.createPlanStore()
 
-                if self.forwardLogging and self.host.logControllers:
+            self.writePlanRange(self.plan[c], time - time % timeBase, timeBase, self.planning[c])
 
+            if self.forwardLogging and self.host.logControllers:
+                for i in range(0, len(self.planning[c])):
                     self.logValue("plan.POW",  # "W-power.plan.real.c."+c
-                                  self.plan[c][int(time + i * self.timeBase)].real,
+                                  self.planning[c][i].real,
                                   int(time + i * timeBase),
                                   tags={"CTYPE": str(c).lower()})
                     if self.host.extendedLogging:
                         self.logValue("plan.POW_REAC",  # "W-power.plan.imag.c."+c
-                                      self.plan[c][int(time + i * self.timeBase)].imag,
+                                      self.planning[c][i].imag,
                                       int(time + i * timeBase),
                                       tags={"CTYPE": str(c).lower()}
                                       )
@@ -251,6 +257,17 @@ class OptCtrl(Entity):
         self.zCall(self.children, 'resetPlanning', list(parents))
 
     def prunePlan(self):
+        if self.usePlanBuffer:
+            # Ring buffers are pruned by advancing their base
+            for store in [self.plan, self.realized]:
+                for c in self.commodities:
+                    if isinstance(store.get(c, None), PlanBuffer):
+                        store[c].prune(self.host.time() - self.timeBase)
+                    elif c in store:
+                        store[c] = self.createPlanStore(store[c])
+                        store[c].prune(self.host.time() - self.timeBase)
+            return
+
         try:
             for c in self.commodities:
                 l = list(self.plan[c].keys())
@@ -274,6 +291,9 @@ class OptCtrl(Entity):
             pass  # dict not filled yet, nothing to clean
 
     # Helper functions
+    def getCommodities(self):
+        return list(self.commodities)
+
     def calculateImprovement(self, desired, old, new, norm=2):
         improvement = 0
         commodities = self.commodityIntersection(old.keys(), desired.keys())
@@ -290,47 +310,34 @@ class OptCtrl(Entity):
         improvement = 0
         commodities = new.keys()
 
-        penaltyOld = {}
-        penaltyNew = {}
         for c in commodities:
-            penaltyOld[c] = []
-            penaltyNew[c] = []
+            penaltyOld = np.zeros(0)
+            penaltyNew = np.zeros(0)
 
-            # First check the upperbounds
             if c in old and (c in upperBounds or c in lowerBounds):
-                # Determine the penalty for old on upperbound
-                penaltyOld[c] = [0] * len(old[c])
-                penaltyNew[c] = [0] * len(new[c])
-
-            if c in old and c in upperBounds:
-                # We expect things to be aligned
-                assert (len(old[c]) == len(new[c]) == len(upperBounds[c]))
-
-                for i in range(0, len(old[c])):
-                    if old[c][i].real > upperBounds[c][i].real + old[c][i].real:
-                        penaltyOld[c][i] = abs(old[c][i].real - (upperBounds[c][i].real + old[c][i].real))
-
-                # Determine the penalty for new on upperbound:
-                for i in range(0, len(new[c])):
-                    if new[c][i].real > upperBounds[c][i].real + old[c][i].real:
-                        penaltyNew[c][i] = abs(new[c][i].real - (upperBounds[c][i].real + old[c][i].real))
-
-            # Now the lowerBounds
-            if c in old and c in lowerBounds:
-                assert (len(old[c]) == len(new[c]) == len(lowerBounds[c]))
-
-                # Determine the penalty for old on upperbound
-                for i in range(0, len(old[c])):
-                    if old[c][i].real < lowerBounds[c][i].real + old[c][i].real:
-                        penaltyOld[c][i] = abs(old[c][i].real - (lowerBounds[c][i].real + old[c][i].real))
-
-                # Determine the penalty for new on upperbound:
-                for i in range(0, len(new[c])):
-                    if new[c][i].real < lowerBounds[c][i].real + old[c][i].real:
-                        penaltyNew[c][i] = abs(new[c][i].real - (lowerBounds[c][i].real + old[c][i].real))
-
-            a = np.linalg.norm(np.array(penaltyOld[c]), ord=norm)
-            b = np.linalg.norm(np.array(penaltyNew[c]), ord=norm)
+                o = np.real(old[c])
+                n = np.real(new[c])
+                penaltyOld = np.zeros(len(o))
+                penaltyNew = np.zeros(len(n))
+
+                # The bounds are relative to the old profile
+                # First check the upperbounds
+                if c in upperBounds:
+                    # We expect things to be aligned
+                    assert (len(old[c]) == len(new[c]) == len(upperBounds[c]))
+                    bound = np.real(upperBounds[c]) + o
+                    penaltyOld = np.where(o > bound, np.abs(o - bound), penaltyOld)
+                    penaltyNew = np.where(n > bound, np.abs(n - bound), penaltyNew)
+
+                # Now the lowerBounds, which take precedence
+                if c in lowerBounds:
+                    assert (len(old[c]) == len(new[c]) == len(lowerBounds[c]))
+                    bound = np.real(lowerBounds[c]) + o
+                    penaltyOld = np.where(o < bound, np.abs(o - bound), penaltyOld)
+                    penaltyNew = np.where(n < bound, np.abs(n - bound), penaltyNew)
+
+            a = np.linalg.norm(penaltyOld, ord=norm)
+            b = np.linalg.norm(penaltyNew, ord=norm)
 
             try:
                 improvement += self.weights[c] * (a - b)
@@ -359,6 +366,27 @@ class OptCtrl(Entity):
                 r[c] = [complex(0.0, 0.0)] * length
         return r
 
+    def createPlanStore(self, data=None, timeBase=None):
+        # Storage of a timestamped plan or realized profile of a single commodity
+        if self.usePlanBuffer:
+            return PlanBuffer(self.timeBase if timeBase is None else timeBase, data=data)
+        return {} if data is None else dict(data)
+
+    def readPlanRange(self, store, time, timeBase, n, default=0j):
+        # Values of n consecutive intervals as a list, missing intervals are default
+        if isinstance(store, PlanBuffer) and timeBase == store.timeBase:
+            return store.range(int(time), n, default)
+        return [store.get(int(time + i * timeBase), default) for i in range(0, n)]
+
+    def writePlanRange(self, store, time, timeBase, values):
+        # Stores values of consecutive intervals, None values are skipped
+        if isinstance(store, PlanBuffer) and timeBase == store.timeBase and None not in values:
+            store.setRange(int(time), values)
+        else:
+            for i in range(0, len(values)):
+                if values[i] is not None:
+                    store[int(time + i * timeBase)] = values[i]
+
     # Getters
     def getPlan(self, time, commodity):
         result = 0
@@ -419,7 +447,7 @@ class OptCtrl(Entity):
         print("this function must be overridden")
         assert (False)
 
-    def requestIncentive(self, timestamp):
+    def requestIncentive(self, timestamp, horizonEnd=None):
         print("this function must be overridden")
         assert (False)
 
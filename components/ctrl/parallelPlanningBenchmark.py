@@ -0,0 +1,98 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Benchmark of parallel planning of sibling subtrees (GroupCtrl.parallelPlanning), but not a unit test!
+# Simulates one day of a street with profile steering, where each house has a number of batteries and EVs.
+# The street is planned sequentially, and in parallel with different numbers of worker processes (Core.planningWorkers).
+# The results of parallel planning must not depend on the number of workers.
+# Run from the components folder with the components and conf folders on the PYTHONPATH
+
+import os
+import random
+import time
+
+from hosts.simHost import SimHost
+from dev.bufDev import BufDev
+from dev.btsDev import BtsDev
+from ctrl.bufCtrl import BufCtrl
+from ctrl.btsCtrl import BtsCtrl
+from ctrl.groupCtrl import GroupCtrl
+
+houses = 8
+devicesPerHouse = 10
+startTime = 1675033200	# Aligned with the day start in UTC
+
+def run(parallel, workers):
+	random.seed(42)
+
+	sim = SimHost()
+	sim.timeBase = 60
+	sim.startTime = startTime
+	sim.timeOffset = 0
+	sim.intervals = 24*60
+	sim.writeData = False
+	sim.enableDebug = False
+	sim.planningWorkers = workers
+	sim.shutdown = lambda: None		# SimHost.shutdown() exits the interpreter
+
+	root = GroupCtrl("StreetController", sim)
+	root.useEventControl = False
+	root.planHorizon = 192
+	root.planInterval = 96
+	root.maxIters = 8
+	root.parallelPlanning = parallel
+
+	for h in range(0, houses):
+		house = GroupCtrl("HouseController-" + str(h), sim, root)
+		house.useEventControl = False
+		house.planHorizon = 192
+		house.planInterval = 96
+		house.maxIters = 8
+
+		for d in range(0, devicesPerHouse):
+			if d % 2 == 0:
+				buf = BufDev("Battery-" + str(h) + "-" + str(d), sim)
+				buf.capacity = random.randint(5000, 15000)
+				buf.chargingPowers = [-3700, 3700]
+				buf.soc = buf.capacity / 2
+				BufCtrl("BatteryController-" + str(h) + "-" + str(d), buf, house, sim)
+			else:
+				ev = BtsDev("EV-" + str(h) + "-" + str(d), sim)
+				ev.capacity = 40000
+				ev.chargingPowers = [0, 11000]
+				ev.discrete = False
+				t = startTime + random.randint(16, 19) * 3600
+				ev.addJob(t, t + random.randint(10, 14) * 3600, random.randint(5000, 20000))
+				BtsCtrl("EVController-" + str(h) + "-" + str(d), ev, house, sim)
+
+	start = time.time()
+	sim.startSimulation()
+	duration = time.time() - start
+	if sim.planWorkers is not None:
+		sim.planWorkers.stop()
+
+	plan = dict(root.plan["ELECTRICITY"])
+	return (duration, plan)
+
+(sequentialDuration, sequential) = run(False, 0)
+print("CPUs:", os.cpu_count())
+print("%-24s simulation %6.1f s" % ("sequential", sequentialDuration))
+
+reference = None
+for workers in [0, 1, 2, 4]:
+	(duration, plan) = run(True, workers)
+	if reference is None:
+		reference = plan
+	print("%-24s simulation %6.1f s, equal to 0 workers: %s" % ("parallel, " + str(workers) + " workers", duration, plan == reference))
@@ -100,9 +100,9 @@ class ThermalUncontrollableCtrl(ThermalBufConvCtrl):
 			devPlan = []
 
 			if c not in self.realized:
-				self.realized[c] = {}
+				self.realized[c] = self.createPlanStore()
 			if c not in self.plan:
-				self.plan[c] = {}
+				self.plan[c] = self.createPlanStore()
 
 			for i in range(0,  len(plan[c])):
 				#create the local plan for the device.
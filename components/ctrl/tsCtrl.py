@@ -76,7 +76,7 @@ class TsCtrl(DevCtrl):
 		if self.useEventControl:
 			for c in self.commodities:
 				if c not in self.realized:
-					self.realized[c] = {}
+					self.realized[c] = self.createPlanStore()
 				for i in range(0,  signal.planHorizon):
 					t = int((signal.time - (signal.time%signal.timeBase)) +i*self.timeBase)
 					if t in self.realized[c]:
@@ -151,6 +151,14 @@ class TsCtrl(DevCtrl):
 		#Send back our profile to the controller
 		self.zCall(self.parent, 'updateRealized', copy.deepcopy(profileResult))
 
+	def eventHorizon(self, time):
+		# Event planning only schedules the current job, which must be finished at its deadline
+		self.updateDeviceProperties()
+		if 'endTime' not in self.devData['currentJob']:
+			return None
+
+		return max(time + 1, self.devData['currentJob']['endTime'])
+
 	def doJobPlanning(self, signal, job, weight, profileResult, devData=None):
 		assert(len(self.commodities)==1)
 		self.updateDeviceProperties()
@@ -70,13 +70,11 @@ class VirtualBufCtrl(GroupCtrl):
 		result['profile'] = copy.deepcopy(self.candidatePlanning[self.name])
 		s = copy.deepcopy(signal)
 
-		# FIXME congestionpoints should have the option to provide a vector of bounds instead. T211
 		if self.congestionPoint is not None and not self.allowDiscomfort: # DOn't know the usage of the latter part
 			for c in self.commodities:
-				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c]):
+				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c], s.time, s.timeBase):
 					# Adapt the steering signal to steer towards a feasible solution
-					for i in range(0, len(s.desired[c])):
-						s.desired[c][i] = max(self.congestionPoint.getLowerLimit(c).real, min(s.desired[c][i].real, self.congestionPoint.getUpperLimit(c).real))
+					s.desired[c] = self.clipToLimits(c, s.desired[c], s.time, s.timeBase)
 
 		# Perform a normal planning with bounds imposed when applicable
 		if self.parent is None:
@@ -86,11 +84,10 @@ class VirtualBufCtrl(GroupCtrl):
 		if self.congestionPoint is not None and not self.strictComfort: # and not self.allowDiscomfort
 			withinLimits = True
 			for c in self.commodities:
-				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c]):
+				if not self.checkBoundViolations(c, self.candidatePlanning[self.name][c], s.time, s.timeBase):
 					withinLimits = False
 					# Adapt the steering signal to steer towards a feasible solution
-					for i in range(0, len(s.desired[c])):
-						s.desired[c][i] = max(self.congestionPoint.getLowerLimit(c).real, min(s.desired[c][i].real, self.congestionPoint.getUpperLimit(c).real))
+					s.desired[c] = self.clipToLimits(c, s.desired[c], s.time, s.timeBase)
 
 			if not withinLimits:
 				s = copy.deepcopy(signal)
@@ -153,6 +150,12 @@ class VirtualBufCtrl(GroupCtrl):
 
 		signal = copy.deepcopy(signal)
 
+		# The limits of the congestion point combined with the limits of the parent are the same in all iterations
+		limits = {}
+		if self.congestionPoint is not None:
+			for c in self.commodities:
+				limits[c] = self.combinedLimits(c, signal)
+
 		#####################################
 		#  Iterative Profile Steering algorithm
 		#####################################
@@ -176,30 +179,11 @@ class VirtualBufCtrl(GroupCtrl):
 				s.desired[c] = list(np.array(s.desired[c]) - np.array(iterationPlanning[c]))
 
 				# Determining the sctricter bounds
-				if self.congestionPoint is not None:
-					ub = {}
-					lb = {}
-					if self.congestionPoint.hasLowerLimit(c):
-						lb[c] = list(np.array(([self.congestionPoint.getLowerLimit(c)] * s.planHorizon)))
-					if self.congestionPoint.hasUpperLimit(c):
-						ub[c] = list(np.array(([self.congestionPoint.getUpperLimit(c)] * s.planHorizon)))
-
-					if self.congestionPoint.hasLowerLimit(c):
-						if c in signal.lowerLimits and len(signal.lowerLimits[c]) == signal.planHorizon:
-							for j in range(0, signal.planHorizon):
-								s.lowerLimits[c][j] = complex(min(ub[c][j].real, max(lb[c][j].real, signal.lowerLimits[c][j].real)), min(ub[c][j].imag, max(lb[c][j].imag, signal.lowerLimits[c][j].imag)))
-						else:
-							s.lowerLimits[c] = list(lb[c])
-
-					if self.congestionPoint.hasUpperLimit(c):
-						if c in signal.upperLimits and len(signal.upperLimits[c]) == signal.planHorizon:
-							for j in range(0, signal.planHorizon):
-								s.upperLimits[c][j] = complex(max(lb[c][j].real, min(ub[c][j].real, signal.upperLimits[c][j].real)), max(lb[c][j].imag, min(ub[c][j].imag, signal.upperLimits[c][j].imag)))
-						else:
-							s.upperLimits[c] = list(ub[c])
-
-
-
+				if c in limits:
+					if limits[c][0] is not None:
+						s.lowerLimits[c] = list(limits[c][0])
+					if limits[c][1] is not None:
+						s.upperLimits[c] = list(limits[c][1])
 
 				# Determining the steering signals that should be sent to the children.
 				if simultaneousCommits > 0:
@@ -207,12 +191,10 @@ class VirtualBufCtrl(GroupCtrl):
 						s.desired[c][j] = (s.desired[c][j] / simultaneousCommits)
 
 					if c in s.upperLimits and len(s.upperLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.upperLimits[c])):
-							s.upperLimits[c][j] = (s.upperLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+						s.upperLimits[c] = self.headroom(s.upperLimits[c], iterationPlanning[c], simultaneousCommits)
 
 					if c in s.lowerLimits and len(s.lowerLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.lowerLimits[c])):
-							s.lowerLimits[c][j] = (s.lowerLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+						s.lowerLimits[c] = self.headroom(s.lowerLimits[c], iterationPlanning[c], simultaneousCommits)
 
 			improvements = {}
 			boundImprovements = {}
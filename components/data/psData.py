@@ -164,4 +164,197 @@ class PSData():
 			return r
 		else:
 			return []
-				
\ No newline at end of file
+				
+
+# Array-backed variant of PSData
+# The profiles (desired, prices, limits and ADMM vectors) of all commodities are packed in a single contiguous,
+# read-only complex numpy block. Copies share this block, such that copy.deepcopy() of a signal at every level of the
+# controller tree does not copy the profiles anymore. A profile is only copied when it is accessed through the dict
+# interface (e.g. s.desired[c]), which returns a list with the same element types as PSData, so controllers can
+# modify it freely (copy-on-write). Array aware code can use s.desired.view(c) to obtain a read-only array without copying.
+# When pickled with protocol 5, as done by the ZeroMQ layer, the block is sent as a single out-of-band buffer.
+
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+profileFields = ['desired', 'profile', 'prices', 'upperLimits', 'lowerLimits', 'averageProfile', 'scaledLagrangian']
+
+def profileKind(value):
+	# Determines how a profile is stored in the block, None if it cannot be stored
+	if isinstance(value, np.ndarray):
+		if value.ndim == 1 and value.dtype.kind == 'c':
+			return 'a'	# complex array
+		if value.ndim == 1 and value.dtype.kind == 'f':
+			return 'r'	# real array
+	elif isinstance(value, list):
+		types = set(map(type, value))
+		if len(types) == 0 or types == {complex}:
+			return 'c'	# list of complex
+		if types == {float}:
+			return 'f'	# list of float
+		if types == {np.complex128}:
+			return 'C'	# list of numpy complex
+		if types == {np.float64}:
+			return 'F'	# list of numpy float
+	return None
+
+def packProfiles(maps):
+	# Packs the profiles of several mappings into a single block
+	# Returns a ProfileMap sharing the block for each mapping
+	parts = []
+	indices = []
+	privates = []
+	offset = 0
+	for m in maps:
+		index = {}
+		private = {}
+		if isinstance(m, ProfileMap):
+			for (c, (o, n, kind)) in m.index.items():
+				parts.append(m.block[o:o + n])
+				index[c] = (offset, n, kind)
+				offset += n
+			entries = m.private.items()
+		else:
+			entries = m.items()
+
+		for (c, v) in entries:
+			kind = profileKind(v)
+			if kind is None:
+				private[c] = cp.deepcopy(v)
+			else:
+				parts.append(np.asarray(v, dtype=complex))
+				index[c] = (offset, len(v), kind)
+				offset += len(v)
+
+		indices.append(index)
+		privates.append(private)
+
+	block = np.concatenate(parts) if len(parts) > 0 else np.zeros(0, dtype=complex)
+	block.flags.writeable = False
+
+	result = []
+	for i in range(0, len(maps)):
+		result.append(ProfileMap(block, indices[i], privates[i], list(maps[i])))
+	return result
+
+
+class ProfileMap(MutableMapping):
+	def __init__(self, block=None, index=None, private=None, order=None):
+		self.block = block											# Shared read-only block
+		self.index = {} if index is None else index					# c -> (offset, length, kind) of profiles in the block
+		self.private = {} if private is None else private			# Profiles owned by this mapping
+		if order is None:
+			order = list(self.index) + [c for c in self.private if c not in self.index]
+		self.order = order											# Keys in insertion order, as a dict, independent of copies on access
+
+	def __getitem__(self, c):
+		if c in self.private:
+			return self.private[c]
+
+		# Copy on first access, the block is never modified
+		(o, n, kind) = self.index.pop(c)
+		a = self.block[o:o + n]
+		if kind == 'c':
+			v = a.tolist()
+		elif kind == 'f':
+			v = a.real.tolist()
+		elif kind == 'C':
+			v = list(a)
+		elif kind == 'F':
+			v = list(a.real)
+		elif kind == 'a':
+			v = a.copy()
+		else:
+			v = a.real.copy()
+		self.private[c] = v
+		return v
+
+	def view(self, c):
+		# Read-only array of the profile, without copying it if it was not modified
+		if c in self.index:
+			(o, n, kind) = self.index[c]
+			if kind in ['f', 'F', 'r']:
+				return self.block[o:o + n].real
+			return self.block[o:o + n]
+		return np.asarray(self.private[c])
+
+	def __setitem__(self, c, value):
+		if c not in self:
+			self.order.append(c)
+		self.index.pop(c, None)
+		self.private[c] = value
+
+	def __delitem__(self, c):
+		if c in self.index:
+			del self.index[c]
+		else:
+			del self.private[c]
+		self.order.remove(c)
+
+	def __contains__(self, c):
+		return c in self.index or c in self.private
+
+	def __iter__(self):
+		return iter(list(self.order))
+
+	def __len__(self):
+		return len(self.order)
+
+	def __repr__(self):
+		return repr(dict(self.items()))
+
+	def __copy__(self):
+		return self.__deepcopy__({})
+
+	def copy(self):
+		# As dict.copy(), used by controllers that copy the profiles of a signal
+		return self.__copy__()
+
+	def __deepcopy__(self, memo):
+		# The block is shared, only modified profiles are copied
+		result = ProfileMap(self.block, dict(self.index), {}, list(self.order))
+		for (c, v) in self.private.items():
+			result.private[c] = v.copy() if isinstance(v, np.ndarray) else cp.deepcopy(v, memo)
+		memo[id(self)] = result
+		return result
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		if self.block is not None and self.block.flags.writeable:
+			self.block.flags.writeable = False
+
+
+class ArrayPSData(PSData):
+	def __init__(self, other = None):
+		PSData.__init__(self, other)
+		if other is None:
+			self.pack()
+
+	def copy(self, other):
+		PSData.copy(self, other)
+		self.profile = cp.deepcopy(other.profile)
+		self.pack()
+
+	def pack(self):
+		# Places all profiles in a single block
+		fields = [f for f in profileFields if isinstance(getattr(self, f, None), Mapping)]
+		maps = packProfiles([getattr(self, f) for f in fields])
+		for i in range(0, len(fields)):
+			setattr(self, fields[i], maps[i])
+
+	def __deepcopy__(self, memo):
+		result = ArrayPSData.__new__(ArrayPSData)
+		memo[id(self)] = result
+		for (k, v) in self.__dict__.items():
+			result.__dict__[k] = cp.deepcopy(v, memo)
+		return result
+
+	def __getstate__(self):
+		# Pickle a packed copy, such that protocol 5 sends all profiles as a single out-of-band buffer
+		state = dict(self.__dict__)
+		fields = [f for f in profileFields if isinstance(state.get(f, None), Mapping)]
+		maps = packProfiles([state[f] for f in fields])
+		for i in range(0, len(fields)):
+			state[fields[i]] = maps[i]
+		return state
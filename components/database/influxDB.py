@@ -22,6 +22,8 @@ import threading
 import copy
 import json
 
+from database.influxWriter import InfluxWriter
+
 class InfluxDB():
 	def __init__(self, host):
 		self.processtime = 0
@@ -37,7 +39,14 @@ class InfluxDB():
 		self.password = demCfg['db']['influx']['password']
 		self.token = demCfg['db']['influx']['token']
 		self.org = demCfg['db']['influx']['org']
-		self.org_id = self._influxdb_get_org_id_by_name()
+
+		# The handshake with the database (organization lookup, bucket creation) is deferred until the first write,
+		# such that hosts that never write do not pay for it
+		self.deferHandshake = True
+		self.orgId = None
+		self.orgResolved = False
+		self.databasePending = False
+		self.handshakeLock = threading.Lock()
 
 		self.data = []
 		self.maxBuffer = 100000
@@ -56,6 +65,22 @@ class InfluxDB():
 
 		self.restoring = threading.Lock()
 
+		# Asynchronous writer with a bounded queue, see database/influxWriter.py
+		# Data is handed over when batchSize lines are buffered or maxLatency seconds passed since the last hand over
+		# Used by default in live operation, where database I/O should never stall a tick
+		self.useWriter = getattr(host, 'liveOperation', False)
+		self.batchSize = 5000
+		self.maxLatency = 1.0
+		self.writer = None
+		self.lastSubmit = tm.time()
+
+	@property
+	def org_id(self):
+		if not self.orgResolved:
+			self.orgId = self._influxdb_get_org_id_by_name()
+			self.orgResolved = True
+		return self.orgId
+
 	def appendValue(self,  measurement, tags,  values,  time, deltatime=0):
 		#create tags
 		tagstr = ""
@@ -96,6 +121,12 @@ class InfluxDB():
 		self.data.append(dataToBeAdded)
 
 	def writeData(self,  force = False):
+		if self.useWriter:
+			# Writing never blocks, force is handled through maxLatency to keep batches of a reasonable size
+			if len(self.data) >= self.batchSize or (len(self.data) > 0 and tm.time() - self.lastSubmit >= self.maxLatency):
+				self.submitData()
+			return
+
 		if len(self.data) > self.maxBuffer or force:
 			# Make a copy and clear
 
@@ -113,10 +144,38 @@ class InfluxDB():
 				self.threadCountLock.release()
 
 
+	def submitData(self):
+		if self.writer is None:
+			self.writer = InfluxWriter(self, self.host)
+
+		d = self.data
+		self.data = []
+		self.lastSubmit = tm.time()
+
+		if self.storeBackup:
+			self.writeTextFile(d)
+		self.writer.submit(d)
+
+	# Write all buffered data, waiting at most timeout seconds for the writer
+	def flush(self, timeout=30.0):
+		if self.useWriter:
+			if len(self.data) > 0:
+				self.submitData()
+			if self.writer is not None:
+				self.writer.flush(timeout)
+				self.writer.stop(timeout)
+		else:
+			self.writeData(True)
+
+	def writerMetrics(self):
+		if self.writer is None:
+			return {}
+		return self.writer.metrics()
+
 	def writeDataThread(self, data):
 		success = self.writeToDatabase(data)
 		if not success or self.storeBackup:
-			self.writeTextFile()
+			self.writeTextFile(data)
 			if not success:
 				self.errorFlag = True
 
@@ -137,7 +196,12 @@ class InfluxDB():
 
 		# self.host.logMsg(f"[InfluxDB] Writing to database {self.database}")
 
-		toSend = ("\n".join(data) + "\n")
+		if isinstance(data, str):
+			toSend = data
+		else:
+			toSend = ("\n".join(data) + "\n")
+
+		self.ensureDatabase()
 
 		try:
 
@@ -204,7 +268,22 @@ class InfluxDB():
 		self.createDatabase()
 
 	def createDatabase(self):
-
+		if self.deferHandshake:
+			# Created before the first write, see ensureDatabase()
+			self.databasePending = True
+			return
+
+		self.createDatabaseNow()
+
+	def ensureDatabase(self):
+		if self.databasePending:
+			self.handshakeLock.acquire()
+			if self.databasePending:
+				self.databasePending = False
+				self.createDatabaseNow()
+			self.handshakeLock.release()
+
+	def createDatabaseNow(self):
 		try:
 
 			# OLD code for influxdb 1x
@@ -277,7 +356,7 @@ class InfluxDB():
 			self.host.logWarning(f"[InfluxDB] Failed to retrieve bucket ID: {response.status_code} - {response.text}")
 			return None
 
-	def writeTextFile(self):
+	def writeTextFile(self, data):
 		# Writing into files based on the date, YYYYMMDD:
 		name = self.host.timeObject().astimezone(demCfg['timezone']).strftime("%Y%m%d")
 		self.filename = self.filepath+name+'.dem'
@@ -285,7 +364,7 @@ class InfluxDB():
 		try:
 			os.makedirs(os.path.dirname(self.filename), exist_ok=True)
 			f = open(self.filename, 'a')
-			f.write(self.data)
+			f.write("\n".join(data) + "\n")
 			f.close()
 		except:
 			self.host.logWarning("[InfluxDB] Could not find or create backup file: "+self.filename)
@@ -0,0 +1,239 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import requests
+import time as tm
+import os
+import gzip
+import struct
+import queue
+import threading
+
+# Asynchronous writer for the InfluxDB class
+# Batches of line protocol are serialized and gzip compressed by the caller and put in a bounded queue.
+# A single long-lived writer thread sends the chunks over a persistent HTTP session, retrying with exponential backoff.
+# Chunks that cannot be written (queue full or database unavailable) are appended to a spill file on disk.
+# Spilled chunks are replayed in order once the database is available again. While data is spilled, new chunks are
+# appended to the spill as well, such that the order is maintained. Submitting never blocks the caller.
+# NOTE: Resending a chunk is harmless, as InfluxDB overwrites points with the same series and timestamp
+class InfluxWriter():
+	def __init__(self, db, host):
+		self.db = db
+		self.host = host
+
+		# Settings
+		self.maxQueueSize = 64			# Maximum number of chunks waiting to be written
+		self.compressionLevel = 1		# Fast gzip compression, line protocol compresses well anyway
+		self.timeout = 5.0				# HTTP timeout in seconds
+		self.maxRetries = 3				# Retries before a chunk is spilled to disk
+		self.backoffInitial = 0.5		# Seconds, doubled on each consecutive failure
+		self.backoffMax = 60.0
+		self.spillPath = db.filepath + "spill/"
+
+		self.queue = queue.Queue(maxsize=self.maxQueueSize)
+		self.session = requests.Session()
+
+		self.spillLock = threading.Lock()
+		self.spillFile = self.spillPath + "spill.dem.gz"
+		self.spillPending = os.path.isdir(self.spillPath) and len(os.listdir(self.spillPath)) > 0
+		self.backoff = 0.0
+		self.nextAttempt = 0.0
+
+		# Metrics
+		self.submittedChunks = 0
+		self.writtenChunks = 0
+		self.spilledChunks = 0
+		self.replayedChunks = 0
+		self.failedWrites = 0
+		self.lastLatency = 0.0			# Seconds of the last successful write
+		self.avgLatency = 0.0			# Exponentially weighted average of the write latency
+
+		self.thread = None
+		self.running = False
+
+	def start(self):
+		if self.thread is None:
+			self.running = True
+			self.thread = threading.Thread(target=self.run, name="InfluxWriter", daemon=True)
+			self.thread.start()
+
+	def stop(self, timeout=None):
+		# Write all queued chunks and stop the writer thread
+		if self.thread is not None:
+			self.running = False
+			self.queue.put(None)
+			self.thread.join(timeout)
+			self.thread = None
+
+	def submit(self, lines):
+		# Serialize and compress a batch of lines, never blocks
+		chunk = gzip.compress(("\n".join(lines) + "\n").encode('utf-8'), self.compressionLevel)
+		self.submittedChunks += 1
+
+		if self.thread is None:
+			self.start()
+
+		try:
+			self.queue.put_nowait(chunk)
+		except queue.Full:
+			# Backpressure: the database cannot keep up, keep the data on disk instead of stalling
+			self.spill(chunk)
+
+	def flush(self, timeout=None):
+		# Wait until all queued chunks are handled
+		start = tm.time()
+		while self.queue.unfinished_tasks > 0:
+			if timeout is not None and tm.time() - start > timeout:
+				return False
+			tm.sleep(0.01)
+		return True
+
+	def queueDepth(self):
+		return self.queue.qsize()
+
+	def metrics(self):
+		return {
+			'queueDepth': self.queueDepth(),
+			'submittedChunks': self.submittedChunks,
+			'writtenChunks': self.writtenChunks,
+			'spilledChunks': self.spilledChunks,
+			'replayedChunks': self.replayedChunks,
+			'failedWrites': self.failedWrites,
+			'lastLatency': self.lastLatency,
+			'avgLatency': self.avgLatency,
+			'spillPending': self.spillPending
+		}
+
+# Internal functions
+	def run(self):
+		while True:
+			try:
+				chunk = self.queue.get(timeout=self.backoffInitial)
+			except queue.Empty:
+				# Idle, a good moment to replay spilled data
+				if self.spillPending:
+					self.replay()
+				continue
+
+			try:
+				if chunk is None:
+					if not self.running:
+						break
+					continue
+
+				if self.spillPending:
+					# Maintain the order, first the spilled data
+					self.spill(chunk)
+					self.replay()
+				elif not self.sendWithRetries(chunk):
+					self.spill(chunk)
+			except Exception as e:
+				self.host.logWarning("[InfluxWriter] Unexpected error: " + str(e))
+			finally:
+				self.queue.task_done()
+
+	def sendWithRetries(self, chunk):
+		for i in range(0, self.maxRetries + 1):
+			if self.send(chunk):
+				self.backoff = 0.0
+				return True
+
+			self.backoff = min(self.backoffMax, max(self.backoffInitial, self.backoff * 2))
+			self.nextAttempt = tm.time() + self.backoff
+			if not self.running or i == self.maxRetries:
+				# Shutting down or giving up, do not keep the host waiting
+				break
+			tm.sleep(self.backoff)
+
+		return False
+
+	def send(self, chunk):
+		self.db.ensureDatabase()
+
+		url = f"http://{self.db.address}:{self.db.port}/api/v2/write?org={self.db.org}&bucket={self.db.database}"
+		headers = {
+			'Authorization': f'Token {self.db.token}',
+			'Content-Type': 'text/plain; charset=utf-8',
+			'Content-Encoding': 'gzip'
+		}
+
+		start = tm.time()
+		try:
+			r = self.session.post(url, headers=headers, data=chunk, timeout=self.timeout)
+			if r.status_code != 204:
+				self.host.logWarning("[InfluxWriter] Could not write to database. Errorcode: " + str(r.status_code) + "\t\t" + r.text)
+				self.failedWrites += 1
+				return False
+		except Exception as e:
+			self.host.logWarning(f"[InfluxWriter] Could not connect to database, is it running? - {url} - {str(e)}")
+			self.failedWrites += 1
+			return False
+
+		self.lastLatency = tm.time() - start
+		self.avgLatency = 0.9 * self.avgLatency + 0.1 * self.lastLatency if self.writtenChunks > 0 else self.lastLatency
+		self.writtenChunks += 1
+		return True
+
+	def spill(self, chunk):
+		# Append-only spill file with length prefixed chunks
+		self.spillLock.acquire()
+		try:
+			os.makedirs(self.spillPath, exist_ok=True)
+			with open(self.spillFile, 'ab') as f:
+				f.write(struct.pack('>Q', len(chunk)))
+				f.write(chunk)
+			self.spillPending = True
+			self.spilledChunks += 1
+		except Exception as e:
+			self.host.logWarning("[InfluxWriter] Could not spill data to disk: " + str(e))
+		finally:
+			self.spillLock.release()
+
+	def replay(self):
+		# Replay the spilled chunks in order, new spills go into a fresh file meanwhile
+		# Attempts are spaced by the backoff time while the database is unavailable
+		if tm.time() < self.nextAttempt:
+			return False
+
+		self.spillLock.acquire()
+		try:
+			if os.path.isfile(self.spillFile):
+				os.rename(self.spillFile, self.spillPath + "replay-" + "%020d" % tm.time_ns() + ".dem.gz")
+		finally:
+			self.spillLock.release()
+
+		files = sorted(f for f in os.listdir(self.spillPath) if f.startswith("replay-"))
+		for filename in files:
+			with open(self.spillPath + filename, 'rb') as f:
+				while True:
+					header = f.read(8)
+					if len(header) < 8:
+						break
+					chunk = f.read(struct.unpack('>Q', header)[0])
+
+					if not self.send(chunk):
+						# Try again later, chunks of this file that were written already will be written again
+						self.backoff = min(self.backoffMax, max(self.backoffInitial, self.backoff * 2))
+						self.nextAttempt = tm.time() + self.backoff
+						return False
+					self.replayedChunks += 1
+
+			os.remove(self.spillPath + filename)
+
+		self.backoff = 0.0
+		self.spillLock.acquire()
+		self.spillPending = os.path.isfile(self.spillFile)
+		self.spillLock.release()
+		return True
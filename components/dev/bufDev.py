@@ -397,8 +397,8 @@ class BufDev(Device):
 			for c in self.commodities:
 				target[c] = self.zCall(self.parent, 'getPlan', self.host.time(), c)
 				if self.congestionPoint is not None:
-					target[c] = complex(max(self.congestionPoint.getLowerLimit(c).real, min(target[c].real, self.congestionPoint.getUpperLimit(c).real)),
-										max(self.congestionPoint.getLowerLimit(c).imag, min(target[c].imag, self.congestionPoint.getUpperLimit(c).imag)))
+					target[c] = complex(max(self.congestionPoint.getLowerLimit(c, self.host.time()).real, min(target[c].real, self.congestionPoint.getUpperLimit(c, self.host.time()).real)),
+										max(self.congestionPoint.getLowerLimit(c, self.host.time()).imag, min(target[c].imag, self.congestionPoint.getUpperLimit(c, self.host.time()).imag)))
 			self.lockState.acquire()
 			
 		# No control, but a congestionpoint
@@ -406,20 +406,20 @@ class BufDev(Device):
 			self.lockState.acquire()
 			for c in self.commodities:
 				# Obey the congestion point limits if required
-				if load[c].real - self.consumption[c].real < self.congestionPoint.getLowerLimit(c).real:
-					target[c] = self.congestionPoint.getLowerLimit(c).real
-				elif load[c].real - self.consumption[c].real > self.congestionPoint.getUpperLimit(c).real:
-					target[c] = self.congestionPoint.getUpperLimit(c).real
+				if load[c].real - self.consumption[c].real < self.congestionPoint.getLowerLimit(c, self.host.time()).real:
+					target[c] = self.congestionPoint.getLowerLimit(c, self.host.time()).real
+				elif load[c].real - self.consumption[c].real > self.congestionPoint.getUpperLimit(c, self.host.time()).real:
+					target[c] = self.congestionPoint.getUpperLimit(c, self.host.time()).real
 
 				# Otherwise, try to bring the SoC to the middle (50%)
 				elif self.soc >= 0.51*self.capacity:
-					target[c] = max(self.congestionPoint.getLowerLimit(c).real, ((0.5*self.capacity - self.soc)*(3600/self.timeBase) + load[c] - self.consumption[c]).real)
+					target[c] = max(self.congestionPoint.getLowerLimit(c, self.host.time()).real, ((0.5*self.capacity - self.soc)*(3600/self.timeBase) + load[c] - self.consumption[c]).real)
 				elif  self.soc <= 0.49*self.capacity:
-					target[c] = min(self.congestionPoint.getUpperLimit(c).real, ((0.5*self.capacity - self.soc)*(3600/self.timeBase) + load[c] - self.consumption[c]).real)
+					target[c] = min(self.congestionPoint.getUpperLimit(c, self.host.time()).real, ((0.5*self.capacity - self.soc)*(3600/self.timeBase) + load[c] - self.consumption[c]).real)
 				else:
 					# In the other case, we will do nothing and stay at the 50% SoC
 					target[c] = load[c] - self.consumption[c]
-					target[c] = max(self.congestionPoint.getLowerLimit(c).real, min(target[c].real, self.congestionPoint.getUpperLimit(c).real))
+					target[c] = max(self.congestionPoint.getLowerLimit(c, self.host.time()).real, min(target[c].real, self.congestionPoint.getUpperLimit(c, self.host.time()).real))
 
 		else:
 			self.lockState.acquire()
@@ -14,10 +14,18 @@
 
 
 from core.entity import Entity
+from util.deviceState import ConsumptionView, PropertiesView, StateLock
 
+import bisect
 import threading
 
 class Device(Entity):
+	# Compact state, see attachStateStore()
+	# NOTE: Devices do not use __slots__, subclasses add attributes freely and persistence and planning workers use vars()
+	stateStore = None
+	stateSlot = -1
+	stateProperties = ('consumption', 'soc')	# Properties backed by the store, read directly by PropertiesView
+
 	def __init__(self,  name,  host):
 		Entity.__init__(self,  name, host)
 
@@ -37,17 +45,25 @@ class Device(Entity):
 		self.controller = None
 		self.flowMeter = None
 		
-		self.plan = {}
+		self.plan = {}	# Not kept in the compact store, plans are lists of varying length that are replaced by setPlan() and pruned
 		self.consumption = {}
 
+		if self.host != None and self.host.compactDeviceState:
+			self.attachStateStore(self.host.getDeviceStateStore())
+		self.propertiesView = None
+
 		self.maxAgePlan = 900			# Used to prune plannings that are too old to be accurate
 		self.maxFuturePlan = 7*24*3600 	# Used to prune a planning that is in the distant future
 		# Control
 		self.smartOperation = True 	# Indicates whether the device is being actively controlled. Can be used to disable control for e.g. cyber attacks or demonstrator simulations
 		self.strictComfort = True
 
-		self.lockPlanning = threading.Lock()
-		self.lockState = threading.Lock()
+		if self.host != None:
+			self.lockPlanning = self.host.createLock()
+			self.lockState = StateLock(self.host.createLock())
+		else:
+			self.lockPlanning = threading.Lock()
+			self.lockState = StateLock(threading.Lock())
 
 		# Persistence
 		self.watchlist = ["consumption", "plan"]
@@ -64,18 +80,20 @@ class Device(Entity):
 	def prunePlan(self):
 		self.lockPlanning.acquire()
 
+		# Plans are sorted by time, so the outdated and distant entries are removed as a block
+		now = self.host.time()
+		timeBase = None
 		for c in self.commodities:
-			run = True
-			while run and c in self.plan:
-				if len(self.plan[c]) >= 1:
-					if self.plan[c][0][0] <= self.host.time()-self.zGet(self.controller, "timeBase") or self.plan[c][0][0] < self.host.time()-self.maxAgePlan:
-						self.plan[c].pop(0)
-					elif self.maxFuturePlan is not None and self.plan[c][-1][0] > self.host.time()+self.maxFuturePlan:
-						self.plan[c].pop(-1)
-					else:
-						run = False
-				else:
-					run = False
+			if c in self.plan and len(self.plan[c]) >= 1:
+				if timeBase is None:
+					timeBase = self.zGet(self.controller, "timeBase")
+				times = [p[0] for p in self.plan[c]]
+				first = max(bisect.bisect_right(times, now - timeBase), bisect.bisect_left(times, now - self.maxAgePlan))
+				last = len(times)
+				if self.maxFuturePlan is not None:
+					last = max(first, bisect.bisect_right(times, now + self.maxFuturePlan))
+				del self.plan[c][last:]
+				del self.plan[c][:first]
 
 		self.lockPlanning.release()
 
@@ -153,4 +171,70 @@ class Device(Entity):
 
 		self.lockState.release()
 
-		return r
\ No newline at end of file
+		return r
+
+	# Changes whenever the state of the device was changed under lockState
+	@property
+	def propertiesVersion(self):
+		return self.lockState.version
+
+	# To be called after changing properties without holding lockState, e.g. when configuring a device at runtime
+	def propertiesChanged(self):
+		self.lockState.version += 1
+
+	# Read-only view on the properties, which avoids building a new dict under a lock on each call
+	# NOTE: The values are not copied and reflect the current state of the device
+	def getPropertiesView(self):
+		if self.propertiesView is None:
+			self.propertiesView = PropertiesView(self)
+		else:
+			self.propertiesView.refresh()
+		return self.propertiesView
+
+#### STATE
+	# Move the consumption (and SoC, if any) into the compact store of the host
+	def attachStateStore(self, store):
+		consumption = dict(self.consumption)
+		soc = getattr(self, 'soc', None)
+
+		self.stateStore = store
+		self.stateSlot = store.allocate(self)
+		self.__consumptionView = ConsumptionView(store, self.stateSlot)
+
+		self.consumption = consumption
+		if soc is not None:
+			self.soc = soc
+
+	@property
+	def consumption(self):
+		if self.stateStore is not None:
+			return self.__consumptionView
+		return self.__consumption
+
+	@consumption.setter
+	def consumption(self, value):
+		if self.stateStore is not None:
+			value = dict(value)
+			self.__consumptionView.clear()
+			self.__consumptionView.update(value)
+		else:
+			self.__consumption = value
+
+	@property
+	def soc(self):
+		if self.stateStore is not None:
+			if not self.stateStore.hasSoc[self.stateSlot]:
+				raise AttributeError("'" + type(self).__name__ + "' object has no attribute 'soc'")
+			return float(self.stateStore.soc[self.stateSlot])
+		try:
+			return self.__soc
+		except AttributeError:
+			raise AttributeError("'" + type(self).__name__ + "' object has no attribute 'soc'")
+
+	@soc.setter
+	def soc(self, value):
+		if self.stateStore is not None:
+			self.stateStore.soc[self.stateSlot] = value
+			self.stateStore.hasSoc[self.stateSlot] = True
+		else:
+			self.__soc = value
@@ -16,6 +16,7 @@
 import requests
 
 from dev.loadDev import LoadDev
+from util.liveIO import RingBuffer
 
 class HassLoadDev(LoadDev):
 	def __init__(self,  name,  host, influx=False, reader=None):
@@ -31,40 +32,63 @@ class HassLoadDev(LoadDev):
 
 		# see https://developers.home-assistant.io/docs/en/external_api_rest.html
 
-	# Fixme make async
+		# Samples retrieved by the live I/O service of the host, if available
+		self.powerBuffer = RingBuffer(60)
+		self.poller = None
+
 	def preTick(self, time, deltatime=0):
+		if getattr(self.host, 'liveIO', None) is not None:
+			# Poll in the background, such that a slow Home Assistant does not delay the tick
+			if self.poller is None:
+				self.poller = self.host.liveIO.poll(self.retrieveValue, self.updateInterval, self.powerBuffer)
+
+			value, count = self.powerBuffer.drain()
+			if count > 0:
+				self.lockState.acquire()
+				for c in self.commodities:
+					self.consumption[c] = complex(value / len(self.commodities), 0.0)
+				self.lastUpdate = self.host.time()
+				self.lockState.release()
+			return
+
 		# We should not be a bad citizen to the service
 		self.lockState.acquire()
 		if (self.host.time() - self.lastUpdate)  > self.updateInterval:
-			try:
-				value = 0.0 # Jus tto be sure if all fails
-
-				# Try to get the sensor information
-				url = self.url+"/api/states/"+self.sensor
-				headers = {
-					'Authorization': 'Bearer '+self.bearer,
-					'content-type': 'application/json',
-				}
-
-				# Try to access the data
-				r = requests.get(url, headers=headers)
-				if r.status_code != 200:
-					self.logWarning("Could not connect to Home Assistant. Errorcode: "+str(r.status_code)+ "\t\t" + r.text)
-
-				data = r.json()
-
-				# Now retrieve the data we'd like:
-				value = data['state']
-				value = value.replace("," , ".") # Fix decimals
-				value = float(value) * self.scaling
-
+			value = self.retrieveValue()
+			if value is not None:
 				# Now, value contains the power production by the pv setup, now we can set it as consumption:
 				for c in self.commodities:
 					self.consumption[c] = complex(value / len(self.commodities), 0.0)
 
 				# If all succeeded:
 				self.lastUpdate = self.host.time()
-			except:
-				self.logWarning("Home Assistant service error")
 
-		self.lockState.release()
\ No newline at end of file
+		self.lockState.release()
+
+	def retrieveValue(self):
+		try:
+			# Try to get the sensor information
+			url = self.url+"/api/states/"+self.sensor
+			headers = {
+				'Authorization': 'Bearer '+self.bearer,
+				'content-type': 'application/json',
+			}
+
+			# Try to access the data
+			if getattr(self.host, 'liveIO', None) is not None:
+				r = self.host.liveIO.session.get(url, headers=headers)
+			else:
+				r = requests.get(url, headers=headers)
+			if r.status_code != 200:
+				self.logWarning("Could not connect to Home Assistant. Errorcode: "+str(r.status_code)+ "\t\t" + r.text)
+
+			data = r.json()
+
+			# Now retrieve the data we'd like:
+			value = data['state']
+			value = value.replace("," , ".") # Fix decimals
+			return float(value) * self.scaling
+		except:
+			self.logWarning("Home Assistant service error")
+
+		return None
@@ -32,90 +32,96 @@ class SunspecPvDev(CurtDev):
 
 		self.data = {}
 
-		self.runInThread("readSolarEdge")
+		if getattr(self.host, 'liveIO', None) is not None:
+			self.host.liveIO.poll(self.readSolarEdgeOnce, 1)
+		else:
+			self.runInThread("readSolarEdge")
 
 
 	def readSolarEdge(self):
 		while True:
-			try:
-				c = ModbusClient(host=self.ipAddress, port=self.port, auto_open=True, auto_close=True, timeout=5)
-
-				response = c.read_holding_registers(40069, 40)
-				address = list(range(40069, 40109))
-
-				table = pd.DataFrame()
-				table['Address'] = address
-				table['Value'] = response
-				table['Response'] = response
-
-				for i in table.index:
-					if table['Value'].iloc[i] == 65535:
-						table['Value'].iloc[i] = -1
-
-					if table['Value'].iloc[i] == 65534:
-						table['Value'].iloc[i] = -2
-
-					if table['Value'].iloc[i] == 65533:
-						table['Value'].iloc[i] = -3
-
-					if table['Value'].iloc[i] == 65532:
-						table['Value'].iloc[i] = -4
-
-					if table['Value'].iloc[i] == 65531:
-						table['Value'].iloc[i] = -5
-
-				scaleFactorCurrent = table[table['Address'] == 40075]['Value'].iloc[0].astype(float)
-				scaleFactorVoltage = table[table['Address'] == 40082]['Value'].iloc[0].astype(float)
-				scaleFactorACPower = table[table['Address'] == 40084]['Value'].iloc[0].astype(float)
-				scaleFactorFrequency = table[table['Address'] == 40086]['Value'].iloc[0].astype(float)
-				scaleFactorApparentPower = table[table['Address'] == 40088]['Value'].iloc[0].astype(float)
-				scaleFactorReactivePower = table[table['Address'] == 40090]['Value'].iloc[0].astype(float) - 1.0
-				scaleFactorPowerFactor = table[table['Address'] == 40092]['Value'].iloc[0].astype(float) - 1.0
-				# scaleFactorEnergyWh         = table[table['Address'] == 40095]['Value'].iloc[0].astype(float)
-				scaleFactorDCCurrent = table[table['Address'] == 40097]['Value'].iloc[0].astype(float)
-				scaleFactorDCVoltage = table[table['Address'] == 40099]['Value'].iloc[0].astype(float)
-				scaleFactorDCPower = table[table['Address'] == 40101]['Value'].iloc[0].astype(float)
-				scaleFactorTemperature = table[table['Address'] == 40106]['Value'].iloc[0].astype(float)
-
-				# Write data
-				self.lockState.acquire()
-				self.data['A-current.L1'] = self.scaleData(table[table['Address'] == 40072]['Value'].iloc[0], scaleFactorCurrent)
-				self.data['A-current.L2'] = self.scaleData(table[table['Address'] == 40073]['Value'].iloc[0], scaleFactorCurrent)
-				self.data['A-current.L3'] = self.scaleData(table[table['Address'] == 40074]['Value'].iloc[0], scaleFactorCurrent)
-
-				self.data['V-voltage.L1L2'] = self.scaleData(table[table['Address'] == 40076]['Value'].iloc[0], scaleFactorVoltage)
-				self.data['V-voltage.L2L3'] = self.scaleData(table[table['Address'] == 40077]['Value'].iloc[0], scaleFactorVoltage)
-				self.data['V-voltage.L3L1'] = self.scaleData(table[table['Address'] == 40078]['Value'].iloc[0], scaleFactorVoltage)
-
-				self.data['V-voltage.L1N'] = self.scaleData(table[table['Address'] == 40079]['Value'].iloc[0], scaleFactorVoltage)
-				self.data['V-voltage.L2N'] = self.scaleData(table[table['Address'] == 40080]['Value'].iloc[0], scaleFactorVoltage)
-				self.data['V-voltage.L3N'] = self.scaleData(table[table['Address'] == 40081]['Value'].iloc[0], scaleFactorVoltage)
-
-				self.data['W-power.P'] = self.scaleData(table[table['Address'] == 40083]['Value'].iloc[0], scaleFactorACPower)  # real
-				self.data['H-frequency.AC'] = self.scaleData(table[table['Address'] == 40085]['Value'].iloc[0], scaleFactorFrequency)
-				self.data['VA-power.S'] = self.scaleData(table[table['Address'] == 40087]['Value'].iloc[0], scaleFactorApparentPower)  # apparent
-				self.data['VAR-power.Q'] = self.scaleData(table[table['Address'] == 40089]['Value'].iloc[0], scaleFactorReactivePower)  # reactive
-
-				self.data['PF-powerfactor.PF'] = self.scaleData(table[table['Address'] == 40091]['Value'].iloc[0], scaleFactorPowerFactor)
-
-				self.data['A-current.DC'] = self.scaleData(table[table['Address'] == 40096]['Value'].iloc[0], scaleFactorDCCurrent)
-				# throw out DC current because this throws a -inf error on InfluxDB database
-				self.data['V-voltage.DC'] = self.scaleData(table[table['Address'] == 40098]['Value'].iloc[0], scaleFactorDCVoltage)
-				self.data['P-power.DC'] = self.scaleData(table[table['Address'] == 40100]['Value'].iloc[0], scaleFactorDCPower)
+			self.readSolarEdgeOnce()
+			time.sleep(1)
 
-				self.data['T-temperature.HS'] = self.scaleData(table[table['Address'] == 40103]['Value'].iloc[0], scaleFactorTemperature)
-				self.lockState.release()
+	def readSolarEdgeOnce(self):
+		try:
+			c = ModbusClient(host=self.ipAddress, port=self.port, auto_open=True, auto_close=True, timeout=5)
+
+			response = c.read_holding_registers(40069, 40)
+			address = list(range(40069, 40109))
+
+			table = pd.DataFrame()
+			table['Address'] = address
+			table['Value'] = response
+			table['Response'] = response
+
+			for i in table.index:
+				if table['Value'].iloc[i] == 65535:
+					table['Value'].iloc[i] = -1
+
+				if table['Value'].iloc[i] == 65534:
+					table['Value'].iloc[i] = -2
+
+				if table['Value'].iloc[i] == 65533:
+					table['Value'].iloc[i] = -3
+
+				if table['Value'].iloc[i] == 65532:
+					table['Value'].iloc[i] = -4
+
+				if table['Value'].iloc[i] == 65531:
+					table['Value'].iloc[i] = -5
+
+			scaleFactorCurrent = table[table['Address'] == 40075]['Value'].iloc[0].astype(float)
+			scaleFactorVoltage = table[table['Address'] == 40082]['Value'].iloc[0].astype(float)
+			scaleFactorACPower = table[table['Address'] == 40084]['Value'].iloc[0].astype(float)
+			scaleFactorFrequency = table[table['Address'] == 40086]['Value'].iloc[0].astype(float)
+			scaleFactorApparentPower = table[table['Address'] == 40088]['Value'].iloc[0].astype(float)
+			scaleFactorReactivePower = table[table['Address'] == 40090]['Value'].iloc[0].astype(float) - 1.0
+			scaleFactorPowerFactor = table[table['Address'] == 40092]['Value'].iloc[0].astype(float) - 1.0
+			# scaleFactorEnergyWh         = table[table['Address'] == 40095]['Value'].iloc[0].astype(float)
+			scaleFactorDCCurrent = table[table['Address'] == 40097]['Value'].iloc[0].astype(float)
+			scaleFactorDCVoltage = table[table['Address'] == 40099]['Value'].iloc[0].astype(float)
+			scaleFactorDCPower = table[table['Address'] == 40101]['Value'].iloc[0].astype(float)
+			scaleFactorTemperature = table[table['Address'] == 40106]['Value'].iloc[0].astype(float)
+
+			# Write data
+			self.lockState.acquire()
+			self.data['A-current.L1'] = self.scaleData(table[table['Address'] == 40072]['Value'].iloc[0], scaleFactorCurrent)
+			self.data['A-current.L2'] = self.scaleData(table[table['Address'] == 40073]['Value'].iloc[0], scaleFactorCurrent)
+			self.data['A-current.L3'] = self.scaleData(table[table['Address'] == 40074]['Value'].iloc[0], scaleFactorCurrent)
+
+			self.data['V-voltage.L1L2'] = self.scaleData(table[table['Address'] == 40076]['Value'].iloc[0], scaleFactorVoltage)
+			self.data['V-voltage.L2L3'] = self.scaleData(table[table['Address'] == 40077]['Value'].iloc[0], scaleFactorVoltage)
+			self.data['V-voltage.L3L1'] = self.scaleData(table[table['Address'] == 40078]['Value'].iloc[0], scaleFactorVoltage)
+
+			self.data['V-voltage.L1N'] = self.scaleData(table[table['Address'] == 40079]['Value'].iloc[0], scaleFactorVoltage)
+			self.data['V-voltage.L2N'] = self.scaleData(table[table['Address'] == 40080]['Value'].iloc[0], scaleFactorVoltage)
+			self.data['V-voltage.L3N'] = self.scaleData(table[table['Address'] == 40081]['Value'].iloc[0], scaleFactorVoltage)
+
+			self.data['W-power.P'] = self.scaleData(table[table['Address'] == 40083]['Value'].iloc[0], scaleFactorACPower)  # real
+			self.data['H-frequency.AC'] = self.scaleData(table[table['Address'] == 40085]['Value'].iloc[0], scaleFactorFrequency)
+			self.data['VA-power.S'] = self.scaleData(table[table['Address'] == 40087]['Value'].iloc[0], scaleFactorApparentPower)  # apparent
+			self.data['VAR-power.Q'] = self.scaleData(table[table['Address'] == 40089]['Value'].iloc[0], scaleFactorReactivePower)  # reactive
+
+			self.data['PF-powerfactor.PF'] = self.scaleData(table[table['Address'] == 40091]['Value'].iloc[0], scaleFactorPowerFactor)
+
+			self.data['A-current.DC'] = self.scaleData(table[table['Address'] == 40096]['Value'].iloc[0], scaleFactorDCCurrent)
+			# throw out DC current because this throws a -inf error on InfluxDB database
+			self.data['V-voltage.DC'] = self.scaleData(table[table['Address'] == 40098]['Value'].iloc[0], scaleFactorDCVoltage)
+			self.data['P-power.DC'] = self.scaleData(table[table['Address'] == 40100]['Value'].iloc[0], scaleFactorDCPower)
+
+			self.data['T-temperature.HS'] = self.scaleData(table[table['Address'] == 40103]['Value'].iloc[0], scaleFactorTemperature)
+			self.lockState.release()
 
-				for c in self.commodities:
-					self.consumption[c] = complex(-1 * self.data['W-power.P'] / len(self.commodities), 0.0)
+			for c in self.commodities:
+				self.consumption[c] = complex(-1 * self.data['W-power.P'] / len(self.commodities), 0.0)
 
-				# If all succeeded:
-				self.lastUpdate = self.host.time()
+			# If all succeeded:
+			self.lastUpdate = self.host.time()
 
-			except:
-				self.logWarning("SolarEdge Modbus error")
+		except:
+			self.logWarning("SolarEdge Modbus error")
 
-			time.sleep(1)
 
 
 
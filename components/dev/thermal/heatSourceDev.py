@@ -15,6 +15,8 @@
 
 from dev.thermal.thermalDev import ThermalDevice
 
+import numpy as np
+
 # Model to
 class HeatSourceDev(ThermalDevice):
 	def __init__(self,  name,  host):
@@ -40,6 +42,11 @@ class HeatSourceDev(ThermalDevice):
 
 		self.mixHeatCooling = False # Simultaneous heating and cooling
 
+		# Zones attached to a single ZoneSimulator, see zoneArrays()
+		self.zoneSimulator = None
+		self.zoneIndices = None
+		self.zoneCount = -1
+
 		if self.persistence != None:
 			self.watchlist += ["temperature", "soc", "dhwDemand", "zoneDemand"]
 			self.persistence.setWatchlist(self.watchlist)
@@ -138,6 +145,16 @@ class HeatSourceDev(ThermalDevice):
 			consumption = 0.0
 			producedTemperatureZone['HEAT'] = self.producingTemperatures[-1]
 
+			if self.zoneArrays():
+				# Exchange the valves and heat supply through the arrays of the simulator
+				if heatDemand > 0.1:
+					consumption -= self.zoneSimulator.supplyHeat(self.zoneIndices, heatDemand, producedTemperatureZone['HEAT'])
+				if coolDemand < -0.1 and (heatDemand <= 0.1 or self.mixHeatCooling):
+					consumption -= self.zoneSimulator.supplyHeat(self.zoneIndices, abs(coolDemand), producedTemperatureZone['HEAT'])
+				if coolDemand >= -0.1 and heatDemand <= 0.1:
+					self.zoneSimulator.supplyHeat(self.zoneIndices, 0.0, producedTemperatureZone['HEAT'])
+				return consumption
+
 			# Heating has priority over cooling
 			if heatDemand > 0.1:
 				valves = self.zGet(self.zones, 'valveHeat')
@@ -203,6 +220,20 @@ class HeatSourceDev(ThermalDevice):
 	def addZone(self, zone):
 		self.zones.append(zone)
 
+	def zoneArrays(self):
+		# Check whether all zones are attached to the same ZoneSimulator, the result is kept until zones are added
+		if self.zoneCount != len(self.zones):
+			self.zoneCount = len(self.zones)
+			simulators = set(id(getattr(zone, 'simulator', None)) for zone in self.zones)
+			if len(simulators) == 1 and getattr(self.zones[0], 'simulator', None) is not None:
+				self.zoneSimulator = self.zones[0].simulator
+				self.zoneIndices = np.array([zone.simulatorIdx for zone in self.zones], dtype=int)
+			else:
+				self.zoneSimulator = None
+				self.zoneIndices = None
+
+		return self.zoneSimulator is not None
+
 	def addThermostat(self, thermostat):
 		self.thermostats.append(thermostat)
 
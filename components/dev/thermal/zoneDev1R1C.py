@@ -15,13 +15,19 @@
 
 from util.clientCsvReader import ClientCsvReader
 from dev.thermal.thermalDev import ThermalDevice
+from dev.thermal.zoneSimulator import ZoneValueView
 
 from util.windowPredictor import WindowPredictor
+import util.rcModel
 
 import numpy as np
 
 # Model for a temperature zone
 class ZoneDev1R1C(ThermalDevice):
+	# Optional batched simulation, see ZoneSimulator
+	simulator = None
+	simulatorIdx = -1
+
 	def __init__(self,  name,  weather, sun, host):
 		ThermalDevice.__init__(self,  name,  host)
 		self.devtype = "Load"
@@ -71,6 +77,9 @@ class ZoneDev1R1C(ThermalDevice):
 
 		self.perfectPredictions = False
 
+		# Use the exact (matrix exponential) discretization instead of explicit Euler, allows for large timeBases
+		self.exactDiscretization = False
+
 		self.windows = []
 
 		if self.persistence != None:
@@ -121,6 +130,9 @@ class ZoneDev1R1C(ThermalDevice):
 	# PreTick is called before the actual time simulation.
 	# Use this to update the state based on the state selected in the previous interval
 	def preTick(self, time, deltatime=0):
+		if self.simulator is not None:
+			return # The state is advanced by the ZoneSimulator
+
 		newTemperature = 0.0
 
 		self.lockState.acquire()
@@ -137,17 +149,22 @@ class ZoneDev1R1C(ThermalDevice):
 		heatTemperature = self.heatTemperature[self.commodities[0]]
 
 		self.windowGain = 0.0
-		for w in self.windows:
-			self.windowGain += w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'])
+		irradiation = self.sun.powerOnPlanes([(w['inclination'], w['azimuth']) for w in self.windows])
+		for w, irr in zip(self.windows, irradiation):
+			self.windowGain += w['surface'] * w['shadingCoeff'] * 0.87 * irr
 		# NOTE: 0.87 is the Shading Coefficient to SHGC conversion factor as per https://en.wikipedia.org/wiki/Shading_coefficient and ASHREA Fundamentals 2013
 
 		# Determining infiltration losses
 
 		# Determine the new zone temperature:
-		newTemperature = 		self.temperature + ( \
-								( (self.weather.temperature - self.temperature) / (self.rEnvelope * self.cZone) ) + \
-							  	( ( self.ventilationSupply + self.gainSupply + self.windowGain + heatSupply) / self.cZone) \
-								) * self.host.timeBase
+		if self.exactDiscretization:
+			newTemperature = self.simulateStep(self.temperature, self.weather.temperature, self.ventilationSupply + self.gainSupply + self.windowGain + heatSupply, self.host.timeBase)
+
+		else:
+			newTemperature = 		self.temperature + ( \
+									( (self.weather.temperature - self.temperature) / (self.rEnvelope * self.cZone) ) + \
+									( ( self.ventilationSupply + self.gainSupply + self.windowGain + heatSupply) / self.cZone) \
+									) * self.host.timeBase
 
 		# Update the temperature at the end of the preTick
 		self.temperature = newTemperature
@@ -198,7 +215,82 @@ class ZoneDev1R1C(ThermalDevice):
 
 		self.lockState.release()
 
+#### STATE, stored in the ZoneSimulator arrays when attached
+	def attachSimulator(self, simulator, idx):
+		self.simulator = simulator
+		self.simulatorIdx = idx
+
+	@property
+	def temperature(self):
+		if self.simulator is not None:
+			return float(self.simulator.temperature[self.simulatorIdx])
+		return self.__temperature
+
+	@temperature.setter
+	def temperature(self, val):
+		if self.simulator is not None:
+			self.simulator.temperature[self.simulatorIdx] = val
+		else:
+			self.__temperature = val
+
+	@property
+	def windowGain(self):
+		if self.simulator is not None:
+			return float(self.simulator.windowGain[self.simulatorIdx])
+		return self.__windowGain
+
+	@windowGain.setter
+	def windowGain(self, val):
+		if self.simulator is not None:
+			self.simulator.windowGain[self.simulatorIdx] = val
+		else:
+			self.__windowGain = val
+
+	@property
+	def valveHeat(self):
+		if self.simulator is not None:
+			return float(self.simulator.valveHeat[self.simulatorIdx])
+		return self.__valveHeat
+
+	@valveHeat.setter
+	def valveHeat(self, val):
+		if self.simulator is not None:
+			self.simulator.valveHeat[self.simulatorIdx] = val
+		else:
+			self.__valveHeat = val
+
+	@property
+	def heatSupply(self):
+		if self.simulator is not None:
+			return ZoneValueView(self.simulator, 'heatSupply', self.simulatorIdx, self.commodities[0])
+		return self.__heatSupply
+
+	@heatSupply.setter
+	def heatSupply(self, val):
+		if self.simulator is not None:
+			self.simulator.heatSupply[self.simulatorIdx] = val[self.commodities[0]].real
+		else:
+			self.__heatSupply = val
+
+	@property
+	def heatTemperature(self):
+		if self.simulator is not None:
+			return ZoneValueView(self.simulator, 'heatTemperature', self.simulatorIdx, self.commodities[0])
+		return self.__heatTemperature
+
+	@heatTemperature.setter
+	def heatTemperature(self, val):
+		if self.simulator is not None:
+			self.simulator.heatTemperature[self.simulatorIdx] = val[self.commodities[0]]
+		else:
+			self.__heatTemperature = val
+
 # HELPER FUNCTIONS
+	def simulateStep(self, zoneTemperature, ambientTemperature, gains, timeBase):
+		# Exact solution of the 1R1C model over one interval, assuming constant inputs (zero-order hold)
+		Ad, Bd = util.rcModel.zone1R1C(self.rEnvelope, self.cZone, timeBase)
+		return float(Ad[0][0] * zoneTemperature + Bd[0][0] * ambientTemperature + Bd[0][1] * gains)
+
 	def addWindow(self, surface, azimuth = 180, inclination = 90, shadingCoeff = 0.81):
 		# For those params, I guess these are the ones due to lack of sources
 		# http://www.commercialwindows.org/shgc.php
@@ -236,36 +328,41 @@ class ZoneDev1R1C(ThermalDevice):
 			if timeBase == None:
 				timeBase = self.timeBase
 
-			result = []
+			intervals = int((endTime - startTime) / timeBase)
 			if not self.perfectPredictions:
-				intervals = int((endTime - startTime) / timeBase)
-				result = list(self.predictorGain.predictValues(startTime, intervals, timeBase))
+				result = self.predictorGain.predictValues(startTime, intervals, timeBase)
 			else:
-				time = startTime
-				while time < endTime:
-					result.append(self.gainReader.readValue(time))
-					time += timeBase
-
-			return result
+				result = [self.gainReader.readValue(startTime + i*timeBase) for i in range(0, intervals)]
 
+			return np.asarray(result, dtype=float)
 
 	def doVentilationPrediction(self, startTime, endTime, timeBase = None):
 		if self.ventilationFile != None:
 			if timeBase == None:
 				timeBase = self.timeBase
 
-			result = []
+			intervals = int((endTime - startTime) / timeBase)
 			if not self.perfectPredictions:
-				intervals = int((endTime - startTime) / timeBase)
-				result = list(self.predictorVentilation.predictValues(startTime, intervals, timeBase))
+				result = self.predictorVentilation.predictValues(startTime, intervals, timeBase)
 			else:
-				time = startTime
-				while time < endTime:
-					result.append(self.ventilationReader.readValue(time))
-					time += timeBase
+				result = [self.ventilationReader.readValue(startTime + i*timeBase) for i in range(0, intervals)]
+
+			return np.asarray(result, dtype=float)
+
+	def doWindowGainPrediction(self, startTime, endTime, timeBase = None):
+		if timeBase == None:
+			timeBase = self.timeBase
+
+		intervals = int((endTime - startTime) / timeBase)
+		gains = np.zeros(intervals)
 
-			return result
+		# Solar gains, the irradiance is obtained as one vector per window
+		if len(self.windows) > 0:
+			irradiation = self.sun.powerOnPlanesSeries([(w['inclination'], w['azimuth']) for w in self.windows], startTime, endTime, timeBase, self.perfectPredictions)
+			for w, irr in zip(self.windows, irradiation):
+				gains += w['surface'] * w['shadingCoeff'] * 0.87 * irr[:intervals]
 
+		return gains
 
 	# The true prediction module to retrieve energy demand for planning of the heating device
 	# Note that the controller needs to provide (predicted) thermostat setpoints and power properties (in heat)
@@ -275,61 +372,25 @@ class ZoneDev1R1C(ThermalDevice):
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		demand =  [0.0] * int((endTime -  startTime)/timeBase)
+		intervals = int((endTime -  startTime)/timeBase)
 
 		### FIRST WE NEED TO GATHER ALL DATA FOR THE PREDICTION IN (ALIGNED) VECTORS
 		# Perform a weather prediction
-		ambientTemperature = self.weather.doTemperaturePrediction(startTime, endTime, timeBase, self.perfectPredictions)
+		ambientTemperature = np.asarray(self.weather.doTemperaturePrediction(startTime, endTime, timeBase, self.perfectPredictions), dtype=float)[:intervals]
 
-		# Calculate all gains
-		gains = [0.0] * int((endTime -  startTime)/timeBase)    # Initialize the vector with the proper length with all 0.0 elements
+		# Heat gains from all the windows
+		gains = self.doWindowGainPrediction(startTime, endTime, timeBase)
 
 		# Heat gains from people and appliances
 		if self.gainFile != None:
-			gains = self.doGainPrediction(startTime, endTime, timeBase)
-
-		# Heat gains from all the windows
-		for w in self.windows:
-			t = startTime
-			idx = 0
-			while t < endTime:
-				gains[idx] = gains[idx] + (w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'], t, self.perfectPredictions))
-				t += timeBase
-				idx += 1
+			gains += self.doGainPrediction(startTime, endTime, timeBase)
 
 		# Now obtain the ventilation flow, which is temperature dependent.
-		ventilationFlow = [0.0] * int((endTime -  startTime)/timeBase)
+		ventilationFlow = np.zeros(intervals)
 		if self.ventilationFile != None:
 			ventilationFlow = self.doVentilationPrediction(startTime, endTime, timeBase)
 
 		### NOW WE CAN SIMULATE THE ZONE TO GET THE HEAT DEMAND
-		zoneTemperature = self.temperature		 # Fetch current state
-
-		# Simulate the zone
-		for i in range(0, len(gains)):
-			# Update the gain to include ventilation
-			# FIXME would be nice to add this as a separate function to improve the thermostat control
-			gains[i] = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambientTemperature[i] - zoneTemperature) )
-
-			# *TODO add the infiltration to the gains[i]!!!
-
-			# Calculate the loss in heat energy
-			# heatLoss = ( ( ( ambientTemperature[i] - zoneTemperature) /  (self.rEnvelope * self.cZone) ) * self.cZone ) + gains[i]
-			heatLoss = ((ambientTemperature[i] - zoneTemperature) / self.rEnvelope) + gains[i]
-
-			# Calculate how much heat we should add/subtract
-			if zoneTemperature < lowerSetpoints[i]:
-				demand[i] = min(maxPower, max( 0.0, (( ( lowerSetpoints[i] - zoneTemperature ) * (self.cZone) ) / timeBase ) - heatLoss ) )
-			elif zoneTemperature > upperSetpoints[i]:
-				demand[i] = max(minPower, min( 0.0, (( ( upperSetpoints[i] - zoneTemperature ) * (self.cZone) ) / timeBase ) - heatLoss ) )
-
-			gains[i] += demand[i]
-
-			# Simulate the zone to determine the next state
-			newZoneTemperature = 	zoneTemperature + ( \
-									( (ambientTemperature[i] - zoneTemperature) / (self.rEnvelope * self.cZone) ) + \
-									( ( gains[i] ) / self.cZone) ) * timeBase
-
-			zoneTemperature = newZoneTemperature
-
-		return demand
+		Ad, Bd = util.rcModel.zone1R1C(self.rEnvelope, self.cZone, timeBase, self.exactDiscretization)
+		return util.rcModel.predictDemand1R1C(Ad, Bd, ambientTemperature, gains, ventilationFlow, \
+											   lowerSetpoints[:intervals], upperSetpoints[:intervals], minPower, maxPower, self.temperature)
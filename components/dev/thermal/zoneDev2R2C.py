@@ -15,10 +15,18 @@
 
 from util.clientCsvReader import ClientCsvReader
 from dev.thermal.thermalDev import ThermalDevice
+from dev.thermal.zoneSimulator import ZoneValueView
 from util.windowPredictor import WindowPredictor
+import util.rcModel
+
+import numpy as np
 
 # Model for a temperature zone
 class ZoneDev2R2C(ThermalDevice):
+	# Optional batched simulation, see ZoneSimulator
+	simulator = None
+	simulatorIdx = -1
+
 	def __init__(self,  name,  weather, sun, host):
 		ThermalDevice.__init__(self,  name,  host)
 		self.devtype = "Load"
@@ -71,6 +79,9 @@ class ZoneDev2R2C(ThermalDevice):
 
 		self.perfectPredictions = False
 
+		# Use the exact (matrix exponential) discretization instead of explicit Euler, allows for large timeBases
+		self.exactDiscretization = False
+
 		self.windows = []
 
 		if self.persistence != None:
@@ -122,6 +133,9 @@ class ZoneDev2R2C(ThermalDevice):
 	# PreTick is called before the actual time simulation.
 	# Use this to update the state based on the state selected in the previous interval
 	def preTick(self, time, deltatime=0):
+		if self.simulator is not None:
+			return # The state is advanced by the ZoneSimulator
+
 		newTemperature = 0.0
 
 		# INFORMATION ON THIS MODEL
@@ -138,21 +152,26 @@ class ZoneDev2R2C(ThermalDevice):
 		heatTemperature = self.heatTemperature[self.commodities[0]]
 
 		self.windowGain = 0.0
-		for w in self.windows:
-			self.windowGain += w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'])
+		irradiation = self.sun.powerOnPlanes([(w['inclination'], w['azimuth']) for w in self.windows])
+		for w, irr in zip(self.windows, irradiation):
+			self.windowGain += w['surface'] * w['shadingCoeff'] * 0.87 * irr
 		# NOTE: 0.87 is the Shading Coefficient to SHGC conversion factor as per https://en.wikipedia.org/wiki/Shading_coefficient and ASHREA Fundamentals 2013
 
-		# Determine the new floorheating temperature:
-		newFloorTemperature = 	self.floorTemperature + ( \
-								( (self.temperature - self.floorTemperature) / (self.rFloor * self.cFloor) ) + \
-							  	( heatSupply / self.cFloor) \
-								) * self.host.timeBase
+		if self.exactDiscretization:
+			[newTemperature, newFloorTemperature] = self.simulateStep(self.temperature, self.floorTemperature, self.weather.temperature, self.ventilationSupply + self.gainSupply + self.windowGain, heatSupply, self.host.timeBase)
 
-		newTemperature = 		self.temperature + ( \
-								( (self.weather.temperature - self.temperature) / (self.rEnvelope * self.cZone) ) + \
-								( (self.floorTemperature - self.temperature) / (self.rFloor * self.cZone ) ) + \
-							  	( ( self.ventilationSupply + self.gainSupply + self.windowGain ) / self.cZone) \
-								) * self.host.timeBase
+		else:
+			# Determine the new floorheating temperature:
+			newFloorTemperature = 	self.floorTemperature + ( \
+									( (self.temperature - self.floorTemperature) / (self.rFloor * self.cFloor) ) + \
+									( heatSupply / self.cFloor) \
+									) * self.host.timeBase
+
+			newTemperature = 		self.temperature + ( \
+									( (self.weather.temperature - self.temperature) / (self.rEnvelope * self.cZone) ) + \
+									( (self.floorTemperature - self.temperature) / (self.rFloor * self.cZone ) ) + \
+									( ( self.ventilationSupply + self.gainSupply + self.windowGain ) / self.cZone) \
+									) * self.host.timeBase
 
 		# Update the temperature at the end of the preTick
 		self.temperature = newTemperature
@@ -204,7 +223,96 @@ class ZoneDev2R2C(ThermalDevice):
 			self.logValue("W-power.real.c." + c, self.consumption[c].real)
 		self.lockState.release()
 
+#### STATE, stored in the ZoneSimulator arrays when attached
+	def attachSimulator(self, simulator, idx):
+		self.simulator = simulator
+		self.simulatorIdx = idx
+
+	@property
+	def temperature(self):
+		if self.simulator is not None:
+			return float(self.simulator.temperature[self.simulatorIdx])
+		return self.__temperature
+
+	@temperature.setter
+	def temperature(self, val):
+		if self.simulator is not None:
+			self.simulator.temperature[self.simulatorIdx] = val
+		else:
+			self.__temperature = val
+
+	@property
+	def floorTemperature(self):
+		if self.simulator is not None:
+			return float(self.simulator.floorTemperature[self.simulatorIdx])
+		return self.__floorTemperature
+
+	@floorTemperature.setter
+	def floorTemperature(self, val):
+		if self.simulator is not None:
+			self.simulator.floorTemperature[self.simulatorIdx] = val
+		else:
+			self.__floorTemperature = val
+
+	@property
+	def windowGain(self):
+		if self.simulator is not None:
+			return float(self.simulator.windowGain[self.simulatorIdx])
+		return self.__windowGain
+
+	@windowGain.setter
+	def windowGain(self, val):
+		if self.simulator is not None:
+			self.simulator.windowGain[self.simulatorIdx] = val
+		else:
+			self.__windowGain = val
+
+	@property
+	def valveHeat(self):
+		if self.simulator is not None:
+			return float(self.simulator.valveHeat[self.simulatorIdx])
+		return self.__valveHeat
+
+	@valveHeat.setter
+	def valveHeat(self, val):
+		if self.simulator is not None:
+			self.simulator.valveHeat[self.simulatorIdx] = val
+		else:
+			self.__valveHeat = val
+
+	@property
+	def heatSupply(self):
+		if self.simulator is not None:
+			return ZoneValueView(self.simulator, 'heatSupply', self.simulatorIdx, self.commodities[0])
+		return self.__heatSupply
+
+	@heatSupply.setter
+	def heatSupply(self, val):
+		if self.simulator is not None:
+			self.simulator.heatSupply[self.simulatorIdx] = val[self.commodities[0]].real
+		else:
+			self.__heatSupply = val
+
+	@property
+	def heatTemperature(self):
+		if self.simulator is not None:
+			return ZoneValueView(self.simulator, 'heatTemperature', self.simulatorIdx, self.commodities[0])
+		return self.__heatTemperature
+
+	@heatTemperature.setter
+	def heatTemperature(self, val):
+		if self.simulator is not None:
+			self.simulator.heatTemperature[self.simulatorIdx] = val[self.commodities[0]]
+		else:
+			self.__heatTemperature = val
+
 # HELPER FUNCTIONS
+	def simulateStep(self, zoneTemperature, floorTemperature, ambientTemperature, gains, heatSupply, timeBase):
+		# Exact solution of the 2R2C model over one interval, assuming constant inputs (zero-order hold)
+		Ad, Bd = util.rcModel.zone2R2C(self.rEnvelope, self.cZone, self.rFloor, self.cFloor, timeBase)
+		x = Ad.dot([zoneTemperature, floorTemperature]) + Bd.dot([ambientTemperature, gains, heatSupply])
+		return [float(x[0]), float(x[1])]
+
 	def addWindow(self, surface, azimuth = 180, inclination = 90, shadingCoeff = 0.81):
 		# For those params, I guess these are the ones due to lack of sources
 		# http://www.commercialwindows.org/shgc.php
@@ -240,34 +348,41 @@ class ZoneDev2R2C(ThermalDevice):
 			if timeBase == None:
 				timeBase = self.timeBase
 
-			result = []
+			intervals = int((endTime - startTime) / timeBase)
 			if not self.perfectPredictions:
-				intervals = int((endTime - startTime) / timeBase)
-				result = list(self.predictorGain.predictValues(startTime, intervals, timeBase))
+				result = self.predictorGain.predictValues(startTime, intervals, timeBase)
 			else:
-				time = startTime
-				while time < endTime:
-					result.append(self.gainReader.readValue(time))
-					time += timeBase
+				result = [self.gainReader.readValue(startTime + i*timeBase) for i in range(0, intervals)]
 
-			return result
+			return np.asarray(result, dtype=float)
 
 	def doVentilationPrediction(self, startTime, endTime, timeBase = None):
 		if self.ventilationFile != None:
 			if timeBase == None:
 				timeBase = self.timeBase
 
-			result = []
+			intervals = int((endTime - startTime) / timeBase)
 			if not self.perfectPredictions:
-				intervals = int((endTime - startTime) / timeBase)
-				result = list(self.predictorVentilation.predictValues(startTime, intervals, timeBase))
+				result = self.predictorVentilation.predictValues(startTime, intervals, timeBase)
 			else:
-				time = startTime
-				while time < endTime:
-					result.append(self.ventilationReader.readValue(time))
-					time += timeBase
+				result = [self.ventilationReader.readValue(startTime + i*timeBase) for i in range(0, intervals)]
+
+			return np.asarray(result, dtype=float)
 
-			return result
+	def doWindowGainPrediction(self, startTime, endTime, timeBase = None):
+		if timeBase == None:
+			timeBase = self.timeBase
+
+		intervals = int((endTime - startTime) / timeBase)
+		gains = np.zeros(intervals)
+
+		# Solar gains, the irradiance is obtained as one vector per window
+		if len(self.windows) > 0:
+			irradiation = self.sun.powerOnPlanesSeries([(w['inclination'], w['azimuth']) for w in self.windows], startTime, endTime, timeBase, self.perfectPredictions)
+			for w, irr in zip(self.windows, irradiation):
+				gains += w['surface'] * w['shadingCoeff'] * 0.87 * irr[:intervals]
+
+		return gains
 
 	# The true prediction module to retrieve energy demand for planning of the heating device
 	# Note that the controller needs to provide (predicted) thermostat setpoints and power properties (in heat)
@@ -277,66 +392,25 @@ class ZoneDev2R2C(ThermalDevice):
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		demand =  [0.0] * int((endTime -  startTime)/timeBase)
+		intervals = int((endTime -  startTime)/timeBase)
 
 		### FIRST WE NEED TO GATHER ALL DATA FOR THE PREDICTION IN (ALIGNED) VECTORS
 		# Perform a weather prediction
-		ambientTemperature = self.weather.doTemperaturePrediction(startTime, endTime, timeBase, self.perfectPredictions)
+		ambientTemperature = np.asarray(self.weather.doTemperaturePrediction(startTime, endTime, timeBase, self.perfectPredictions), dtype=float)[:intervals]
 
-		# Calculate all gains
-		gains = [0.0] * int((endTime -  startTime)/timeBase)
+		# Heat gains from all the windows
+		gains = self.doWindowGainPrediction(startTime, endTime, timeBase)
 
 		# Heat gains from people and appliances
 		if self.gainFile != None:
-			gains = self.doGainPrediction(startTime, endTime, timeBase)
-
-		# Heat gains from all the windows
-		for w in self.windows:
-			t = startTime
-			idx = 0
-			while t < endTime:
-				gains[idx] = gains[idx] + (w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'], t, self.perfectPredictions))
-				t += timeBase
-				idx += 1
+			gains += self.doGainPrediction(startTime, endTime, timeBase)
 
 		# Now obtain the ventilation flow, which is temperature dependent.
-		ventilationFlow = [0.0] * int((endTime -  startTime)/timeBase)
+		ventilationFlow = np.zeros(intervals)
 		if self.ventilationFile != None:
 			ventilationFlow = self.doVentilationPrediction(startTime, endTime, timeBase)
 
 		### NOW WE CAN SIMULATE THE ZONE TO GET THE HEAT DEMAND
-		floorTemperature = self.floorTemperature # Fetch current state
-		zoneTemperature = self.temperature		 # Fetch current state
-
-		# Simulate the zone
-		for i in range(0, len(gains)):
-			# Update the gain to include ventilation
-			gains[i] = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambientTemperature[i] - zoneTemperature) )
-
-			# Calculate the loss in heat energy
-			heatLoss =  ( ( ambientTemperature[i] - zoneTemperature) /  self.rEnvelope )  + gains[i]
-
-			# Calculate how much heat we should add/subtract
-			if zoneTemperature < lowerSetpoints[i]:
-				heatLoss -=  ( ( floorTemperature - zoneTemperature ) * self.cFloor  ) / timeBase
-				demand[i] = min(maxPower, max( 0.0, (( ( lowerSetpoints[i] - zoneTemperature ) * (self.cZone + self.cFloor ) ) / timeBase ) - heatLoss ) )
-			elif zoneTemperature > upperSetpoints[i]:
-				heatLoss +=  ( ( floorTemperature - zoneTemperature ) * self.cFloor  ) / timeBase
-				demand[i] = max(minPower, min( 0.0, (( ( upperSetpoints[i] - zoneTemperature ) * (self.cZone + self.cFloor ) ) / timeBase ) - heatLoss ) )
-
-			# Simulate the zone to determine the next state
-			newFloorTemperature = 	floorTemperature + ( \
-									( (zoneTemperature - floorTemperature) / (self.rFloor * self.cFloor) ) + \
-									( demand[i] / self.cFloor) \
-									) * timeBase
-
-			newZoneTemperature = 	zoneTemperature + ( \
-									( (ambientTemperature[i] - zoneTemperature) / (self.rEnvelope * self.cZone) ) + \
-									( (floorTemperature - zoneTemperature) / (self.rFloor * self.cZone ) ) + \
-									( ( gains[i] ) / self.cZone) \
-									) * timeBase
-
-			floorTemperature = newFloorTemperature
-			zoneTemperature = newZoneTemperature
-
-		return demand
\ No newline at end of file
+		Ad, Bd = util.rcModel.zone2R2C(self.rEnvelope, self.cZone, self.rFloor, self.cFloor, timeBase, self.exactDiscretization)
+		return util.rcModel.predictDemand2R2C(Ad, Bd, self.rEnvelope, self.cZone, self.rFloor, self.cFloor, timeBase, ambientTemperature, gains, ventilationFlow, \
+											   lowerSetpoints[:intervals], upperSetpoints[:intervals], minPower, maxPower, self.temperature, self.floorTemperature, self.exactDiscretization)
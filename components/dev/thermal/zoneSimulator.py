@@ -0,0 +1,259 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from core.entity import Entity
+import util.rcModel
+
+from collections.abc import MutableMapping
+import numpy as np
+import threading
+
+# Batched simulation of many temperature zones (ZoneDev1R1C and ZoneDev2R2C)
+# The states and parameters of all attached zones are kept in arrays and all zones are stepped at once in the preTick.
+# The zone objects remain in place as (thin) views on these arrays, such that thermostats, heat sources and controllers are not affected.
+# Heat sources whose zones are all attached to the same simulator distribute their heat through the arrays, see supplyHeat().
+# Usage: create one simulator and call addZone(zone) for each zone, preferably before the simulation starts.
+class ZoneSimulator(Entity):
+	def __init__(self,  name,  host):
+		Entity.__init__(self,  name,  host)
+
+		self.devtype = "ZoneSimulator"
+		self.type = "simulator"
+
+		self.zones = []
+		self.size = 0
+
+		# States, index i belongs to self.zones[i]
+		# Note that these arrays may be larger than the number of zones to allow for cheap appending
+		self.temperature = np.zeros(16)
+		self.floorTemperature = np.zeros(16)
+		self.windowGain = np.zeros(16)
+
+		# Exchange with the heat sources: the valve opening set by the thermostat and the heat (temperature) supplied to the zone
+		self.valveHeat = np.zeros(16)
+		self.heatSupply = np.zeros(16)
+		self.heatTemperature = np.zeros(16)
+
+		# Parameters, copied from the zones in updateParameters()
+		self.rEnvelope = np.ones(0)
+		self.cZone = np.ones(0)
+		self.rFloor = np.ones(0)
+		self.cFloor = np.ones(0)
+		self.hasFloor = np.zeros(0)		# 1.0 for 2R2C zones, 0.0 for 1R1C zones
+
+		# Discretized models of all zones, per timeBase: (zones x 2 x 2) and (zones x 2 x 3) arrays
+		# States are [zone, floor], inputs are [ambient temperature, gains into the zone, heat supply]
+		self.models = {}
+
+		# Window gains are calculated per distinct orientation per sun
+		# Each entry holds the sun, the list of orientations and a (zones x orientations) matrix with the effective window surfaces
+		self.windowGroups = []
+
+		self.lockState = threading.Lock()
+
+	def requestTickets(self, time):
+		self.ticketCallback.clear()
+		self.registerTicket(self.host.staticTicketPreTickDevs, 'preTick', register=False)  # preTick
+
+	def startup(self):
+		self.updateParameters()
+		Entity.startup(self)
+
+	def preTick(self, time, deltatime=0):
+		if self.size == 0:
+			return
+
+		self.lockState.acquire()
+		n = self.size
+		zones = self.zones
+
+		# Gather the inputs of this interval
+		heatSupply = self.heatSupply[:n]
+		ambientTemperature = np.fromiter((z.weather.temperature for z in zones), dtype=float, count=n)
+		gains = np.fromiter((z.ventilationSupply + z.gainSupply for z in zones), dtype=float, count=n)
+
+		windowGain = np.zeros(n)
+		for group in self.windowGroups:
+			irradiation = np.asarray(group['sun'].powerOnPlanes(group['orientations']))
+			windowGain += group['surfaces'].dot(irradiation)
+		self.windowGain[:n] = windowGain
+
+		self.step(ambientTemperature, gains + windowGain, heatSupply, self.host.timeBase)
+		self.lockState.release()
+
+	def step(self, ambientTemperature, gains, heatSupply, timeBase):
+		# Step all zones at once using the discretized model of each zone
+		# Zones use explicit Euler, equal to the original models, unless exactDiscretization is set for the zone
+		n = self.size
+		if timeBase not in self.models:
+			self.models[timeBase] = self.discretize(timeBase)
+		Ad, Bd = self.models[timeBase]
+
+		x = np.stack((self.temperature[:n], self.floorTemperature[:n]), axis=1)
+		u = np.stack((ambientTemperature, gains, heatSupply), axis=1)
+		x = np.einsum('nij,nj->ni', Ad, x) + np.einsum('nij,nj->ni', Bd, u)
+
+		# Single capacity zones have no floor, keep it equal to the zone temperature
+		self.floorTemperature[:n] = np.where(self.hasFloor > 0, x[:, 1], x[:, 0])
+		self.temperature[:n] = x[:, 0]
+
+	def discretize(self, timeBase):
+		n = self.size
+		Ad = np.zeros((n, 2, 2))
+		Bd = np.zeros((n, 2, 3))
+
+		for idx in range(0, n):
+			z = self.zones[idx]
+			exact = getattr(z, 'exactDiscretization', False)
+			if self.hasFloor[idx] > 0:
+				Ad[idx], Bd[idx] = util.rcModel.zone2R2C(self.rEnvelope[idx], self.cZone[idx], self.rFloor[idx], self.cFloor[idx], timeBase, exact)
+			else:
+				# For 1R1C zones, the heat is supplied directly to the zone and the floor is not coupled
+				a, b = util.rcModel.zone1R1C(self.rEnvelope[idx], self.cZone[idx], timeBase, exact)
+				Ad[idx][0][0] = a[0][0]
+				Bd[idx][0][0] = b[0][0]
+				Bd[idx][0][1] = b[0][1]
+				Bd[idx][0][2] = b[0][1]
+
+		return Ad, Bd
+
+	def addZone(self, zone):
+		self.lockState.acquire()
+
+		if self.size == len(self.temperature):
+			# Grow the state arrays
+			self.temperature = np.concatenate((self.temperature, np.zeros(len(self.temperature))))
+			self.floorTemperature = np.concatenate((self.floorTemperature, np.zeros(len(self.floorTemperature))))
+			self.windowGain = np.concatenate((self.windowGain, np.zeros(len(self.windowGain))))
+			self.valveHeat = np.concatenate((self.valveHeat, np.zeros(len(self.valveHeat))))
+			self.heatSupply = np.concatenate((self.heatSupply, np.zeros(len(self.heatSupply))))
+			self.heatTemperature = np.concatenate((self.heatTemperature, np.zeros(len(self.heatTemperature))))
+
+		idx = self.size
+		self.temperature[idx] = zone.temperature
+		self.floorTemperature[idx] = getattr(zone, 'floorTemperature', zone.temperature)
+		self.windowGain[idx] = zone.windowGain
+		self.valveHeat[idx] = zone.valveHeat
+		self.heatSupply[idx] = zone.heatSupply.get(zone.commodities[0], 0.0).real
+		self.heatTemperature[idx] = zone.heatTemperature.get(zone.commodities[0], 0.0)
+
+		self.zones.append(zone)
+		self.size += 1
+		self.lockState.release()
+
+		# From here on, the zone reads and writes its state in the arrays
+		zone.attachSimulator(self, idx)
+
+		if self.host is not None and self.host.currentTime != 0:
+			# Added during the simulation
+			self.updateParameters()
+
+	def supplyHeat(self, indices, heat, temperature):
+		# Distribute heat over the given zones in proportion to their valve openings, as HeatSourceDev.getZoneDemand()
+		# Returns the total heat supplied
+		valves = self.valveHeat[indices]
+		opened = valves > 0
+		totalRequest = valves[opened].sum()
+
+		supply = np.zeros(len(indices))
+		if totalRequest > 0:
+			supply[opened] = (heat / float(totalRequest)) * valves[opened]
+
+		self.heatSupply[indices] = supply
+		self.heatTemperature[indices] = temperature
+		return float(supply.sum())
+
+	def updateParameters(self):
+		# Copy the parameters and windows of all zones into arrays. Must be called after changing zone parameters during a simulation
+		self.lockState.acquire()
+		zones = self.zones
+
+		self.hasFloor = np.array([1.0 if hasattr(z, 'rFloor') else 0.0 for z in zones])
+		self.rEnvelope = np.array([z.rEnvelope for z in zones], dtype=float)
+		self.cZone = np.array([z.cZone for z in zones], dtype=float)
+		self.rFloor = np.array([getattr(z, 'rFloor', 1.0) for z in zones], dtype=float)
+		self.cFloor = np.array([getattr(z, 'cFloor', 1.0) for z in zones], dtype=float)
+
+		self.models = {}
+
+		self.windowGroups = []
+		groups = {}
+		for idx in range(0, len(zones)):
+			z = zones[idx]
+			if id(z.sun) not in groups:
+				groups[id(z.sun)] = {'sun': z.sun, 'orientations': [], 'windows': []}
+			group = groups[id(z.sun)]
+
+			for w in z.windows:
+				orientation = (w['inclination'], w['azimuth'])
+				if orientation not in group['orientations']:
+					group['orientations'].append(orientation)
+				# NOTE: 0.87 is the Shading Coefficient to SHGC conversion factor, see the zone models
+				group['windows'].append( (idx, group['orientations'].index(orientation), w['surface'] * w['shadingCoeff'] * 0.87) )
+
+		for group in groups.values():
+			if len(group['orientations']) == 0:
+				continue
+			surfaces = np.zeros((len(zones), len(group['orientations'])))
+			for (idx, o, surface) in group['windows']:
+				surfaces[idx][o] += surface
+
+			self.windowGroups.append({'sun': group['sun'], 'orientations': group['orientations'], 'surfaces': surfaces})
+
+		self.lockState.release()
+
+
+# Dict-like view on the value of a single commodity of a zone in one of the arrays of the simulator, e.g. zone.heatSupply
+# The array is looked up on every access, as the simulator replaces its arrays when zones are added
+class ZoneValueView(MutableMapping):
+	__slots__ = ('simulator', 'array', 'idx', 'commodity')
+
+	def __init__(self, simulator, array, idx, commodity):
+		self.simulator = simulator
+		self.array = array
+		self.idx = idx
+		self.commodity = commodity
+
+	def __getitem__(self, commodity):
+		if commodity != self.commodity:
+			raise KeyError(commodity)
+		return float(getattr(self.simulator, self.array)[self.idx])
+
+	def __setitem__(self, commodity, value):
+		if commodity != self.commodity:
+			raise KeyError(commodity)
+		getattr(self.simulator, self.array)[self.idx] = value.real
+
+	def __delitem__(self, commodity):
+		raise KeyError(commodity)
+
+	def __iter__(self):
+		return iter([self.commodity])
+
+	def __len__(self):
+		return 1
+
+	def __repr__(self):
+		return repr(dict(self))
+
+	# Copies and pickles (persistence) of the view are plain dicts
+	def __reduce__(self):
+		return (dict, (dict(self), ))
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		return dict(self)
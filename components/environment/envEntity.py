@@ -16,8 +16,11 @@
 from core.entity import Entity
 
 import threading
+import numpy as np
 
 class EnvEntity(Entity):
+	localAttributes = ('forecastCache', )
+
 	def __init__(self,  name,  host):
 		Entity.__init__(self,  name, host)
 		
@@ -28,6 +31,13 @@ class EnvEntity(Entity):
 
 		self.lockState = threading.Lock()
 
+		# Shared forecast cache, see getForecast()
+		self.forecastVersion = 0			# Incremented when new (weather) data arrives
+		self.forecastCache = {}
+		self.forecastCacheLock = threading.Lock()
+		self.forecastCacheTimeout = 900		# Seconds (host time) a forecast remains valid without new data
+		self.maxForecastCacheEntries = 16
+
 	def requestTickets(self, time):
 		self.ticketCallback.clear()
 		self.registerTicket(self.host.staticTicketPreTickEnvs, 'preTick', register=False)  # preTick
@@ -54,6 +64,59 @@ class EnvEntity(Entity):
 	def logStats(self, time):
 		pass
 
+	# Forecasts shared by all consumers, e.g. the controllers of many PV installations in a planning round
+	# Returns (version, forecast) where forecast is a dict with a read-only numpy array per variable of doPrediction(),
+	# or the key 'value' if doPrediction() returns plain values. The arrays must not be modified, hence need no copy.
+	def getForecast(self, startTime, endTime, timeBase=None):
+		if timeBase is None:
+			timeBase = self.timeBase
+		key = (startTime, endTime, timeBase)
+
+		self.forecastCacheLock.acquire()
+		entry = self.forecastCache.get(key, None)
+		if entry is not None and (entry[0] != self.forecastVersion or self.host.time() - entry[1] > self.forecastCacheTimeout):
+			entry = None
+		self.forecastCacheLock.release()
+
+		if entry is None:
+			version = self.forecastVersion
+			forecast = self.toForecastArrays(self.doPrediction(startTime, endTime, timeBase))
+			entry = (version, self.host.time(), forecast)
+
+			self.forecastCacheLock.acquire()
+			if len(self.forecastCache) >= self.maxForecastCacheEntries:
+				del self.forecastCache[min(self.forecastCache, key=lambda k: self.forecastCache[k][1])]
+			self.forecastCache[key] = entry
+			self.forecastCacheLock.release()
+
+		return entry[0], entry[2]
+
+	def invalidateForecast(self):
+		# To be called when new data arrives that changes the forecasts
+		self.forecastCacheLock.acquire()
+		self.forecastVersion += 1
+		self.forecastCache = {}
+		self.forecastCacheLock.release()
+
+	def doPrediction(self, startTime, endTime, timeBase=None):
+		return []
+
+	def toForecastArrays(self, prediction):
+		forecast = {}
+		if len(prediction) > 0 and isinstance(prediction[0], dict):
+			for k in prediction[0].keys():
+				try:
+					forecast[k] = np.array([p.get(k, np.nan) for p in prediction], dtype=float)
+				except (TypeError, ValueError):
+					pass # Not numeric
+		else:
+			forecast['value'] = np.array(prediction, dtype=float)
+
+		for v in forecast.values():
+			v.setflags(write=False)
+
+		return forecast
+
 	def getProperties(self):
 		# Get the properties of this device
 		r = {}
@@ -77,7 +77,7 @@ class MetnoSunEnv(SunEnv):
         # Retrieve data from API
         if not self.retrieving and (self.host.time() - self.lastUpdate) > self.updateInterval:
             self.retrieving = True
-            self.runInThread('retrieveData')
+            self.runIO('retrieveData')
 
         result = dict(self.getIrradiation(time))
 
@@ -234,6 +234,7 @@ class MetnoSunEnv(SunEnv):
             self.dataCache = data
             self.dataCacheLock.release()
             self.lastUpdate = self.host.time()
+            self.invalidateForecast()
 
         self.retrieving = False
         return
@@ -72,7 +72,7 @@ class OpenWeatherEnv(WeatherEnv):
 	def preTick(self, time, deltatime=0):
 		if (self.host.time() - self.lastUpdate) > self.updateInterval and not self.retrieving:
 			self.retrieving = True
-			self.runInThread('retrieveData') #self.retrieveData()
+			self.runIO('retrieveData') #self.retrieveData()
 
 
 #### HELPER FUNCTIONS
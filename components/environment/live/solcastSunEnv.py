@@ -65,7 +65,7 @@ class SolcastSunEnv(SunEnv):
 		# Retrieve data from Solcast
 		if not self.retrieving and (self.host.time() - self.lastUpdate) > self.updateInterval:
 			self.retrieving = True
-			self.runInThread('retrieveData')
+			self.runIO('retrieveData')
 
 		result = dict(self.getIrradiation(time))
 
@@ -182,6 +182,7 @@ class SolcastSunEnv(SunEnv):
 			self.dataCache = dataCache
 			self.dataCacheLock.release()
 			self.lastUpdate = self.host.time()
+			self.invalidateForecast()
 
 		self.retrieving = False
 		return
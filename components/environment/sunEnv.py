@@ -20,12 +20,15 @@ import util.helpers
 import pytz
 
 import math
+import numpy as np
 from datetime import datetime
 
 from astral import Astral
 from astral import Location
 
 class SunEnv(EnvEntity):
+	localAttributes = EnvEntity.localAttributes + ('location', 'planeCache', 'planeCacheState')
+
 	def __init__(self,  name,  host):
 		EnvEntity.__init__(self,  name, host)
 
@@ -57,6 +60,10 @@ class SunEnv(EnvEntity):
 
 		self.currentState = {}
 
+		# Plane of array irradiance cache for the current state, keyed by (inclination, azimuth)
+		self.planeCache = {}
+		self.planeCacheState = None
+
 		self.timeBase = 3600 # Default of most weather information sources
 
 		self.irradianceFile = None
@@ -277,19 +284,71 @@ class SunEnv(EnvEntity):
 
 	def powerOnPlane(self, inclination, azimuth, time = None, perfect = True):
 		# Calculate the direct irradiance on a plane (e.g. solar panel, window)
-
-		# Obtain the current values
 		if time is None:
-			sunProps = self.currentState
+			# Most devices share a handful of orientations, so the current values are calculated once per tick.
+			# The cache is tied to the currentState dict, which is replaced by every preTick
+			cache = self.planeCache
+			if self.planeCacheState is not self.currentState:
+				cache = {}
+				self.planeCache = cache
+				self.planeCacheState = self.currentState
+
+			key = (inclination, azimuth)
+			if key not in cache:
+				cache[key] = self.calculatePowerOnPlane(self.currentState, inclination, azimuth)
+			return cache[key]
+
+		return self.calculatePowerOnPlane(self.getSunProperties(time, perfect), inclination, azimuth)
+
+	def powerOnPlanes(self, orientations, time = None, perfect = True):
+		# Bulk variant of powerOnPlane, orientations is a list of (inclination, azimuth) tuples
+		# The sun position and irradiance are only obtained once for all orientations
+		if time is None:
+			return [self.powerOnPlane(inclination, azimuth) for (inclination, azimuth) in orientations]
+
+		sunProps = self.getSunProperties(time, perfect)
+		results = {}
+		for key in orientations:
+			if key not in results:
+				results[key] = self.calculatePowerOnPlane(sunProps, key[0], key[1])
+
+		return [results[key] for key in orientations]
+
+	def powerOnPlanesSeries(self, orientations, startTime, endTime, timeBase = None, perfect = True):
+		# Irradiance on a list of (inclination, azimuth) planes for all intervals in [startTime, endTime)
+		# Returns an array with one row (vector over time) per orientation, the sun is evaluated only once per interval
+		if timeBase is None:
+			timeBase = self.timeBase
+
+		keys = ['GHI', 'DNI', 'DHI', 'elevation', 'azimuth', 'zenith']
+		series = {k: [] for k in keys}
+		time = startTime
+		while time < endTime:
+			sunProps = self.getSunProperties(time, perfect)
+			for k in keys:
+				series[k].append(sunProps[k])
+			time += timeBase
+
+		sunProps = {k: np.asarray(v, dtype=float) for k, v in series.items()}
+
+		result = np.zeros((len(orientations), len(sunProps['GHI'])))
+		for i in range(0, len(orientations)):
+			result[i] = self.calculatePowerOnPlaneArray(sunProps, orientations[i][0], orientations[i][1])
+
+		return result
+
+	def getSunProperties(self, time, perfect = True):
+		if time <= self.host.time() or perfect:
+			sunProps = self.getIrradiation(time)
 		else:
-			if time <= self.host.time() or perfect:
-				sunProps = self.getIrradiation(time)
-			else:
-				sunProps = self.getIrradiation(time)
-				sunProps2 =  self.getIrradiation(time - 3600*24)
-				for k in sunProps.keys():
-					sunProps[k] = 0.5 * sunProps[k] + 0.5*sunProps2[k]
+			sunProps = self.getIrradiation(time)
+			sunProps2 =  self.getIrradiation(time - 3600*24)
+			for k in sunProps.keys():
+				sunProps[k] = 0.5 * sunProps[k] + 0.5*sunProps2[k]
 
+		return sunProps
+
+	def calculatePowerOnPlane(self, sunProps, inclination, azimuth):
 		# NOTE: Azimuth is defined from the north = 0 degrees, running east (i.e. east is 90 degrees).
 		if sunProps['GHI'] < 0.001 or sunProps['elevation'] <= 1:
 			return 0.0 	# No power (significant) irradiation / avoid division by 0.
@@ -320,6 +379,27 @@ class SunEnv(EnvEntity):
 		return max(0.0, Gdir + Gdfs + Gref)
 
 
+	def calculatePowerOnPlaneArray(self, sunProps, inclination, azimuth):
+		# Vectorized version of calculatePowerOnPlane, sunProps holds arrays over time
+		zenith = np.radians(sunProps['zenith'])
+		inclination = math.radians(inclination)
+
+		# Cosine of the incidence angle
+		cosIncidence = np.clip( np.cos(zenith) * math.cos(inclination) + \
+								np.sin(zenith) * math.sin(inclination) * np.cos(np.radians(sunProps['azimuth'] - azimuth)), -1.0, 1.0)
+
+		ghi = sunProps['GHI']
+		valid = (ghi >= 0.001) & (sunProps['elevation'] > 1)
+		factorF = 1 - np.power(sunProps['DHI'] / np.where(valid, ghi, 1.0), 2)
+
+		Gdir = sunProps['DNI'] * cosIncidence
+		Gdfs = sunProps['DHI'] * ( ( 1 + math.cos(inclination)) / 2.0 ) * \
+						( 1 + factorF * math.pow(math.sin(inclination / 2.0), 3) ) * \
+						( 1 + factorF * np.power(cosIncidence, 2) * np.power(np.sin(zenith), 3) )
+		Gref = ghi * self.rhoGround * ( (1 - math.cos(inclination)) / 2.0 )
+
+		return np.where(valid, np.maximum(0.0, Gdir + Gdfs + Gref), 0.0)
+
 	def readValue(self, time, filename=None, timeBase=None, field=None):
 		if field != None:
 			filename = field
@@ -25,9 +25,14 @@ from pytz import timezone
 import random
 
 from util.serverCsvReader import ServerCsvReader
+from util.influxdbReaderPool import InfluxDBReaderPool
+from util.stateFeed import StateFeed
 
 
 class Host(Core):
+    # Called with the host just before the simulation starts, used by the ModelComposer to store a model snapshot
+    modelSnapshot = None
+
     def __init__(self, name="host"):
         # Type of simulation
         Core.__init__(self, name)
@@ -89,6 +94,15 @@ class Host(Core):
         # File servers
         self.csvServers = {}
 
+        # Batched InfluxDB reading for many readers, see util/influxdbReaderPool.py
+        # Must be set before the readers are created
+        self.bulkInfluxReading = False
+        self.influxReaderPool = None
+
+        # Feed of state changes for live views, see util/stateFeed.py. Served over SSE if a port is given
+        self.stateFeed = None
+        self.stateFeedPort = None
+
         # Static ticket registration configuration
 
         # PreTick
@@ -131,6 +145,11 @@ class Host(Core):
         self.clearDB = False
 
     def startSimulation(self):
+        if Host.modelSnapshot is not None:
+            snapshot = Host.modelSnapshot
+            Host.modelSnapshot = None
+            snapshot(self)
+
         self.currentTime = self.startTime
         self.previousTime = self.startTime
 
@@ -154,6 +173,9 @@ class Host(Core):
         self.logMsg("--- Starting")
         self.db.createDatabase()
 
+        if self.stateFeedPort is not None:
+            self.getStateFeed().serve(self.stateFeedPort)
+
         for e in self.entities:
             self.logDebug(
                 "  Starting: %s . %s . %s - %s" % (self.db.database, e.log_db_measurement, e.name, str(e.log_db_tags_extra))
@@ -170,8 +192,14 @@ class Host(Core):
         if self.networkMaster:
             self.zCall(self.slaves, 'shutdown')
 
+        if self.stateFeed is not None:
+            self.stateFeed.stop()
+
+        if self.planWorkers is not None:
+            self.planWorkers.stop()
+
         #write data
-        self.db.writeData(True)
+        self.db.flush()
 
         # Save the state
         self.storeStates()
@@ -340,6 +368,9 @@ class Host(Core):
 
         self.db.writeData(force)
 
+        if self.stateFeed is not None:
+            self.stateFeed.publish(self.currentTime)
+
     def logHostValue(self, measurement, value, time=None, deltatime=None):
         #         tags = {'devtype':self.devtype,  'name':self.name}
         #         values = {measurement:value}
@@ -432,6 +463,24 @@ class Host(Core):
         for e in self.entities:
             e.storeState()
 
+    # Copies of the persistent states, to be written by writeStates(), e.g. from another thread
+    def snapshotStates(self):
+        states = []
+        if self.persistence is not None:
+            data = self.persistence.snapshot()
+            if data is not None:
+                states.append((self.persistence, data))
+
+        for e in self.entities:
+            data = e.snapshotState()
+            if data is not None:
+                states.append((e.persistence, data))
+        return states
+
+    def writeStates(self, states):
+        for (persistence, data) in states:
+            persistence.write(data)
+
     def attachClientCsvReader(self, dataSource, timeBase, timeOffset):
         if dataSource in self.csvServers:
             server = self.csvServers[dataSource]
@@ -445,3 +494,16 @@ class Host(Core):
             server = ServerCsvReader(dataSource, timeBase, timeOffset, self)
             self.csvServers[dataSource] = server
             return server
+
+    def getInfluxDBReaderPool(self):
+        if not self.bulkInfluxReading:
+            return None
+
+        if self.influxReaderPool is None:
+            self.influxReaderPool = InfluxDBReaderPool(self)
+        return self.influxReaderPool
+
+    def getStateFeed(self):
+        if self.stateFeed is None:
+            self.stateFeed = StateFeed(self)
+        return self.stateFeed
@@ -14,8 +14,11 @@
 
 
 from hosts.host import Host
+from util.liveIO import LiveIOService
 import time as tm
 import datetime
+import math
+import threading
 
 class LiveHost(Host):
 	def __init__(self, name="host"):
@@ -30,6 +33,24 @@ class LiveHost(Host):
 		self.useThreads = True
 		self.tickInterval = 1  # 1/frequency for the tickrate
 
+		# Scheduling of the ticks, the loop sleeps until the next deadline
+		self.maxDrift = 0.5		# Report when a tick starts more than maxDrift seconds after its deadline
+		self.lastDrift = 0.0	# Delay of the last tick w.r.t. its deadline in seconds
+		self.missedTicks = 0	# Ticks skipped due to overruns. After an overrun, one tick is executed right away
+		self.running = False
+		self.wakeup = threading.Event()
+
+		# Run persistence and database flushes in a separate thread, such that a slow disk or database does not delay ticks
+		self.offloadIO = False
+		self.ioPending = threading.Event()
+		self.ioLock = threading.Lock()		# Guards the collected data and states handed over to the IO thread
+		self.ioStates = None
+		self.ioThread = None
+
+		# Shared asyncio service for the external I/O of live devices and environments, see util/liveIO.py
+		# The service thread starts when it is used first. Set to None to use plain threads instead
+		self.liveIO = LiveIOService(self)
+
 		# Enable persistence
 		self.enablePersistence = True
 
@@ -47,30 +68,51 @@ class LiveHost(Host):
 		Host.startSimulation(self)
 		
 		# simulate time
-		old = int(tm.time())
-		old = old - (old % self.timeBase)
-
 		self.logMsg("Simulation loop")
 
-		while True:
+		self.running = True
+		if self.offloadIO:
+			self.ioThread = threading.Thread(target=self.ioLoop, name="LiveHostIO", daemon=True)
+			self.ioThread.start()
+
+		# The first tick is executed right away, the following deadlines are aligned with the tickInterval
+		deadline = tm.time()
 
-			now = int(tm.time())
+		while self.running:
+			now = tm.time()
+			if now < deadline:
+				self.wakeup.wait(deadline - now)
+				continue
 
-			if now - old >= self.tickInterval:
+			self.lastDrift = now - deadline
+			if self.lastDrift > self.maxDrift:
+				self.logWarning("Tick started " + str(round(self.lastDrift, 3)) + "s after its deadline")
 
-				self.currentTime = now
-				# self.logMsg("Simulating at time: " + self.timeHumanReadable())
-				print(".", end="", flush=True)
+			self.currentTime = int(now)
+			print(".", end="", flush=True)
 
-				self.timeTick(now)
-				old = now
+			self.timeTick(self.currentTime)
 
-			else:
-				tm.sleep(0.001)
+			deadline = (math.floor(deadline / self.tickInterval) + 1) * self.tickInterval
+			now = tm.time()
+			if now >= deadline + self.tickInterval:
+				# Overrun, skip the deadlines that passed and catch up with a single tick
+				missed = int((now - deadline) / self.tickInterval)
+				self.missedTicks += missed
+				deadline += missed * self.tickInterval
+				self.logWarning("Tick overrun, skipped " + str(missed) + " tick(s)")
 
 		#do a soft shutdown
 		self.shutdown()
-			
+
+	def stopSimulation(self):
+		self.running = False
+		self.wakeup.set()
+		self.ioPending.set()
+
+		if self.liveIO is not None:
+			self.liveIO.stop()
+
 	def timeTick(self,  time, absolute=True):
 
 		self.executeCmdQueue()
@@ -82,6 +124,33 @@ class LiveHost(Host):
 		while (len(self.tickets) > 0):
 			self.announceNextTicket(time)
 
-		self.storeStates()
-
-		self.postTickLogging(time, True)
\ No newline at end of file
+		if self.offloadIO and self.ioThread is not None and not self.ioThread.is_alive():
+			self.logWarning("IO thread stopped, writing the states and data in the tick loop")
+			self.ioThread = None
+
+		if self.offloadIO and self.ioThread is not None:
+			# Collect the data and copy the states here, the IO thread writes them
+			with self.ioLock:
+				self.postTickLogging(time, False)
+				self.ioStates = self.snapshotStates()
+			self.ioPending.set()
+		else:
+			self.storeStates()
+
+			self.postTickLogging(time, True)
+
+	def ioLoop(self):
+		while self.running:
+			self.ioPending.wait()
+			self.ioPending.clear()
+
+			try:
+				with self.ioLock:
+					states = self.ioStates
+					self.ioStates = None
+					self.db.writeData(True)
+
+				if states is not None:
+					self.writeStates(states)
+			except Exception as e:
+				self.logWarning("IO thread could not write the states and data: " + str(e))
\ No newline at end of file
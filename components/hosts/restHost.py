@@ -14,7 +14,6 @@
 
 
 from hosts.host import Host
-from api.eveApi import EveApi
 
 class RestHost(Host):
 	def __init__(self, name="host", port = 5000):
@@ -30,7 +29,9 @@ class RestHost(Host):
 			
 	def startup(self):
 		Host.startup(self)	
-		
+
+		# Imported here, such that Eve / Flask are only loaded when the API is used
+		from api.eveApi import EveApi
 		self.restApi = EveApi(self, self.port)
 
 	def timeTick(self, time, absolute = False):
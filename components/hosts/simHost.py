@@ -15,6 +15,7 @@
 
 
 from hosts.host import Host
+from util.deviceState import NoLock
 
 class SimHost(Host):
 	def __init__(self, name = "host"):
@@ -24,6 +25,15 @@ class SimHost(Host):
 
 		self.enablePersistence = False
 
+		# Locks on the state of entities are pure overhead in a single threaded simulation
+		# Set to False to hand out no-op locks when threads are not used. Must be set before the entities are created
+		self.stateLocking = True
+
+	def createLock(self):
+		if not self.stateLocking and not self.useThreads:
+			return NoLock()
+		return Host.createLock(self)
+
 	def startSimulation(self):
 		#startup all entities
 		Host.startSimulation(self)
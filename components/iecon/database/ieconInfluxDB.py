@@ -99,6 +99,7 @@ class IeconInfluxDBReader(Reader):
             offset=None,
             raw=False,
             db: IeconInfluxDB=None,
+            pool=None,
     ):
         """
 
@@ -112,6 +113,7 @@ class IeconInfluxDBReader(Reader):
             aggregation:
             offset:
             raw:
+            pool: Optional InfluxDBReaderPool to batch the queries of many readers. Taken from the host if not given.
 
         """
 
@@ -146,6 +148,25 @@ class IeconInfluxDBReader(Reader):
 
         self.raw = raw
 
+        # Shared pool that batches the queries of many readers (e.g. all devices in a community)
+        self.pool = pool
+        if self.pool is None and hasattr(host, 'getInfluxDBReaderPool'):
+            self.pool = host.getInfluxDBReaderPool()
+        if self.pool is not None and not self.raw:
+            self.pool.register(self.connection(), self.db_measurement, self.field_name, self.aggregation, self.timeBase, self.tags())
+
+    def connection(self):
+        url = self.db_address + ":" + str(self.db_port) + "/query"
+        if not url.startswith("http"):
+            url = "http://" + url
+
+        return (url, self.db_database, self.db_auth_username, self.db_auth_password, self.db_auth_token)
+
+    def tags(self):
+        tags = {'ENAME': self.entity_name}
+        if self.entity_commodity:
+            tags['CTYPE'] = self.entity_commodity
+        return tags
 
     def retrieveValues(self, startTime, endTime=None, field_name=None, tags=None):
 
@@ -154,6 +175,9 @@ class IeconInfluxDBReader(Reader):
         if field_name is None:
             field_name = self.field_name
 
+        if self.pool is not None and not self.raw:
+            return self.pool.retrieveValues(self.connection(), self.db_measurement, field_name, self.aggregation, self.timeBase, self.tags(), startTime, endTime)
+
         # Condition query
         condition = ' (\"ENAME\" = \'' + self.entity_name + '\') AND '
         if self.entity_commodity:
@@ -210,9 +234,10 @@ class IeconInfluxDBReader(Reader):
         else:
             result = [None] * int((endTime - startTime) / self.timeBase)
             try:
-                if ('series' in req.json()['results'][0]):
+                data = req.json()  # Decode only once
+                if ('series' in data['results'][0]):
                     idx = 0
-                    d = req.json()['results'][0]['series'][0]['values']
+                    d = data['results'][0]['series'][0]['values']
                     for value in d:
                         result[idx] = value[1]
                         idx += 1
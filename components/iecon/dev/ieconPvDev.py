@@ -18,6 +18,7 @@ from dev.curtDev import CurtDev
 from iecon.dev.tools.ieconDevTools import iecon_parse_spb_data_2_demkit
 from mqtt_spb_wrapper import MqttSpbEntityScada
 from iecon.database.ieconInfluxDB import IeconInfluxDBReader
+from util.liveIO import RingBuffer
 
 class IeconPvDev(CurtDev):
 
@@ -62,7 +63,7 @@ class IeconPvDev(CurtDev):
         self._data = dict()     # Local storage of device data
 
         # REALTIME DATA BUFFER - Temp buffer for data
-        self._temp_data_pow = []       # Array to store the device real time data points
+        self._pow_buffer = RingBuffer(600)  # Fixed-size buffer with the device real time data points and running aggregates
         self._last_pow_avg = 0         # Last calculated average - LOQIO IX FILTER
         self._last_pow_timestamp = 0   # Last calculated average timestamp
         self._TIMEOUT_NODATA = 300     # Timeout value if no data is received, avg value will be zeroed
@@ -83,8 +84,8 @@ class IeconPvDev(CurtDev):
 
         Returns:
         """
-        # Store the data into the temp list
-        self._temp_data_pow.append(data)
+        # Store the data into the ring buffer
+        self._pow_buffer.append(data)
 
 
     def preTick(self, time, deltatime=0):
@@ -94,17 +95,12 @@ class IeconPvDev(CurtDev):
 
         if (self.host.time() - self.lastUpdate) > self.updateInterval:
 
-            # Check if data has been received - Calculate average
-            if len(self._temp_data_pow) > 0:
-
-                self._last_pow_avg = (float(sum(self._temp_data_pow)) /
-                                      len(self._temp_data_pow))
+            # Check if data has been received - Average of the samples since the last update
+            pow_avg, pow_count = self._pow_buffer.drain()
+            if pow_count > 0:
+                self._last_pow_avg = pow_avg
                 self._last_pow_timestamp = time
 
-                # self.host.logDebug("POW: %.3f - %f - %d" % (self._last_pow_avg, self._last_pow_timestamp, len(self._temp_data_pow)))
-
-                self._temp_data_pow = []  # Reset the values
-
             # Check if the data point it is too old, then zeroed
             if time > ( self._last_pow_timestamp + self._TIMEOUT_NODATA ):
                 self._last_pow_avg = 0 # Clear the value
@@ -31,11 +31,19 @@
 import math
 import sys
 
+import numpy as np
 
 class OptAlg:
 	def __init__(self):
 		self.fillLevel = 0
 
+		# Evaluate all start times of a timeshiftable profile at once, see timeShiftablePlanningCorrelation()
+		self.fastTimeShiftable = True
+
+		# Solver for continuous buffers: 'greedy' for the algorithms below, or 'qp' to solve a quadratic program, see qpAlg.py
+		# Discrete buffers and problems that are infeasible within the power limits always use the greedy algorithms
+		self.solver = 'greedy'
+
 	def continuousBufferPlanning(self, desired, chargeRequired, powerMin, powerMax, powerLimitsLower=[], powerLimitsUpper=[], prices=None, beta=1):
 		if prices is None:
 			prices = [0] * len(desired)
@@ -603,7 +611,7 @@ class OptAlg:
 		return i
 
 	# The main bufferplanning function that does all the magic!
-	def bufferPlanning(self, desired, targetSoC, initialSoC, capacity, demand, chargingPowers, powerMin=0, powerMax=0, powerLimitsLower=[], powerLimitsUpper=[], reactivePower=False, prices=None, beta=1, efficiency=None, intervalMerge=None):
+	def bufferPlanning(self, desired, targetSoC, initialSoC, capacity, demand, chargingPowers, powerMin=0, powerMax=0, powerLimitsLower=[], powerLimitsUpper=[], reactivePower=False, prices=None, beta=1, efficiency=None, intervalMerge=None, warmStart=None):
 		if prices is None:
 			prices = [0] * len(desired)
 
@@ -671,6 +679,16 @@ class OptAlg:
 				if powerLimitsLower[i] > powerLimitsUpper[i]:
 					powerLimitsLower[i] = powerLimitsUpper[i]
 
+		# Plan continuous buffers with the QP solver, warm started from e.g. the previous plan
+		if continuousMode and self.solver == 'qp':
+			qpResult = self.qpAlg().bufferPlanning([{'desired': desired, 'targetSoC': targetSoC, 'initialSoC': initialSoC, 'capacity': capacity, 'demand': demand,
+												 'powerMin': powerMin, 'powerMax': powerMax, 'powerLimitsLower': powerLimitsLower, 'powerLimitsUpper': powerLimitsUpper,
+												 'prices': prices, 'beta': beta, 'intervalMerge': intervalMerge, 'warmStart': warmStart}])[0]
+			if qpResult is not None:
+				if reactivePower:
+					return self.reactivePowerPlanning(qpResult, desiredWithReactive, chargingPowers)
+				return qpResult
+
 		# //First we check feasibility of the given demands for the buffer.
 		# //We try to plan the maximal power for each time interval and sPlanningee if this gives a lower SoC violation
 		# //Then we determine where we had the last problem
@@ -803,32 +821,63 @@ class OptAlg:
 		else:
 			result = naivePlan
 
-		# Reactive Power control
-		# Note that this part is an addition to the algorithms by Thijs vd Klauw.
-		# We simply assume that any buffer type can control its reactive power independently
-		# Furthermore, we do not consider discrete reactive power ratings yet.
-		# The latter is trivial to integrate on the device level by taking the reactive power (or power factor) that is equal or lower than the calculated value.
 		if reactivePower:
-			# result list gives just the active power result
-			totalResult = []
-			activeMax = max(abs(chargingPowers[0]), abs(chargingPowers[-1]))  # active power maximum is simply this one
-			for i in range(0, len(result)):
-				if (activeMax * activeMax) - (result[i].real * result[i].real) < 0:
-					assert (False)
-				reactiveMax = math.sqrt((activeMax * activeMax) - (result[i].real * result[i].real))  # this is the maximum (also minimum with -1 sign ;-) )
-				reactive = max((-1 * reactiveMax), min(desiredWithReactive[i].imag, reactiveMax))
-				totalResult.append(complex(result[i], reactive))
-
-			return totalResult
-
+			return self.reactivePowerPlanning(result, desiredWithReactive, chargingPowers)
 		else:
 			return result
 
+	# Reactive Power control
+	# Note that this part is an addition to the algorithms by Thijs vd Klauw.
+	# We simply assume that any buffer type can control its reactive power independently
+	# Furthermore, we do not consider discrete reactive power ratings yet.
+	# The latter is trivial to integrate on the device level by taking the reactive power (or power factor) that is equal or lower than the calculated value.
+	def reactivePowerPlanning(self, result, desiredWithReactive, chargingPowers):
+		# result list gives just the active power result
+		totalResult = []
+		activeMax = max(abs(chargingPowers[0]), abs(chargingPowers[-1]))  # active power maximum is simply this one
+		for i in range(0, len(result)):
+			if (activeMax * activeMax) - (result[i].real * result[i].real) < 0:
+				assert (False)
+			reactiveMax = math.sqrt((activeMax * activeMax) - (result[i].real * result[i].real))  # this is the maximum (also minimum with -1 sign ;-) )
+			reactive = max((-1 * reactiveMax), min(desiredWithReactive[i].imag, reactiveMax))
+			totalResult.append(complex(result[i], reactive))
+
+		return totalResult
+
+	def qpAlg(self):
+		# Imported when used, such that the tests in the opt folder keep working without the components folder on the path
+		from opt.qpAlg import QpAlg
+		return QpAlg()
+
+	# Plan a fleet of buffers, each problem is a dict with the arguments of bufferPlanning()
+	# With the qp solver, all continuous buffers are planned at once as one vectorized problem, see qpAlg.py
+	def bufferPlanningFleet(self, problems):
+		results = [None] * len(problems)
+
+		if self.solver == 'qp':
+			continuous = [i for i in range(0, len(problems)) if len(problems[i].get('chargingPowers', [])) == 0]
+			qpResults = self.qpAlg().bufferPlanning([problems[i] for i in continuous])
+			for k in range(0, len(continuous)):
+				p = problems[continuous[k]]
+				if qpResults[k] is not None and p.get('reactivePower', False):
+					qpResults[k] = self.reactivePowerPlanning(qpResults[k], p['desired'], [p.get('powerMin', 0), p.get('powerMax', 0)])
+				results[continuous[k]] = qpResults[k]
+
+		# The remaining buffers are planned one by one
+		for i in range(0, len(problems)):
+			if results[i] is None:
+				results[i] = self.bufferPlanning(**problems[i])
+
+		return results
+
 	# Algorithm to plan timeshiftable devices, such as washing machines
 	# Input
 	#    desired:     vector with the desired profile to follow
 	#    profile:    vector with the profile of the device
 	def timeShiftablePlanning(self, desired, profile, powerLimitsLower=[], powerLimitsUpper=[], prices=None, beta=1):
+		if getattr(self, 'fastTimeShiftable', True):
+			return self.timeShiftablePlanningCorrelation(desired, profile, powerLimitsLower, powerLimitsUpper, prices, beta)
+
 		result = [0] * len(desired)
 
 		if prices is None:
@@ -841,7 +890,7 @@ class OptAlg:
 		penalty = 0
 		for i in range(len(desired)):
 			if (i < len(profile)):
-				costs += (prices[i] * profile[i].real) + (beta * pow((math.sqrt(pow(profile[i].real - desired[i].real, 2) + pow(profile[i].imag - desired[i].imag, 2))), 2))
+				costs += (prices[i].real * profile[i].real) + (beta * pow((math.sqrt(pow(profile[i].real - desired[i].real, 2) + pow(profile[i].imag - desired[i].imag, 2))), 2))
 
 				sign = 1
 				if profile[i].real < 0:
@@ -867,7 +916,7 @@ class OptAlg:
 
 			for i in range(len(desired)):
 				if (i - shift >= 0 and i - shift < len(profile)):
-					costs += (prices[i] * profile[i - shift].real) + (beta * pow((math.sqrt(pow(profile[i - shift].real - desired[i].real, 2) + pow(profile[i - shift].imag - desired[i].imag, 2))), 2))
+					costs += (prices[i].real * profile[i - shift].real) + (beta * pow((math.sqrt(pow(profile[i - shift].real - desired[i].real, 2) + pow(profile[i - shift].imag - desired[i].imag, 2))), 2))
 
 					sign = 1
 					if profile[i - shift].real < 0:
@@ -892,6 +941,48 @@ class OptAlg:
 		# and send back the result
 		return result
 
+	# Same result as timeShiftablePlanning, but the costs of all shifts are determined at once using a cross-correlation
+	# of the profile with the desired profile and prices, and prefix sums of the squared desired profile:
+	# costs(s) = sum |d|^2 - window(|d|^2, s) + corr(prices, p.real)(s) + beta * (sum |p|^2 + window(|d|^2, s) - 2 Re corr(d, p)(s))
+	def timeShiftablePlanningCorrelation(self, desired, profile, powerLimitsLower=[], powerLimitsUpper=[], prices=None, beta=1):
+		result = [0] * len(desired)
+
+		assert (len(profile) <= len(desired))
+		if len(profile) == 0:
+			return result
+
+		d = np.asarray(desired, dtype=complex)
+		p = np.asarray(profile, dtype=complex)
+		n = len(d)
+		m = len(p)
+
+		# The shifts 0 up to (but excluding) n - m are considered, as in timeShiftablePlanning
+		shifts = max(1, n - m)
+
+		dSquared = d.real * d.real + d.imag * d.imag
+		prefix = np.concatenate(([0.0], np.cumsum(dSquared)))
+		window = prefix[m:m + shifts] - prefix[0:shifts]
+
+		# np.correlate(a, v, 'valid')[s] = sum_j a[s+j] * v[j]
+		cross = np.correlate(d.real, p.real, 'valid')[0:shifts] + np.correlate(d.imag, p.imag, 'valid')[0:shifts]
+		costs = (prefix[n] - window) + beta * (np.sum(p.real * p.real + p.imag * p.imag) + window - 2 * cross)
+		if prices is not None:
+			# Prices may be complex numbers, of which only the real part is relevant
+			costs += np.correlate(np.asarray(prices, dtype=complex).real, p.real, 'valid')[0:shifts]
+
+		# The limit penalty of timeShiftablePlanning is determined using the limits at the profile index (i - shift),
+		# hence it is equal for every shift and does not influence the selected start time.
+
+		# Ties go to the latest shift, as in timeShiftablePlanning. Allow for rounding differences in the summation
+		bestCosts = costs.min()
+		bestStart = int(np.nonzero(costs <= bestCosts + 1e-9 * max(1.0, abs(bestCosts)))[0][-1])
+
+		# now we determined the best starttime, build the profile
+		for i in range(len(profile)):
+			result[bestStart + i] = profile[i]
+
+		return result
+
 	# Implementation of the EV charging algorithm where only charging between given bounds (or nothing at all) is accepted.
 	# Paper: Martijn H. H. Schoot Uiterkamp et al., "Offline and online scheduling of electric vehicle charging with a minimum charging threshold", submitted to SmartGridComm 2018.
 	def continuousBufferPlanningBounds(self, desired, chargeRequired, powerMin, powerMax, powerLimitsUpper=[]):
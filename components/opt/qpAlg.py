@@ -0,0 +1,258 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+
+# Continuous buffer planning as a convex quadratic program (QP), solved for many buffers at once
+# Each buffer solves the same problem as OptAlg.bufferPlanning() in continuous mode:
+#    minimize    beta * ||x - desired||^2 + prices * x
+#    subject to  max(powerMin, powerLimitsLower) <= x <= min(powerMax, powerLimitsUpper)
+#                0 <= SoC <= capacity, and SoC = targetSoC at the end of the horizon
+# As in OptAlg, the prices are ignored for beta = 1 and only the prices are used for beta = 0.
+#
+# The QP is solved with the ADMM iterations of OSQP:
+# B. Stellato et al., "OSQP: an operator splitting solver for quadratic programs", Mathematical Programming Computation, 2020
+# The constraints of a buffer are l <= Ax <= u, with A the identity (power) stacked on the cumulative sum (SoC).
+# After scaling each buffer by its maximum power, buffers with the same horizon share the matrix of the linear system.
+# Hence the iterations are matrix products over the whole fleet, and a single factorization serves all buffers.
+# Buffers that have converged are removed from the iterations.
+# NOTE: The solution is accurate up to the tolerances (epsAbs, epsRel), relative to the maximum power of a buffer.
+
+import numpy as np
+
+
+class QpAlg:
+	def __init__(self):
+		self.epsAbs = 1e-5			# Absolute tolerance on the residuals, relative to the maximum power
+		self.epsRel = 1e-5			# Relative tolerance on the residuals
+		self.maxIters = 4000		# Iterations after which the current iterates are returned
+		self.checkInterval = 10		# Iterations between convergence checks
+
+		self.rho = 0.1				# ADMM step size, adapted during the iterations
+		self.rhoEquality = 1e3		# Factor on the step size for the target SoC
+		self.sigma = 1e-6
+		self.alpha = 1.6			# Over-relaxation
+
+		# Statistics of the last call
+		self.iterations = 0			# Maximum number of iterations over all buffers
+		self.infeasible = 0			# Problems that have no feasible solution
+
+	# Solve a list of continuous buffer problems
+	# Each problem is a dict with the arguments of OptAlg.bufferPlanning(), and optionally a warmStart profile (e.g. the previous plan)
+	# Returns a list with a plan per problem, or None if a problem is infeasible within the power limits
+	def bufferPlanning(self, problems):
+		self.iterations = 0
+		self.infeasible = 0
+		results = [None] * len(problems)
+
+		# Buffers with the same horizon share the matrices
+		groups = {}
+		for i in range(0, len(problems)):
+			p = problems[i]
+			n = len(p['desired'])
+			if n == 0:
+				results[i] = []
+				continue
+			merge = p.get('intervalMerge', None)
+			if merge is None:
+				merge = [1] * n
+			beta = p.get('beta', 1)
+			key = (n, tuple(merge), beta == 0)
+			if key not in groups:
+				groups[key] = []
+			groups[key].append(i)
+
+		for (key, idx) in groups.items():
+			plans = self.solveGroup([problems[i] for i in idx], np.array(key[1], dtype=float), key[2])
+			for k in range(0, len(idx)):
+				results[idx[k]] = plans[k]
+
+		return results
+
+# Internal functions
+	def solveGroup(self, problems, merge, pricesOnly):
+		N = len(problems)
+		n = len(merge)
+
+		# Problem data as matrices with a row per buffer
+		desired = np.array([np.real(p['desired']) for p in problems], dtype=float)
+		demand = np.array([np.real(p['demand']) for p in problems], dtype=float)
+		powerMin = np.array([p.get('powerMin', 0) for p in problems], dtype=float)
+		powerMax = np.array([p.get('powerMax', 0) for p in problems], dtype=float)
+		initialSoC = np.array([p['initialSoC'] for p in problems], dtype=float)
+		targetSoC = np.array([p['targetSoC'] for p in problems], dtype=float)
+		beta = np.array([p.get('beta', 1) for p in problems], dtype=float)
+
+		capacity = np.empty((N, n))
+		prices = np.zeros((N, n))
+		lower = np.repeat(powerMin[:, None], n, axis=1)
+		upper = np.repeat(powerMax[:, None], n, axis=1)
+		warm = np.zeros(N, dtype=bool)
+		warmStart = np.zeros((N, n))
+		for k in range(0, N):
+			p = problems[k]
+			capacity[k] = p['capacity']
+			if p.get('prices', None) is not None and beta[k] != 1:
+				prices[k] = np.real(p['prices'])
+			# Power limits are kept within the power range of the buffer, as in OptAlg.bufferPlanning()
+			limits = p.get('powerLimitsLower', [])
+			if len(limits) == n:
+				lower[k] = np.clip(np.real(limits), powerMin[k], powerMax[k])
+			limits = p.get('powerLimitsUpper', [])
+			if len(limits) == n:
+				upper[k] = np.clip(np.real(limits), powerMin[k], powerMax[k])
+			if p.get('warmStart', None) is not None and len(p['warmStart']) == n:
+				warm[k] = True
+				warmStart[k] = np.real(p['warmStart'])
+		lower = np.minimum(lower, upper)
+
+		# Bounds on the energy charged up to the end of each interval, which keep the SoC within [0, capacity]
+		charged = np.cumsum(demand * merge, axis=1)
+		socLower = charged - initialSoC[:, None]
+		socUpper = charged + capacity - initialSoC[:, None]
+		socLower[:, -1] = socUpper[:, -1] = charged[:, -1] + targetSoC - initialSoC
+
+		results = [None] * N
+		feasible = self.feasible(lower * merge, upper * merge, socLower, socUpper)
+		self.infeasible += int(N - np.count_nonzero(feasible))
+		rows = np.nonzero(feasible)[0]
+		if len(rows) == 0:
+			return results
+
+		# Scale each buffer by its maximum power, and the objective by its beta
+		scale = np.maximum(np.maximum(np.abs(powerMin), np.abs(powerMax)), 1.0)[rows, None]
+		lower = lower[rows] / scale
+		upper = upper[rows] / scale
+		socLower = socLower[rows] / scale
+		socUpper = socUpper[rows] / scale
+		if pricesOnly:
+			q = prices[rows]
+			q = q / np.maximum(np.max(np.abs(q), axis=1), 1e-12)[:, None]
+		else:
+			q = -2 * desired[rows] / scale + prices[rows] / (beta[rows, None] * scale)
+
+		# Equilibrate the SoC rows, row k of the cumulative sum has norm ||merge[0:k+1]||
+		rowScale = 1.0 / np.sqrt(np.cumsum(merge * merge))
+		socLower = socLower * rowScale
+		socUpper = socUpper * rowScale
+
+		x = np.clip(np.where(warm[rows, None], warmStart[rows] / scale, 0.0), lower, upper)
+		(plans, iterations) = self.admm(x, q, lower, upper, socLower, socUpper, merge, rowScale, 0.0 if pricesOnly else 2.0)
+		self.iterations = max(self.iterations, iterations)
+
+		plans = self.polish(np.clip(plans, lower, upper), lower, upper, socUpper[:, -1] / rowScale[-1], merge) * scale
+		for k in range(0, len(rows)):
+			results[rows[k]] = plans[k].tolist()
+		return results
+
+	def admm(self, x, q, lower, upper, socLower, socUpper, merge, rowScale, P):
+		# ADMM iterations for all buffers, x, q and the bounds have a row per buffer
+		(N, n) = x.shape
+
+		rho = self.rho
+		rhoSoc = np.full(n, rho)
+		rhoSoc[-1] = rho * self.rhoEquality
+		kinv = self.factorize(P, rho, rhoSoc, merge, rowScale)
+
+		# Constraint values, z1 for the power and z2 for the SoC rows
+		z1 = x.copy()
+		z2 = np.clip(self.socRows(x, merge, rowScale), socLower, socUpper)
+		y1 = np.zeros((N, n))
+		y2 = np.zeros((N, n))
+
+		result = np.zeros((N, n))
+		active = np.arange(0, N)
+		iterations = 0
+		while len(active) > 0 and iterations < self.maxIters:
+			for i in range(0, self.checkInterval):
+				rhs = self.sigma * x - q + (rho * z1 - y1) + self.socRowsTransposed(rhoSoc * z2 - y2, merge, rowScale)
+				xt = rhs @ kinv
+				zt2 = self.socRows(xt, merge, rowScale)
+
+				x = self.alpha * xt + (1 - self.alpha) * x
+				zr1 = self.alpha * xt + (1 - self.alpha) * z1
+				zr2 = self.alpha * zt2 + (1 - self.alpha) * z2
+
+				z1 = np.clip(zr1 + y1 / rho, lower, upper)
+				z2 = np.clip(zr2 + y2 / rhoSoc, socLower, socUpper)
+				y1 += rho * (zr1 - z1)
+				y2 += rhoSoc * (zr2 - z2)
+			iterations += self.checkInterval
+
+			# Residuals per buffer
+			ax2 = self.socRows(x, merge, rowScale)
+			aty = y1 + self.socRowsTransposed(y2, merge, rowScale)
+			primal = np.maximum(np.max(np.abs(x - z1), axis=1), np.max(np.abs(ax2 - z2), axis=1))
+			dual = np.max(np.abs(P * x + q + aty), axis=1)
+			normPrimal = np.maximum(np.maximum(np.max(np.abs(x), axis=1), np.max(np.abs(ax2), axis=1)), np.maximum(np.max(np.abs(z1), axis=1), np.max(np.abs(z2), axis=1)))
+			normDual = np.maximum(np.maximum(np.max(np.abs(P * x), axis=1), np.max(np.abs(aty), axis=1)), np.max(np.abs(q), axis=1))
+			converged = (primal <= self.epsAbs + self.epsRel * normPrimal) & (dual <= self.epsAbs + self.epsRel * normDual)
+
+			if np.any(converged):
+				result[active[converged]] = x[converged]
+				keep = ~converged
+				active = active[keep]
+				(x, q, lower, upper, socLower, socUpper) = (x[keep], q[keep], lower[keep], upper[keep], socLower[keep], socUpper[keep])
+				(z1, z2, y1, y2) = (z1[keep], z2[keep], y1[keep], y2[keep])
+				(primal, dual, normPrimal, normDual) = (primal[keep], dual[keep], normPrimal[keep], normDual[keep])
+				if len(active) == 0:
+					break
+
+			# Adapt the step size to balance the residuals of the buffers that remain
+			ratio = np.median(np.sqrt((primal / np.maximum(normPrimal, 1e-12)) / np.maximum(dual / np.maximum(normDual, 1e-12), 1e-12)))
+			if ratio > 5 or ratio < 0.2:
+				rho = min(max(rho * ratio, 1e-6), 1e6)
+				rhoSoc = np.full(n, rho)
+				rhoSoc[-1] = rho * self.rhoEquality
+				kinv = self.factorize(P, rho, rhoSoc, merge, rowScale)
+
+		# Buffers that did not converge return the current iterate
+		result[active] = x
+		return (result, iterations)
+
+	def polish(self, x, lower, upper, target, merge):
+		# Meet the target SoC exactly, the remaining error is divided over the intervals in proportion to the room within the power bounds
+		error = target - np.sum(x * merge, axis=1)
+		room = np.where(error[:, None] > 0, upper - x, x - lower) * merge
+		total = np.sum(room, axis=1)
+		share = np.where(total > 0, np.minimum(np.abs(error) / np.maximum(total, 1e-12), 1.0), 0.0)
+		return x + np.sign(error)[:, None] * share[:, None] * room / merge
+
+	def factorize(self, P, rho, rhoSoc, merge, rowScale):
+		# Inverse of the (symmetric) matrix of the linear system, P*I + sigma*I + A' diag(rho) A, shared by all buffers
+		n = len(merge)
+		socMatrix = np.tril(np.ones((n, n))) * merge[None, :] * rowScale[:, None]
+		k = (P + self.sigma + rho) * np.eye(n) + socMatrix.T @ (rhoSoc[:, None] * socMatrix)
+		return np.linalg.inv(k)
+
+	def socRows(self, x, merge, rowScale):
+		# Scaled cumulative sums, i.e. the SoC rows of A times x
+		return np.cumsum(x * merge, axis=1) * rowScale
+
+	def socRowsTransposed(self, y, merge, rowScale):
+		# The transposed SoC rows of A times y
+		return np.cumsum((y * rowScale)[:, ::-1], axis=1)[:, ::-1] * merge
+
+	def feasible(self, lower, upper, socLower, socUpper):
+		# Whether the SoC bounds can be met within the power bounds, by propagating the reachable charged energy per interval
+		(N, n) = lower.shape
+		tolerance = 1e-6 * np.maximum(np.max(np.abs(socUpper), axis=1), 1.0)
+		result = np.ones(N, dtype=bool)
+		a = np.zeros(N)
+		b = np.zeros(N)
+		for k in range(0, n):
+			a = np.maximum(a + lower[:, k], socLower[:, k])
+			b = np.minimum(b + upper[:, k], socUpper[:, k])
+			result &= a <= b + tolerance
+		return result
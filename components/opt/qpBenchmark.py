@@ -0,0 +1,91 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Comparison of the greedy and QP buffer planning for fleets of batteries, but not a unit test!
+# The greedy algorithms plan one battery at a time, the QP solver plans the whole fleet at once (OptAlg.bufferPlanningFleet).
+# The warm started QP continues from the plans of a slightly different desired profile, as in the next iteration of profile steering.
+# Quality is the objective relative to the greedy planning, and the violation of the SoC limits relative to the capacity.
+# Run from the components folder
+
+import copy
+import math
+import random
+import time
+
+import numpy as np
+
+from opt.optAlg import OptAlg
+
+n = 96
+
+def battery():
+	capacity = random.uniform(5000, 20000) * 4	# Wh, in power per interval of 15 minutes
+	powerMax = random.uniform(2000, 5000)
+	beta = random.choice([1, 1, 0.5])
+	limits = random.random() < 0.3
+	offset = random.uniform(0, 2 * math.pi)
+	return {'desired': [random.uniform(-3000, 3000) + 2000 * math.sin(offset + i / 10) for i in range(0, n)],
+			'targetSoC': random.uniform(0.2, 0.8) * capacity,
+			'initialSoC': random.uniform(0.2, 0.8) * capacity,
+			'capacity': capacity,
+			'demand': [0.0] * n,
+			'chargingPowers': [],
+			'powerMin': -powerMax,
+			'powerMax': powerMax,
+			'powerLimitsLower': [-1500.0] * n if limits else [],
+			'powerLimitsUpper': [1500.0] * n if limits else [],
+			'prices': [random.uniform(0, 0.3) for i in range(0, n)],
+			'beta': beta}
+
+def objective(problem, plan):
+	x = np.real(plan)
+	result = problem['beta'] * np.sum((x - np.array(problem['desired'])) ** 2)
+	if problem['beta'] != 1:
+		result += np.dot(problem['prices'], x)
+	return result
+
+def violation(problem, plan):
+	soc = problem['initialSoC'] + np.cumsum(np.real(plan))
+	v = max(np.max(-soc[:-1]), np.max(soc[:-1] - problem['capacity']), abs(soc[-1] - problem['targetSoC']), 0)
+	return v / problem['capacity']
+
+def plan(solver, problems):
+	opt = OptAlg()
+	opt.solver = solver
+	problems = copy.deepcopy(problems)	# The greedy algorithms change their arguments
+	start = time.time()
+	result = opt.bufferPlanningFleet(problems)
+	return (result, time.time() - start)
+
+def quality(problems, reference, result):
+	gaps = [(objective(p, b) - objective(p, a)) / max(abs(objective(p, a)), 1.0) for (p, a, b) in zip(problems, reference, result)]
+	return (np.mean(gaps), np.max(gaps), max(violation(p, b) for (p, b) in zip(problems, result)))
+
+random.seed(42)
+print("%8s %-12s %10s %12s %12s %14s" % ("fleet", "solver", "time [s]", "mean gap", "max gap", "max violation"))
+for size in [10, 100, 1000, 10000]:
+	problems = [battery() for i in range(0, size)]
+	(greedy, greedyTime) = plan('greedy', problems)
+	(qp, qpTime) = plan('qp', problems)
+
+	# Next iteration: the desired profiles change slightly and the QP starts from the previous plans
+	nextProblems = [dict(p, desired=[d + random.uniform(-300, 300) for d in p['desired']]) for p in problems]
+	(greedyNext, greedyNextTime) = plan('greedy', nextProblems)
+	(warm, warmTime) = plan('qp', [dict(p, warmStart=greedy[i]) for (i, p) in enumerate(nextProblems)])
+
+	print("%8d %-12s %10.3f %12s %12s %14.2e" % (size, "greedy", greedyTime, "", "", quality(problems, greedy, greedy)[2]))
+	print("%8d %-12s %10.3f %12.2e %12.2e %14.2e" % ((size, "qp", qpTime) + quality(problems, greedy, qp)))
+	print("%8d %-12s %10.3f %12s %12s %14.2e" % (size, "greedy next", greedyNextTime, "", "", quality(nextProblems, greedyNext, greedyNext)[2]))
+	print("%8d %-12s %10.3f %12.2e %12.2e %14.2e" % ((size, "qp warm", warmTime) + quality(nextProblems, greedyNext, warm)))
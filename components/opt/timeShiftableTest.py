@@ -0,0 +1,68 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Comparison of the loop and correlation based timeshiftable planning, but not a unit test!
+# Run from the opt folder
+
+import random
+import time
+
+import optAlg
+
+random.seed(42)
+
+loop = optAlg.OptAlg()
+loop.fastTimeShiftable = False
+fast = optAlg.OptAlg()
+
+# Same start times for random cases, including complex values, (complex) prices, limits and ties (zero desired profiles)
+cases = 0
+for n in [1, 8, 9, 96, 672]:
+	for k in range(0, 50):
+		m = random.randint(1, min(n, 12))
+		profile = [complex(random.uniform(0, 2000), random.uniform(-200, 200)) for i in range(0, m)]
+		if k % 5 == 0:
+			desired = [0.0] * n
+		else:
+			desired = [complex(random.uniform(-3000, 3000), random.uniform(-500, 500)) for i in range(0, n)]
+		prices = None
+		if k % 2 == 0:
+			prices = [random.uniform(0, 0.3) for i in range(0, n)]
+		if k % 4 == 2:
+			# Prices read from readers are complex, only their real part is a cost
+			prices = [complex(p, random.uniform(-0.3, 0.3)) for p in prices]
+		lower = []
+		upper = []
+		if k % 3 == 0:
+			lower = [-1000.0] * n
+			upper = [1000.0] * n
+
+		r1 = loop.timeShiftablePlanning(desired, profile, lower, upper, prices, 0.5 + k / 50)
+		r2 = fast.timeShiftablePlanning(desired, profile, lower, upper, prices, 0.5 + k / 50)
+		assert(r1 == r2)
+		cases += 1
+
+print("Equal results for", cases, "cases")
+
+# Timing for a weekly horizon of 15 minute intervals
+n = 672
+desired = [complex(random.uniform(-3000, 3000), 0) for i in range(0, n)]
+prices = [random.uniform(0, 0.3) for i in range(0, n)]
+for (name, profile) in [("washing machine", [100, 2000, 2000, 500, 500, 500, 1000, 200]), ("dishwasher", [66.0] * 4 + [1900.0] * 4 + [50.0] * 4)]:
+	for (alg, opt, runs) in [("loop", loop, 5), ("correlation", fast, 500)]:
+		start = time.time()
+		for i in range(0, runs):
+			opt.timeShiftablePlanning(desired, profile, [], [], prices, 1)
+		print("%-16s %-12s %8.1f us per planning" % (name, alg, (time.time() - start) / runs * 1000000))
@@ -15,9 +15,13 @@
 
 #helper function to convert some input data from the ALPG into lists for model creation
 
+# Files that were read, such that model snapshots can detect changed input data (see util/modelComposer.py)
+inputFiles = set()
+
 def listFromFile(fname):
 	result = []
 	cnt = 0
+	inputFiles.add(fname)
 	fin = open(fname, 'r')
 	for line in fin:
 		arr = []
@@ -34,6 +38,7 @@ def listFromFile(fname):
 def listFromFileStr(fname):
 	result = []
 	cnt = 0
+	inputFiles.add(fname)
 	fin = open(fname, 'r')
 	for line in fin:
 		arr = []
@@ -49,6 +54,7 @@ def listFromFileStr(fname):
 
 def indexFromFile(fname, hnum):
 	cnt = 0
+	inputFiles.add(fname)
 	fin = open(fname, 'r')
 	for line in fin:
 		line = int(line.split(':')[0])
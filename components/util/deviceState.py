@@ -0,0 +1,220 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Compact state representation for (large numbers of) devices
+# The DeviceStateStore keeps the frequently updated state of all devices of a host in arrays (struct-of-arrays),
+# one row per device. Devices keep using self.consumption[c] and self.soc as before, these are views on the store.
+# Enable with host.compactDeviceState = True before creating the devices.
+
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+# Drop-in replacement for threading.Lock in single threaded simulations, see Core.createLock()
+class NoLock():
+	__slots__ = ()
+
+	def acquire(self, blocking=True, timeout=-1):
+		return True
+
+	def release(self):
+		pass
+
+	def locked(self):
+		return False
+
+	def __enter__(self):
+		return True
+
+	def __exit__(self, *args):
+		return False
+
+
+# Lock that counts the number of times it was released, used as version of the state it protects
+# Devices guard their state with it (lockState), so a PropertiesView knows when its snapshot is outdated
+class StateLock():
+	__slots__ = ('lock', 'version')
+
+	def __init__(self, lock):
+		self.lock = lock
+		self.version = 0
+
+	def acquire(self, blocking=True, timeout=-1):
+		return self.lock.acquire(blocking, timeout)
+
+	def release(self):
+		self.version += 1
+		self.lock.release()
+
+	def locked(self):
+		return self.lock.locked()
+
+	def __enter__(self):
+		return self.acquire()
+
+	def __exit__(self, *args):
+		self.release()
+		return False
+
+
+class DeviceStateStore():
+	def __init__(self, capacity=64):
+		self.size = 0
+		self.devices = []
+
+		# Commodities get a column in the consumption arrays
+		self.commodityIndex = {}
+		self.commodityNames = []
+
+		# State arrays, row i belongs to self.devices[i]
+		# Note that these arrays may be larger than the number of devices to allow for cheap appending
+		self.consumption = np.zeros((capacity, 1), dtype=complex)
+		self.hasConsumption = np.zeros((capacity, 1), dtype=bool)
+		self.isComplex = np.zeros((capacity, 1), dtype=bool)	# Real valued consumption (e.g. heat) is returned as float
+		self.soc = np.zeros(capacity, dtype=float)
+		self.hasSoc = np.zeros(capacity, dtype=bool)
+
+	def allocate(self, device):
+		if self.size == len(self.soc):
+			self.grow()
+
+		slot = self.size
+		self.devices.append(device)
+		self.size += 1
+		return slot
+
+	def grow(self):
+		capacity = len(self.soc)
+		self.consumption = np.concatenate((self.consumption, np.zeros(self.consumption.shape, dtype=complex)))
+		self.hasConsumption = np.concatenate((self.hasConsumption, np.zeros(self.hasConsumption.shape, dtype=bool)))
+		self.isComplex = np.concatenate((self.isComplex, np.zeros(self.isComplex.shape, dtype=bool)))
+		self.soc = np.concatenate((self.soc, np.zeros(capacity, dtype=float)))
+		self.hasSoc = np.concatenate((self.hasSoc, np.zeros(capacity, dtype=bool)))
+
+	def column(self, commodity):
+		# Get the column of a commodity, adding it when required
+		if commodity not in self.commodityIndex:
+			idx = len(self.commodityNames)
+			if idx == self.consumption.shape[1]:
+				rows = self.consumption.shape[0]
+				self.consumption = np.concatenate((self.consumption, np.zeros((rows, idx), dtype=complex)), axis=1)
+				self.hasConsumption = np.concatenate((self.hasConsumption, np.zeros((rows, idx), dtype=bool)), axis=1)
+				self.isComplex = np.concatenate((self.isComplex, np.zeros((rows, idx), dtype=bool)), axis=1)
+			self.commodityIndex[commodity] = idx
+			self.commodityNames.append(commodity)
+
+		return self.commodityIndex[commodity]
+
+	# Aggregates over all devices, e.g. for statistics
+	def totalConsumption(self, commodity):
+		if commodity not in self.commodityIndex:
+			return complex(0.0, 0.0)
+		return complex(self.consumption[:self.size, self.commodityIndex[commodity]].sum())
+
+
+# Dict-like view on the consumption of a single device in the store
+class ConsumptionView(MutableMapping):
+	__slots__ = ('store', 'slot')
+
+	def __init__(self, store, slot):
+		self.store = store
+		self.slot = slot
+
+	def __getitem__(self, commodity):
+		idx = self.store.commodityIndex.get(commodity, -1)
+		if idx < 0 or not self.store.hasConsumption[self.slot, idx]:
+			raise KeyError(commodity)
+		if self.store.isComplex[self.slot, idx]:
+			return complex(self.store.consumption[self.slot, idx])
+		return float(self.store.consumption[self.slot, idx].real)
+
+	def __setitem__(self, commodity, value):
+		idx = self.store.column(commodity)
+		self.store.consumption[self.slot, idx] = value
+		self.store.hasConsumption[self.slot, idx] = True
+		self.store.isComplex[self.slot, idx] = isinstance(value, (complex, np.complexfloating))
+
+	def __delitem__(self, commodity):
+		idx = self.store.commodityIndex.get(commodity, -1)
+		if idx < 0 or not self.store.hasConsumption[self.slot, idx]:
+			raise KeyError(commodity)
+		self.store.consumption[self.slot, idx] = 0.0
+		self.store.hasConsumption[self.slot, idx] = False
+
+	def __iter__(self):
+		present = self.store.hasConsumption[self.slot]
+		return iter([c for c, idx in self.store.commodityIndex.items() if present[idx]])
+
+	def __len__(self):
+		return int(self.store.hasConsumption[self.slot].sum())
+
+	def __repr__(self):
+		return repr(dict(self))
+
+	# Copies and pickles (persistence) of the view are plain dicts
+	def __reduce__(self):
+		return (dict, (dict(self), ))
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		return dict(self)
+
+
+# Cheap read-only view on the properties of a device, as an alternative to getProperties()
+# The properties kept in the compact state store (Device.stateProperties) are looked up on the device when accessed,
+# so these are always current. All other properties come from a snapshot of getProperties(), which refresh() only
+# retakes when the device changed its state since, i.e. when Device.propertiesVersion changed.
+class PropertiesView(Mapping):
+	__slots__ = ('device', 'names', 'live', 'snapshot', 'version')
+
+	def __init__(self, device):
+		self.device = device
+		self.version = None
+		self.refresh()
+
+	def refresh(self):
+		if self.version == self.device.propertiesVersion:
+			return
+
+		self.snapshot = self.device.getProperties()
+		self.names = tuple(self.snapshot.keys())
+		self.live = frozenset(k for k in self.device.stateProperties if k in self.snapshot)
+		# getProperties() itself releases lockState, so take the version afterwards
+		self.version = self.device.propertiesVersion
+
+	def __getitem__(self, key):
+		if key in self.live:
+			return getattr(self.device, key)
+		return self.snapshot[key]
+
+	def __iter__(self):
+		return iter(self.names)
+
+	def __len__(self):
+		return len(self.names)
+
+	def __repr__(self):
+		return repr(dict(self))
+
+	def __reduce__(self):
+		return (dict, (dict(self), ))
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		return dict(self)
@@ -19,7 +19,7 @@ from util.reader import Reader
 from usrconf import demCfg
 
 class InfluxDBReader(Reader):
-	def __init__(self, measurement, address=None, port=None, database=None, timeBase=60, aggregation='mean', offset=None, raw=False, value="W-power.real.c.ELECTRICITY", tags={}, host=None):
+	def __init__(self, measurement, address=None, port=None, database=None, timeBase=60, aggregation='mean', offset=None, raw=False, value="W-power.real.c.ELECTRICITY", tags={}, host=None, pool=None):
 		Reader.__init__(self, timeBase, -1, offset, host)
 
 		self.cacheFuture = False # Allow to cache future data. Useful in case of given simulation data
@@ -59,6 +59,13 @@ class InfluxDBReader(Reader):
 		self.value = value
 		self.tags = tags
 
+		# Optional shared pool that batches the queries of many readers, see util/influxdbReaderPool.py
+		self.pool = pool
+		if self.pool is None and self.host is not None and hasattr(self.host, 'getInfluxDBReaderPool'):
+			self.pool = self.host.getInfluxDBReaderPool()
+		if self.pool is not None and not self.raw:
+			self.pool.register(self.connection(), self.measurement, self.value, self.aggregation, self.timeBase, self.tags)
+
 		# self.host.logDebug(
 		# 	"[influxDbReader].init() - " + self.database
 		# 	+ " - " + self.measurement
@@ -75,6 +82,9 @@ class InfluxDBReader(Reader):
 		if tags is None:
 			tags = self.tags
 
+		if self.pool is not None and not self.raw:
+			return self.pool.retrieveValues(self.connection(), self.measurement, value, self.aggregation, self.timeBase, tags, startTime, endTime)
+
 		# Create a string from the tags to put in the query
 		condition = ""
 		if tags:
@@ -91,13 +101,21 @@ class InfluxDBReader(Reader):
 
 		return r
 
-	def getData(self, query, startTime, endTime):
+	def connection(self):
+		return (self.url(), self.database, self.user, self.password, self.token)
 
+	def url(self):
 		url = self.address + ":" + str(self.port) + "/query"
 
 		if not url.startswith("http"):
 			url = "http://" + url
 
+		return url
+
+	def getData(self, query, startTime, endTime):
+
+		url = self.url()
+
 		payload = {}
 		payload['db'] = self.database
 		payload['q'] = query
@@ -118,9 +136,10 @@ class InfluxDBReader(Reader):
 		else:
 			result = [None] * int((endTime - startTime) / self.timeBase)
 			try:
-				if('series' in r.json()['results'][0]):
+				data = r.json()	# Decode only once
+				if('series' in data['results'][0]):
 					idx = 0
-					d = r.json()['results'][0]['series'][0]['values']
+					d = data['results'][0]['series'][0]['values']
 					for value in d:
 						result[idx] = value[1]
 						idx += 1
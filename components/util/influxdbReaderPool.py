@@ -0,0 +1,186 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time as tm
+
+import numpy as np
+
+# Shared backend for InfluxDBReader and IeconInfluxDBReader instances
+# Readers register the series (measurement, field and tag values) they read. Series that only differ in their tag values
+# form a group. When a reader needs a new window of data, the pool retrieves that window for all series in the group with
+# a single query (GROUP BY the tags) over a persistent HTTP session, decodes the response once and keeps the result in a
+# shared cache, such that the other readers of the group are served without additional round-trips.
+# Enable with host.bulkInfluxReading = True before the readers are created, or pass a pool to the readers directly.
+class InfluxDBReaderPool():
+	def __init__(self, host=None):
+		self.host = host
+
+		# Persistent session with connection pooling
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+		self.session.mount('http://', adapter)
+		self.session.mount('https://', adapter)
+
+		# Registered series per group, the group key describes the query apart from the tag values
+		self.groups = {}
+		self.groupLocks = {}
+
+		# Cache of retrieved windows: (groupKey, startTime, endTime) -> entry
+		self.cache = {}
+		self.maxCacheEntries = 64
+		self.cacheTimeout = 60		# Seconds (host time) a window remains valid, as live data keeps changing
+		self.maxSeriesPerQuery = 100
+
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.queries = 0
+		self.hits = 0
+		self.misses = 0
+
+	# Register a series such that it is included in the batched queries
+	# connection is a tuple (url, database, user, password, token)
+	def register(self, connection, measurement, field, aggregation, timeBase, tags):
+		groupKey, tagValues = self.groupKey(connection, measurement, field, aggregation, timeBase, tags)
+
+		self.lock.acquire()
+		if groupKey not in self.groups:
+			self.groups[groupKey] = set()
+			self.groupLocks[groupKey] = threading.Lock()
+		self.groups[groupKey].add(tagValues)
+		self.lock.release()
+
+		return groupKey, tagValues
+
+	def retrieveValues(self, connection, measurement, field, aggregation, timeBase, tags, startTime, endTime):
+		groupKey, tagValues = self.register(connection, measurement, field, aggregation, timeBase, tags)
+		cacheKey = (groupKey, startTime, endTime)
+
+		# Only one refill per group at a time, others wait and are then served from the cache
+		self.groupLocks[groupKey].acquire()
+		try:
+			self.lock.acquire()
+			entry = self.cache.get(cacheKey, None)
+			if entry is not None and (self.now() - entry['time'] > self.cacheTimeout or tagValues not in entry['series']):
+				entry = None
+			if entry is None:
+				self.misses += 1
+				series = frozenset(self.groups[groupKey])
+			else:
+				self.hits += 1
+			self.lock.release()
+
+			if entry is None:
+				entry = {'time': self.now(), 'series': series, 'data': self.getData(groupKey, series, startTime, endTime)}
+
+				self.lock.acquire()
+				if len(self.cache) >= self.maxCacheEntries:
+					# Drop the oldest window
+					del self.cache[min(self.cache, key=lambda k: self.cache[k]['time'])]
+				self.cache[cacheKey] = entry
+				self.lock.release()
+		finally:
+			self.groupLocks[groupKey].release()
+
+		intervals = int((endTime - startTime) / timeBase)
+		if tagValues not in entry['data']:
+			return [None] * intervals
+
+		# Missing values (None in the response) are stored as NaN
+		return [None if v != v else v for v in entry['data'][tagValues].tolist()]
+
+	def flushCache(self):
+		self.lock.acquire()
+		self.cache = {}
+		self.lock.release()
+
+# Internal functions
+	def groupKey(self, connection, measurement, field, aggregation, timeBase, tags):
+		if tags is None:
+			tags = {}
+		tagKeys = tuple(sorted(tags.keys()))
+		tagValues = tuple(str(tags[k]) for k in tagKeys)
+		return (tuple(connection), measurement, field, aggregation, timeBase, tagKeys), tagValues
+
+	def now(self):
+		if self.host is not None:
+			return self.host.time()
+		return tm.time()
+
+	def buildQuery(self, groupKey, series, startTime, endTime):
+		(connection, measurement, field, aggregation, timeBase, tagKeys) = groupKey
+
+		condition = ""
+		groupBy = ""
+		if len(tagKeys) > 0:
+			options = []
+			for tagValues in sorted(series):
+				options.append('(' + ' AND '.join('\"' + k + '\" = \'' + v + '\'' for k, v in zip(tagKeys, tagValues)) + ')')
+			condition = '(' + ' OR '.join(options) + ') AND '
+			groupBy = ', ' + ', '.join('\"' + k + '\"' for k in tagKeys)
+
+		query = 'SELECT ' + aggregation + '(\"' + field + '\") FROM \"' + measurement + '\" WHERE ' + condition + 'time >= ' + str(
+			startTime) + '000000000 AND time < ' + str(endTime) + '000000000 GROUP BY time(' + str(
+			timeBase) + 's)' + groupBy + ' fill(previous) ORDER BY time ASC'
+
+		return query
+
+	def getData(self, groupKey, series, startTime, endTime):
+		(connection, measurement, field, aggregation, timeBase, tagKeys) = groupKey
+		(url, database, user, password, token) = connection
+
+		payload = {}
+		payload['db'] = database
+		if not token:
+			payload['u'] = user
+			payload['p'] = password
+
+		headers = None
+		if token:
+			headers = {
+				'Authorization': f'Token {token}',
+			}
+
+		intervals = int((endTime - startTime) / timeBase)
+		result = {}
+
+		series = sorted(series)
+		for i in range(0, len(series), self.maxSeriesPerQuery):
+			# The query is sent in the body, as it may become too long for the url
+			body = {'q': self.buildQuery(groupKey, series[i:i+self.maxSeriesPerQuery], startTime, endTime)}
+			self.queries += 1
+
+			try:
+				r = self.session.post(url, params=payload, data=body, headers=headers)
+				data = r.json()	# Decode only once
+
+				for res in data.get('results', []):
+					for s in res.get('series', []):
+						t = s.get('tags', {})
+						tagValues = tuple(str(t.get(k, '')) for k in tagKeys)
+
+						values = np.full(intervals, np.nan)
+						column = [row[1] for row in s['values'][:intervals]]
+						values[:len(column)] = np.array(column, dtype=float)
+						result[tagValues] = values
+
+			except Exception as e:
+				if self.host is not None:
+					self.host.logWarning("[InfluxDBReaderPool].getData() exception - " + str(e))
+
+		return result
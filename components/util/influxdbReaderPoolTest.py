@@ -0,0 +1,96 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Small test of the InfluxDBReaderPool against a local fake InfluxDB server, but not a unit test!
+# Run from the components folder with the conf folder on the PYTHONPATH
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import re
+import threading
+
+from util.influxdbReader import InfluxDBReader
+from util.influxdbReaderPool import InfluxDBReaderPool
+
+requests = 0
+
+# Answers a query with one series per requested ENAME, value = index of the entity * 1000 + interval
+class FakeInflux(BaseHTTPRequestHandler):
+	def do_POST(self):
+		global requests
+		requests += 1
+
+		length = int(self.headers.get('Content-Length', 0))
+		params = parse_qs(urlparse(self.path).query)
+		params.update(parse_qs(self.rfile.read(length).decode()))
+		q = params['q'][0]
+
+		start = int(re.search(r'time >= (\d+)000000000', q).group(1))
+		end = int(re.search(r'time < (\d+)000000000', q).group(1))
+		timeBase = int(re.search(r'GROUP BY time\((\d+)s\)', q).group(1))
+
+		series = []
+		for name in re.findall(r'"ENAME" = \'([^\']+)\'', q):
+			idx = int(name[3:])
+			values = [[start + i*timeBase, idx*1000 + i] for i in range(0, int((end-start)/timeBase))]
+			values[3][1] = None		# A gap
+			s = {'name': 'test', 'columns': ['time', 'mean'], 'values': values}
+			if 'GROUP BY time(' + str(timeBase) + 's), "ENAME"' in q:
+				s['tags'] = {'ENAME': name}
+			series.append(s)
+
+		body = json.dumps({'results': [{'statement_id': 0, 'series': series}]}).encode()
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+server = HTTPServer(('127.0.0.1', 0), FakeInflux)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+port = server.server_address[1]
+
+# The readers only need the logging of the host
+class Host():
+	def logDebug(self, msg):
+		pass
+
+	def logWarning(self, msg):
+		print(msg)
+
+host = Host()
+pool = InfluxDBReaderPool()
+n = 50
+pooled = [InfluxDBReader('test', address='127.0.0.1', port=port, database='test', timeBase=60, value='POW', tags={'ENAME': 'dev' + str(i)}, host=host, pool=pool) for i in range(0, n)]
+direct = [InfluxDBReader('test', address='127.0.0.1', port=port, database='test', timeBase=60, value='POW', tags={'ENAME': 'dev' + str(i)}, host=host) for i in range(0, n)]
+
+requests = 0
+resultsPooled = [r.retrieveValues(0, 3600) for r in pooled]
+print("Pooled readers:", requests, "requests, pool hits/misses:", pool.hits, pool.misses)
+assert(requests == 1)
+
+requests = 0
+resultsDirect = [r.retrieveValues(0, 3600) for r in direct]
+print("Direct readers:", requests, "requests")
+
+assert(resultsPooled == resultsDirect)
+assert(resultsPooled[7][3] is None and resultsPooled[7][4] == 7004)
+print("Results are equal")
+
+server.shutdown()
@@ -0,0 +1,182 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Live I/O layer for devices and environments that are backed by external services (MQTT, HTTP, Modbus, ...)
+# The LiveIOService runs an asyncio event loop in a separate thread that performs all external I/O, such that
+# the duration of a tick does not depend on the latency of external services.
+# Samples are stored in fixed-size RingBuffers with running aggregates, of which preTick takes a non-blocking snapshot.
+
+import asyncio
+import concurrent.futures
+import threading
+import time as tm
+
+import numpy as np
+import requests
+
+class RingBuffer():
+	def __init__(self, size=600):
+		self.size = size
+		self.values = np.zeros(size)
+		self.times = np.zeros(size)
+		self.idx = 0		# Position of the next sample
+		self.count = 0		# Number of valid samples, at most size
+
+		# Running aggregates of the samples since the last drain()
+		self.runSum = 0.0
+		self.runCount = 0
+		self.runMin = float('inf')
+		self.runMax = float('-inf')
+
+		self.last = None
+		self.lastTime = -1
+
+		self.lock = threading.Lock()
+
+	def append(self, value, timestamp=None):
+		# May be called from any thread, e.g. the callbacks of an MQTT client
+		if timestamp is None:
+			timestamp = tm.time()
+		value = float(value)
+
+		self.lock.acquire()
+		self.values[self.idx] = value
+		self.times[self.idx] = timestamp
+		self.idx = (self.idx + 1) % self.size
+		self.count = min(self.size, self.count + 1)
+
+		self.runSum += value
+		self.runCount += 1
+		self.runMin = min(self.runMin, value)
+		self.runMax = max(self.runMax, value)
+
+		self.last = value
+		self.lastTime = timestamp
+		self.lock.release()
+
+	def drain(self):
+		# Returns the mean and number of samples since the previous drain, and starts a new aggregation period
+		self.lock.acquire()
+		count = self.runCount
+		mean = self.runSum / count if count > 0 else None
+
+		self.runSum = 0.0
+		self.runCount = 0
+		self.runMin = float('inf')
+		self.runMax = float('-inf')
+		self.lock.release()
+
+		return mean, count
+
+	def snapshot(self):
+		# Non-destructive view of the current aggregation period
+		self.lock.acquire()
+		r = {
+			'mean': self.runSum / self.runCount if self.runCount > 0 else None,
+			'min': self.runMin if self.runCount > 0 else None,
+			'max': self.runMax if self.runCount > 0 else None,
+			'count': self.runCount,
+			'last': self.last,
+			'lastTime': self.lastTime
+		}
+		self.lock.release()
+
+		return r
+
+	def history(self, since=None):
+		# Copy of the stored samples (times, values) in chronological order, optionally only those after since
+		self.lock.acquire()
+		if self.count < self.size:
+			times = self.times[:self.count].copy()
+			values = self.values[:self.count].copy()
+		else:
+			times = np.roll(self.times, -self.idx)
+			values = np.roll(self.values, -self.idx)
+		self.lock.release()
+
+		if since is not None:
+			mask = times > since
+			return times[mask], values[mask]
+		return times, values
+
+
+class LiveIOService():
+	def __init__(self, host, workers=8):
+		self.host = host
+
+		self.loop = None
+		self.thread = None
+
+		# Blocking libraries (requests, Modbus clients, ...) run in this pool without blocking the event loop
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LiveIO")
+
+		# Shared HTTP session for the pollers
+		self.session = requests.Session()
+
+		self.buffers = {}
+		self.pollers = []
+
+	def start(self):
+		if self.thread is None:
+			self.loop = asyncio.new_event_loop()
+			self.loop.set_default_executor(self.executor)
+			self.thread = threading.Thread(target=self.loop.run_forever, name="LiveIO", daemon=True)
+			self.thread.start()
+
+	def stop(self):
+		if self.thread is not None:
+			for p in self.pollers:
+				p.cancel()
+			self.loop.call_soon_threadsafe(self.loop.stop)
+			self.thread.join(5.0)
+			self.thread = None
+			self.executor.shutdown(wait=False)
+
+	def buffer(self, name, size=600):
+		if name not in self.buffers:
+			self.buffers[name] = RingBuffer(size)
+		return self.buffers[name]
+
+	def run(self, func, *args):
+		# Run a coroutine or blocking function once in the background, returns a concurrent Future
+		self.start()
+		return asyncio.run_coroutine_threadsafe(self.call(func, *args), self.loop)
+
+	def poll(self, func, interval, buffer=None, *args):
+		# Call func every interval seconds. Results that are not None are added to the buffer, if given
+		# Returns a concurrent Future that can be cancelled to stop polling
+		self.start()
+		future = asyncio.run_coroutine_threadsafe(self.pollLoop(func, interval, buffer, *args), self.loop)
+		self.pollers.append(future)
+		return future
+
+# Internal functions
+	async def call(self, func, *args):
+		if asyncio.iscoroutinefunction(func):
+			return await func(*args)
+		return await self.loop.run_in_executor(None, func, *args)
+
+	async def pollLoop(self, func, interval, buffer, *args):
+		while True:
+			start = self.loop.time()
+			try:
+				value = await self.call(func, *args)
+				if buffer is not None and value is not None:
+					buffer.append(value)
+			except Exception as e:
+				if self.host is not None:
+					self.host.logWarning("[LiveIO] Polling error: " + str(e))
+
+			await asyncio.sleep(max(0.0, interval - (self.loop.time() - start)))
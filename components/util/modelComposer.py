@@ -13,9 +13,33 @@
 # limitations under the License.
 
 
+import ast
 import os
 import importlib
 import sys
+import hashlib
+import pickle
+import threading
+import types
+import _thread
+
+import util.alpg
+
+# Pickler for the entity graph of a model, locks cannot be pickled and are recreated instead
+# Classes and functions defined in the model itself are refused, restoring these would require the model to be executed again
+class SnapshotPickler(pickle.Pickler):
+	def __init__(self, file, protocol, model):
+		pickle.Pickler.__init__(self, file, protocol)
+		self.model = model
+
+	def reducer_override(self, obj):
+		if isinstance(obj, _thread.LockType):
+			return (threading.Lock, ())
+		if isinstance(obj, _thread.RLock):
+			return (threading.RLock, ())
+		if type(obj).__module__ == self.model or (isinstance(obj, (type, types.FunctionType)) and obj.__module__ == self.model):
+			raise pickle.PicklingError("Model defines its own class or function: " + getattr(obj, '__qualname__', type(obj).__qualname__))
+		return NotImplemented
 
 class ModelComposer():
 	def __init__(self, name):
@@ -24,6 +48,17 @@ class ModelComposer():
 		self.files = []
 		self.clear()
 
+		# Model snapshots: the constructed model (all entities and their parameters) is stored just before the
+		# simulation starts. Later runs with the same composed source, DEMKit components and input data restore the
+		# snapshot instead of constructing the model again.
+		# The snapshot starts with a header that records the model, a hash of its composed source, the DEMKit components,
+		# the Python version and the hashes of the input data. The snapshot is only restored if all of these match.
+		# Models that define their own classes or functions, or that run code after startSimulation(), are not stored,
+		# as restoring the snapshot skips the execution of the composed model altogether.
+		self.useSnapshot = False
+		self.snapshotFile = self.fileName + ".snapshot"
+		self.dataFiles = []		# Additional input files, files read through util.alpg are tracked automatically
+
 	def clear(self):
 		# Check if the file exists
 		if os.path.isfile(self.fileName+".py"):
@@ -32,6 +67,9 @@ class ModelComposer():
 	def add(self, name):
 		self.files.append(name)
 
+	def addData(self, name):
+		self.dataFiles.append(name)
+
 	def compose(self):
 		# Compose all files into one new source file
 		sys.stderr.write("Starting model composition into: "+self.fileName+".py\n")
@@ -55,4 +93,106 @@ class ModelComposer():
 		sys.stderr.write("Importing composed model: "+self.fileName+"\n")
 		sys.stderr.flush()
 
-		importlib.import_module(self.fileName)
\ No newline at end of file
+		if self.useSnapshot:
+			host = self.loadSnapshot()
+			if host is not None:
+				# Repeat the side effects of the model construction
+				if getattr(host, 'clearedDatabase', False):
+					host.clearDatabase()
+				host.startSimulation()
+				return
+
+			# Store the model once it is constructed, see Host.startSimulation()
+			from hosts.host import Host
+			Host.modelSnapshot = self.saveSnapshot
+			util.alpg.inputFiles.clear()
+
+		importlib.import_module(self.fileName)
+
+	def loadSnapshot(self):
+		if not os.path.isfile(self.snapshotFile):
+			return None
+
+		try:
+			with open(self.snapshotFile, 'rb') as f:
+				meta = pickle.load(f)
+				if not isinstance(meta, dict) or meta.get('model') != self.fileName:
+					sys.stderr.write("Model snapshot does not belong to this model, constructing the model\n")
+					return None
+				if meta['source'] != self.fileDigest(self.fileName + ".py") or meta['components'] != self.componentsKey() or meta['python'] != sys.version:
+					sys.stderr.write("Model snapshot is outdated, constructing the model\n")
+					return None
+				for name, digest in meta['inputs'].items():
+					if self.fileDigest(name) != digest:
+						sys.stderr.write("Input file changed: " + name + ", constructing the model\n")
+						return None
+
+				sys.stderr.write("Restoring model snapshot: " + self.snapshotFile + "\n")
+				sys.stderr.flush()
+				return pickle.load(f)
+		except Exception as e:
+			sys.stderr.write("Could not restore the model snapshot, constructing the model: " + str(e) + "\n")
+			return None
+
+	def saveSnapshot(self, host):
+		inputs = {}
+		for name in list(self.dataFiles) + sorted(util.alpg.inputFiles):
+			inputs[name] = self.fileDigest(name)
+		meta = {'model': self.fileName, 'source': self.fileDigest(self.fileName + ".py"), 'components': self.componentsKey(), 'python': sys.version, 'inputs': inputs}
+
+		if self.runsAfterStart():
+			sys.stderr.write("Model runs code after startSimulation(), no snapshot is stored\n")
+			return
+
+		try:
+			data = self.pickleModel(host)
+		except Exception as e:
+			sys.stderr.write("Model cannot be stored as snapshot: " + str(e) + "\n")
+			return
+
+		with open(self.snapshotFile + ".tmp", 'wb') as f:
+			pickle.dump(meta, f)
+			f.write(data)
+		os.replace(self.snapshotFile + ".tmp", self.snapshotFile)
+
+		sys.stderr.write("Model snapshot stored: " + self.snapshotFile + "\n")
+		sys.stderr.flush()
+
+	def pickleModel(self, host):
+		import io
+		buffer = io.BytesIO()
+		SnapshotPickler(buffer, pickle.HIGHEST_PROTOCOL, self.fileName).dump(host)
+		return buffer.getvalue()
+
+	def runsAfterStart(self):
+		# Whether the composed model has statements after the one that calls startSimulation()
+		with open(self.fileName + ".py", 'rb') as f:
+			tree = ast.parse(f.read())
+
+		started = False
+		for statement in tree.body:
+			if started:
+				return True
+			for node in ast.walk(statement):
+				if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'startSimulation':
+					started = True
+		return False
+
+	def componentsKey(self):
+		# Hash of the DEMKit components the model is built from
+		h = hashlib.sha256()
+		components = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+		for root, dirs, files in sorted(os.walk(components)):
+			for name in sorted(files):
+				if name.endswith(".py"):
+					st = os.stat(os.path.join(root, name))
+					h.update((os.path.join(root, name) + str(st.st_size) + str(st.st_mtime_ns)).encode())
+
+		return h.hexdigest()
+
+	def fileDigest(self, name):
+		try:
+			with open(name, 'rb') as f:
+				return hashlib.sha256(f.read()).hexdigest()
+		except OSError:
+			return None
\ No newline at end of file
@@ -82,31 +82,40 @@ class Persistence():
 
 	def save(self):
 		if self.watchlist != None:
-			try:
-				os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-				f = open(self.filename+'.tmp', 'wb')
-
-				data = {}
-				for var in self.watchlist:
-					try:
-						if hasattr(self.entity, var):
-							data[var] = copy.deepcopy(getattr(self.entity, var))
-						else:
-							self.host.logWarning("Could not save variable: "+var)
-					except:
-						self.host.logWarning("Could not save variable: " + var)
-
-				# Write data in the tmp file
-				pickle.dump(data, f)
-				f.close()
+			return self.write(self.snapshot())
 
-				# Now move (and overwrite) the old file to avoid corruption:
-				os.remove(self.filename)
-				os.rename(self.filename+'.tmp', self.filename)
+	# Copy of the watched variables, such that write() can be called later (e.g. from another thread)
+	def snapshot(self):
+		if self.watchlist == None:
+			return None
 
+		data = {}
+		for var in self.watchlist:
+			try:
+				if hasattr(self.entity, var):
+					data[var] = copy.deepcopy(getattr(self.entity, var))
+				else:
+					self.host.logWarning("Could not save variable: "+var)
 			except:
-				self.host.logWarning("Could not save persistence file: "+self.filename)
-				return False
+				self.host.logWarning("Could not save variable: " + var)
+		return data
+
+	def write(self, data):
+		try:
+			os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+			f = open(self.filename+'.tmp', 'wb')
+
+			# Write data in the tmp file
+			pickle.dump(data, f)
+			f.close()
+
+			# Now move (and overwrite) the old file to avoid corruption:
+			os.remove(self.filename)
+			os.rename(self.filename+'.tmp', self.filename)
+
+		except:
+			self.host.logWarning("Could not save persistence file: "+self.filename)
+			return False
 
 	def setWatchlist(self, watchlist):
 		self.watchlist = list(watchlist)
\ No newline at end of file
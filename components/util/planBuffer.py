@@ -0,0 +1,227 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Time-indexed ring buffer for the plan and realized profiles of controllers
+# Slot k of the ring holds the value of timestamp base + k*timeBase, empty slots are None.
+# Lookups are O(1), pruning advances the base timestamp without moving data and range() reads a block at once.
+# The buffer behaves like the dict {timestamp: value} it replaces, such that existing controllers keep working.
+# Timestamps that are not aligned with the timeBase are kept in a plain dict.
+# NOTE: Values are kept in a list rather than a numpy array, as controllers mostly access single intervals
+
+from collections.abc import MutableMapping
+
+class PlanBuffer(MutableMapping):
+	def __init__(self, timeBase=900, size=192, data=None):
+		self.timeBase = int(timeBase)
+
+		self.values = [None] * max(1, size)
+		self.base = None	# Timestamp of the first slot
+		self.start = 0		# Position of the first slot in the ring
+		self.length = 0		# Number of slots in use, counted from the first slot
+		self.count = 0		# Number of filled slots
+
+		self.other = {}		# Entries that are not aligned with the timeBase
+
+		if data is not None:
+			self.update(data)
+
+	def position(self, t):
+		# Position of timestamp t in the ring, or -1 if it is outside the buffer
+		if self.base is None:
+			return -1
+		k = (t - self.base) // self.timeBase
+		if k < 0 or k >= self.length or self.base + k * self.timeBase != t:
+			return -1
+		return (self.start + int(k)) % len(self.values)
+
+	def get(self, t, default=None):
+		p = self.position(t)
+		if p >= 0:
+			v = self.values[p]
+			if v is not None:
+				return v
+		if len(self.other) > 0:
+			return self.other.get(t, default)
+		return default
+
+	def __getitem__(self, t):
+		p = self.position(t)
+		if p >= 0:
+			v = self.values[p]
+			if v is not None:
+				return v
+		return self.other[t]
+
+	def __contains__(self, t):
+		p = self.position(t)
+		if p >= 0 and self.values[p] is not None:
+			return True
+		return t in self.other
+
+	def __setitem__(self, t, value):
+		if self.base is None:
+			self.base = t
+			self.start = 0
+			self.length = 0
+
+		k = (t - self.base) // self.timeBase
+		if self.base + k * self.timeBase != t:
+			self.other[t] = value
+			return
+		k = int(k)
+
+		if k < 0:
+			# Before the first slot, move the base back
+			self.resize(self.length - k, -k)
+			k = 0
+		elif k >= len(self.values):
+			self.resize(k + 1)
+
+		if len(self.other) > 0:
+			self.other.pop(t, None)
+
+		p = (self.start + k) % len(self.values)
+		if self.values[p] is None:
+			self.count += 1
+		self.values[p] = value
+		if k >= self.length:
+			self.length = k + 1
+
+	def __delitem__(self, t):
+		p = self.position(t)
+		if p >= 0 and self.values[p] is not None:
+			self.values[p] = None
+			self.count -= 1
+			if t == self.base:
+				self.advance(1)
+		else:
+			del self.other[t]
+
+	def __iter__(self):
+		for k in range(0, self.length):
+			if self.values[(self.start + k) % len(self.values)] is not None:
+				yield self.base + k * self.timeBase
+		for t in list(self.other.keys()):
+			yield t
+
+	def __len__(self):
+		return self.count + len(self.other)
+
+	def __repr__(self):
+		return "PlanBuffer(" + repr(dict(self.items())) + ")"
+
+	def clear(self):
+		self.values = [None] * len(self.values)
+		self.base = None
+		self.start = 0
+		self.length = 0
+		self.count = 0
+		self.other.clear()
+
+	def prune(self, time):
+		# Removes all entries up to and including time by advancing the base
+		if self.base is not None and time >= self.base:
+			n = min(self.length, int((time - self.base) // self.timeBase) + 1)
+			for k in range(0, n):
+				p = (self.start + k) % len(self.values)
+				if self.values[p] is not None:
+					self.values[p] = None
+					self.count -= 1
+			self.advance(n)
+
+		if len(self.other) > 0:
+			for t in [t for t in self.other if t <= time]:
+				del self.other[t]
+
+	def range(self, time, n, default=0j):
+		# Returns the values of n consecutive intervals starting at time as a list, missing entries are default
+		if self.base is None or (time - self.base) % self.timeBase != 0:
+			return [self.get(time + i * self.timeBase, default) for i in range(0, n)]
+
+		k = int((time - self.base) // self.timeBase)
+		result = [default] * n
+		lo = max(0, -k)
+		hi = min(n, self.length - k)
+		if lo < hi:
+			result[lo:hi] = self.window(self.start + k + lo, hi - lo)
+			if self.count < self.length:
+				result[lo:hi] = [default if v is None else v for v in result[lo:hi]]
+
+		if len(self.other) > 0:
+			for i in range(0, n):
+				if time + i * self.timeBase in self.other:
+					result[i] = self.other[time + i * self.timeBase]
+		return result
+
+	def setRange(self, time, values):
+		# Stores consecutive values starting at time with slice assignments
+		values = list(values)
+		n = len(values)
+		if n == 0:
+			return
+		if self.base is None or (time - self.base) % self.timeBase != 0 or len(self.other) > 0 or None in values:
+			for i in range(0, n):
+				self[time + i * self.timeBase] = values[i]
+			return
+
+		k = int((time - self.base) // self.timeBase)
+		if k < 0:
+			self.resize(self.length - k, -k)
+			k = 0
+		if k + n > len(self.values):
+			self.resize(k + n)
+
+		size = len(self.values)
+		p = (self.start + k) % size
+		first = min(n, size - p)
+		self.count += self.window(p, n).count(None)
+		self.values[p:p + first] = values[0:first]
+		self.values[0:n - first] = values[first:n]
+		self.length = max(self.length, k + n)
+
+# Internal functions
+	def window(self, p, n):
+		# List of n slots starting at position p of the ring
+		size = len(self.values)
+		p = p % size
+		if p + n <= size:
+			return self.values[p:p + n]
+		return self.values[p:] + self.values[0:n - (size - p)]
+
+	def advance(self, n):
+		# Drops n empty slots at the front, and any empty slots that follow
+		size = len(self.values)
+		while n < self.length and self.values[(self.start + n) % size] is None:
+			n += 1
+
+		self.start = (self.start + n) % size
+		self.length -= n
+		self.base += n * self.timeBase
+
+		if self.length == 0:
+			self.base = None
+			self.start = 0
+
+	def resize(self, length, shift=0):
+		# Linearizes the ring into a larger list, shift slots are inserted in front
+		size = max(len(self.values), length)
+		if size > len(self.values):
+			size = max(size, 2 * len(self.values))
+
+		values = [None] * shift + self.window(self.start, self.length)
+		self.values = values + [None] * (size - len(values))
+		self.start = 0
+		self.base -= shift * self.timeBase
+		self.length += shift
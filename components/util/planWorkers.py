@@ -0,0 +1,387 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Worker processes to plan sibling subtrees of the controller tree concurrently, used by Core.zCallParallel()
+# Every receiver of a parallel call is the root of a partition: its subtree of controllers and the entities these refer
+# to (devices, thermostats, zones, ...). Partitions are fixed by the tree and each partition is assigned to one
+# long-lived worker process when it is seen first.
+# Every call, the host process sends the state of the entities of the partition, the environments, the time and the
+# compact device state to the worker, and the worker returns the state of the entities of the partition after planning.
+# The host process remains the owner of all state.
+# Each partition draws from its own random generator, seeded from the host seed and the name of the partition. The
+# results therefore do not depend on the number of workers, and are equal whether a partition is planned by a worker
+# or in the host process. Note that they differ from plain sequential planning, which draws from the global generator.
+# State that cannot be transferred raises an exception. Locks, views on the compact device state and the attributes
+# listed in Entity.localAttributes are kept local.
+# Workers are only started if the host process runs no other threads (forking a threaded process may deadlock) and the
+# fork start method is available (Linux, macOS). Otherwise, and for subtrees with children on other hosts, partitions
+# are planned in the host process. A worker that dies or times out is discarded and its partitions are planned locally.
+# NOTE: Planning must not change environments or entities outside the partition, such changes in a worker are lost.
+
+import multiprocessing
+import os
+import io
+import pickle
+import random
+import threading
+import traceback
+
+from core.entity import Entity
+from util.reader import Reader
+from util.clientCsvReader import ClientCsvReader
+from util.deviceState import ConsumptionView, PropertiesView
+
+lockTypes = (type(threading.Lock()), type(threading.RLock()))
+
+# Attributes holding these are not transferred, each process keeps its own
+localTypes = lockTypes + (ConsumptionView, PropertiesView)
+
+class RefPickler(pickle.Pickler):
+	def __init__(self, file, host, refs):
+		pickle.Pickler.__init__(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+		self.host = host
+		self.refs = refs
+
+	def persistent_id(self, obj):
+		# Entities, the host, the compact device state and the readers that existed when the workers started are shared
+		if obj is self.host:
+			return ('host', )
+		if isinstance(obj, Entity):
+			if self.host.entityByName(obj.name) is not obj:
+				raise pickle.PicklingError("Entity " + obj.name + " is not known to the host")
+			return ('entity', obj.name)
+		if obj is self.host.deviceState and obj is not None:
+			return ('store', )
+		if id(obj) in self.refs:
+			return ('ref', id(obj))
+		if isinstance(obj, lockTypes):
+			return ('rlock',) if isinstance(obj, lockTypes[1]) else ('lock',)
+		return None
+
+class RefUnpickler(pickle.Unpickler):
+	def __init__(self, file, host, refs):
+		pickle.Unpickler.__init__(self, file)
+		self.host = host
+		self.refs = refs
+
+	def persistent_load(self, pid):
+		if pid[0] == 'host':
+			return self.host
+		if pid[0] == 'entity':
+			return self.host.entityByName(pid[1])
+		if pid[0] == 'store':
+			return self.host.deviceState
+		if pid[0] == 'ref':
+			return self.refs[pid[1]]
+		# Objects that contain a lock are copies, hence they get their own lock
+		return threading.RLock() if pid[0] == 'rlock' else threading.Lock()
+
+
+class PlanWorkers():
+	def __init__(self, host, workers=None, timeout=600):
+		self.host = host
+		self.workers = workers if workers is not None else os.cpu_count()
+		self.timeout = timeout		# Seconds to wait for a worker before planning its partitions locally
+
+		self.processes = None		# List of (process, connection), None if not started yet
+		self.partitions = {}		# Partition (name of the receiver) -> (owned entities, can be planned by a worker)
+		self.assignment = {}		# Partition -> worker index, None to plan it locally
+		self.load = []				# Size of the partitions assigned to each worker
+		self.streams = {}			# Partition -> state of its random generator
+		self.refs = {}				# Readers shared with the workers, by id
+
+		self.active = False			# True while planning a partition, nested calls are sequential
+
+	def call(self, receivers, func, args):
+		entities = [self.resolve(recv) for recv in receivers]
+		if self.active or None in entities:
+			return self.callSequential(receivers, entities, func, args)
+
+		if self.processes is None:
+			self.start()
+
+		# Assign new partitions to the least loaded worker. Partitions with remote children, or that share entities with
+		# another partition, are planned in the host process
+		parts = [self.partition(e) for e in entities]
+		for i in range(0, len(receivers)):
+			name = entities[i].name
+			if name not in self.assignment:
+				(owned, forkable) = parts[i]
+				shared = set(id(e) for k in range(0, len(receivers)) if k != i for e in parts[k][0])
+				if any(id(e) in shared for e in owned):
+					self.host.logWarning("Partition " + name + " shares entities with its siblings, planning it in the host process")
+					forkable = False
+				if not forkable or len(self.processes) == 0:
+					self.assignment[name] = None
+				else:
+					w = self.load.index(min(self.load))
+					self.assignment[name] = w
+					self.load[w] += len(owned)
+			if name not in self.streams:
+				self.streams[name] = random.Random(str(getattr(self.host, 'randomSeed', 0)) + "/" + name).getstate()
+
+		# Send the work to the workers before the local partitions are planned
+		local = []
+		running = {}
+		for i in range(0, len(receivers)):
+			w = self.assignment[entities[i].name]
+			if w is None or self.processes[w] is None:
+				local.append(i)
+			else:
+				running.setdefault(w, []).append(i)
+
+		if len(running) > 0:
+			hostState = self.hostState()
+			environments = [e for e in self.host.entities if e.type == "environment"]
+		for (w, p) in running.items():
+			owned = [e for i in p for e in parts[i][0]]
+			msg = ('plan', hostState, self.states(owned + environments), len(owned), [(entities[i].name, self.streams[entities[i].name]) for i in p], func, args)
+			self.processes[w][1].send_bytes(self.dumps(msg))
+
+		results = {}
+		for i in local:
+			results[i] = self.plan(entities[i], func, args)
+
+		for (w, p) in running.items():
+			owned = [e for i in p for e in parts[i][0]]
+			r = self.receive(w)
+			if r is None:
+				self.host.logWarning("Planning worker " + str(w) + " stopped, planning its partitions in the host process")
+				self.discard(w)
+				for i in p:
+					results[i] = self.plan(entities[i], func, args)
+			elif r[0] != 'ok':
+				raise RuntimeError("Planning worker " + str(w) + " failed:\n" + r[1])
+			else:
+				(status, values, streams, states) = r
+				for k in range(0, len(p)):
+					results[p[k]] = values[k]
+					self.streams[entities[p[k]].name] = streams[k]
+				self.apply(owned, states)
+
+		result = {}
+		for i in range(0, len(receivers)):
+			result[receivers[i]] = results[i]
+		return result
+
+	def callSequential(self, receivers, entities, func, args):
+		result = {}
+		for i in range(0, len(receivers)):
+			if entities[i] is not None:
+				result[receivers[i]] = getattr(entities[i], func)(*args)
+		return result
+
+	def plan(self, entity, func, args):
+		# Plan a partition with its own random generator
+		state = random.getstate()
+		random.setstate(self.streams[entity.name])
+		self.active = True
+		try:
+			return getattr(entity, func)(*args)
+		finally:
+			self.active = False
+			self.streams[entity.name] = random.getstate()
+			random.setstate(state)
+
+#### WORKERS
+	def start(self):
+		self.processes = []
+		if self.workers < 1 or 'fork' not in multiprocessing.get_all_start_methods():
+			return
+		if threading.active_count() > 1:
+			self.host.logWarning("Host runs other threads, planning all partitions in the host process instead of worker processes")
+			return
+
+		# Readers and the shared csv data keep their identity in the workers, as these are forked from the host process
+		for e in self.host.entities:
+			self.readers(e)
+		for server in getattr(self.host, 'csvServers', {}).values():
+			self.refs[id(server)] = server
+
+		context = multiprocessing.get_context('fork')
+		for w in range(0, self.workers):
+			(conn, workerConn) = context.Pipe()
+			proc = context.Process(target=self.work, args=(workerConn, ), name="PlanWorker-" + str(w), daemon=True)
+			proc.start()
+			workerConn.close()
+			self.processes.append((proc, conn))
+			self.load.append(0)
+
+	def stop(self):
+		if self.processes is not None:
+			for w in range(0, len(self.processes)):
+				if self.processes[w] is not None:
+					try:
+						self.processes[w][1].send_bytes(self.dumps(('stop', )))
+					except:
+						pass
+					self.discard(w)
+
+	def discard(self, w):
+		(proc, conn) = self.processes[w]
+		self.processes[w] = None
+		conn.close()
+		proc.join(1)
+		if proc.is_alive():
+			proc.terminate()
+			proc.join()
+
+	def receive(self, w):
+		conn = self.processes[w][1]
+		try:
+			if conn.poll(self.timeout):
+				return self.loads(conn.recv_bytes())
+		except (EOFError, OSError):
+			pass
+		return None
+
+	def work(self, conn):
+		# Runs in the worker process
+		self.active = True
+		self.host.writeData = False		# Logging is done by the host process
+
+		while True:
+			try:
+				msg = self.loads(conn.recv_bytes())
+			except EOFError:
+				break
+			if msg[0] == 'stop':
+				break
+
+			(cmd, hostState, states, n, partitions, func, args) = msg
+			try:
+				self.applyHostState(hostState)
+				context = [self.host.entityByName(name) for (name, data) in states]
+				self.apply(context, states)
+
+				values = []
+				streams = []
+				for (name, stream) in partitions:
+					random.setstate(stream)
+					values.append(getattr(self.host.entityByName(name), func)(*args))
+					streams.append(random.getstate())
+
+				# The entities owned by the partitions come first, followed by the environments
+				r = self.dumps(('ok', values, streams, self.states(context[0:n])))
+			except:
+				r = self.dumps(('error', traceback.format_exc()))
+			conn.send_bytes(r)
+
+		conn.close()
+		os._exit(0)
+
+#### STATE TRANSFER
+	def states(self, entities):
+		return [(e.name, self.state(e)) for e in entities]
+
+	def state(self, entity):
+		data = {k: v for (k, v) in vars(entity).items() if k not in entity.localAttributes and not isinstance(v, localTypes)}
+		try:
+			return self.dumps(data)
+		except Exception as ex:
+			# Report the attribute that cannot be transferred
+			for (k, v) in data.items():
+				try:
+					self.dumps(v)
+				except Exception as e:
+					raise pickle.PicklingError("Cannot transfer " + entity.name + "." + k + " to a planning worker: " + str(e))
+			raise
+
+	def apply(self, entities, states):
+		for k in range(0, len(entities)):
+			(name, data) = states[k]
+			assert(entities[k].name == name)
+			vars(entities[k]).update(self.loads(data))
+
+	def hostState(self):
+		store = None
+		if self.host.deviceState is not None:
+			store = self.dumps(vars(self.host.deviceState))
+		return (self.host.currentTime, self.host.previousTime, store)
+
+	def applyHostState(self, hostState):
+		(self.host.currentTime, self.host.previousTime, store) = hostState
+		if store is not None:
+			vars(self.host.deviceState).update(self.loads(store))
+
+	def dumps(self, obj):
+		f = io.BytesIO()
+		RefPickler(f, self.host, self.refs).dump(obj)
+		return f.getvalue()
+
+	def loads(self, data):
+		return RefUnpickler(io.BytesIO(data), self.host, self.refs).load()
+
+#### HELPERS
+	def readers(self, entity):
+		# Adds the readers that an entity uses, directly or per commodity, to the references
+		for value in vars(entity).values():
+			if isinstance(value, (Reader, ClientCsvReader)):
+				self.refs[id(value)] = value
+			elif isinstance(value, dict):
+				for v in value.values():
+					if isinstance(v, (Reader, ClientCsvReader)):
+						self.refs[id(v)] = v
+
+	def resolve(self, recv):
+		if isinstance(recv, str):
+			return self.host.entityByName(recv)
+		return recv
+
+	def partition(self, entity):
+		# The entities owned by the partition of a receiver: its subtree of controllers and all entities these refer to,
+		# directly or in a list or dict (e.g. devices, thermostats, zones), and whether it can be planned by a worker.
+		# Environments are shared by all partitions and the parent of the receiver is not part of its partition
+		if entity.name in self.partitions:
+			return self.partitions[entity.name]
+
+		(owned, forkable) = self.subtree(entity)
+		seen = set(id(e) for e in owned)
+		k = 0
+		while k < len(owned):
+			for (attr, value) in vars(owned[k]).items():
+				if attr == 'parent':
+					continue
+				if isinstance(value, (list, tuple)):
+					candidates = value
+				elif isinstance(value, dict):
+					candidates = value.values()
+				else:
+					candidates = [value]
+				for v in candidates:
+					if isinstance(v, Entity) and v.type != "environment" and id(v) not in seen:
+						owned.append(v)
+						seen.add(id(v))
+			k += 1
+
+		self.partitions[entity.name] = (owned, forkable)
+		return self.partitions[entity.name]
+
+	def subtree(self, entity):
+		# All local controllers in the subtree of a controller, and whether it can be planned by a worker
+		tree = [entity]
+		seen = set([id(entity)])
+		forkable = True
+		k = 0
+		while k < len(tree):
+			for child in getattr(tree[k], 'children', []):
+				e = self.resolve(child)
+				if e is None:
+					forkable = False
+				elif id(e) not in seen:
+					tree.append(e)
+					seen.add(id(e))
+			k += 1
+		return (tree, forkable)
@@ -0,0 +1,183 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Discretization of the RC (resistance-capacitance) zone models used by ZoneDev1R1C, ZoneDev2R2C and the ZoneSimulator
+# The continuous model dx/dt = A x + B u is converted into x[k+1] = Ad x[k] + Bd u[k] with a zero-order hold on the inputs
+# The exact variant uses the matrix exponential and is stable and accurate for any timeBase.
+# The explicit Euler variant (Ad = I + A dt, Bd = B dt) reproduces the original models and is only accurate for small timeBases.
+
+import numpy as np
+from scipy.linalg import expm
+
+# Discretized models are cached by their (parameters, timeBase), as these rarely change during a simulation
+discretizationCache = {}
+maxCacheSize = 100000
+
+# State space models
+# 1R1C: state [zone], inputs [ambient temperature, heat into the zone (gains and supply)]
+def stateSpace1R1C(rEnvelope, cZone):
+	A = np.array([[-1.0 / (rEnvelope * cZone)]])
+	B = np.array([[1.0 / (rEnvelope * cZone), 1.0 / cZone]])
+	return A, B
+
+# 2R2C: states [zone, floor], inputs [ambient temperature, heat into the zone (gains), heat into the floor (supply)]
+def stateSpace2R2C(rEnvelope, cZone, rFloor, cFloor):
+	A = np.array([	[-1.0 / (rEnvelope * cZone) - 1.0 / (rFloor * cZone), 	1.0 / (rFloor * cZone)],
+					[1.0 / (rFloor * cFloor), 								-1.0 / (rFloor * cFloor)] ])
+	B = np.array([	[1.0 / (rEnvelope * cZone), 	1.0 / cZone, 	0.0],
+					[0.0, 							0.0, 			1.0 / cFloor] ])
+	return A, B
+
+def discretize(A, B, timeBase, exact=True):
+	n = A.shape[0]
+	m = B.shape[1]
+
+	if not exact:
+		return np.eye(n) + A * timeBase, B * timeBase
+
+	# Zero-order hold through the matrix exponential of the augmented matrix [[A, B], [0, 0]]
+	# This avoids inverting A and gives both matrices at once
+	M = np.zeros((n + m, n + m))
+	M[:n, :n] = A
+	M[:n, n:] = B
+	E = expm(M * timeBase)
+
+	return E[:n, :n], E[:n, n:]
+
+def zone1R1C(rEnvelope, cZone, timeBase, exact=True):
+	key = ('1R1C', rEnvelope, cZone, timeBase, exact)
+	if key not in discretizationCache:
+		if len(discretizationCache) > maxCacheSize:
+			discretizationCache.clear()
+		A, B = stateSpace1R1C(rEnvelope, cZone)
+		discretizationCache[key] = discretize(A, B, timeBase, exact)
+
+	return discretizationCache[key]
+
+def zone2R2C(rEnvelope, cZone, rFloor, cFloor, timeBase, exact=True):
+	key = ('2R2C', rEnvelope, cZone, rFloor, cFloor, timeBase, exact)
+	if key not in discretizationCache:
+		if len(discretizationCache) > maxCacheSize:
+			discretizationCache.clear()
+		A, B = stateSpace2R2C(rEnvelope, cZone, rFloor, cFloor)
+		discretizationCache[key] = discretize(A, B, timeBase, exact)
+
+	return discretizationCache[key]
+
+# Demand prediction kernels
+# These simulate a zone over a horizon and determine the heat required to keep it within the setpoints.
+# All inputs are (numpy) vectors of equal length. The loop is inherently sequential, hence it is kept as tight as possible
+# by working on plain floats and local variables. Ad and Bd are obtained through zone1R1C() or zone2R2C().
+
+def predictDemand1R1C(Ad, Bd, ambientTemperature, gains, ventilationFlow, lowerSetpoints, upperSetpoints, minPower, maxPower, zoneTemperature):
+	a = float(Ad[0][0])
+	bAmbient = float(Bd[0][0])
+	bHeat = float(Bd[0][1])
+
+	ambientTemperature = np.asarray(ambientTemperature, dtype=float).tolist()
+	gains = np.asarray(gains, dtype=float).tolist()
+	ventilationFlow = np.asarray(ventilationFlow, dtype=float).tolist()
+	lowerSetpoints = np.asarray(lowerSetpoints, dtype=float).tolist()
+	upperSetpoints = np.asarray(upperSetpoints, dtype=float).tolist()
+
+	demand = [0.0] * len(gains)
+	for i in range(0, len(gains)):
+		ambient = ambientTemperature[i]
+
+		# Ventilation losses depend on the zone temperature, VentilationFlow given in M3/h
+		gain = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambient - zoneTemperature) )
+
+		# Heat that brings the zone exactly to the setpoint at the end of the interval
+		# NOTE: with the explicit Euler matrices this equals the original heat loss based approach
+		if zoneTemperature < lowerSetpoints[i]:
+			d = ( (lowerSetpoints[i] - a * zoneTemperature - bAmbient * ambient) / bHeat ) - gain
+			demand[i] = min(maxPower, max(0.0, d))
+		elif zoneTemperature > upperSetpoints[i]:
+			d = ( (upperSetpoints[i] - a * zoneTemperature - bAmbient * ambient) / bHeat ) - gain
+			demand[i] = max(minPower, min(0.0, d))
+
+		zoneTemperature = a * zoneTemperature + bAmbient * ambient + bHeat * (gain + demand[i])
+
+	return demand
+
+# With exact set, the demand brings the heat content of the zone and floor at the end of the interval, as obtained from Ad and Bd,
+# to the content at which the zone is at the setpoint and the floor covers the losses of the zone.
+# Otherwise the original heuristic is used, which assumes the explicit Euler matrices.
+def predictDemand2R2C(Ad, Bd, rEnvelope, cZone, rFloor, cFloor, timeBase, ambientTemperature, gains, ventilationFlow, lowerSetpoints, upperSetpoints, minPower, maxPower, zoneTemperature, floorTemperature, exact=False):
+	a00 = float(Ad[0][0])
+	a01 = float(Ad[0][1])
+	a10 = float(Ad[1][0])
+	a11 = float(Ad[1][1])
+	b00 = float(Bd[0][0])
+	b01 = float(Bd[0][1])
+	b02 = float(Bd[0][2])
+	b10 = float(Bd[1][0])
+	b11 = float(Bd[1][1])
+	b12 = float(Bd[1][2])
+
+	capacity = (cZone + cFloor) / timeBase
+	floorCapacity = cFloor / timeBase
+	bDemand = cZone * b02 + cFloor * b12
+
+	ambientTemperature = np.asarray(ambientTemperature, dtype=float).tolist()
+	gains = np.asarray(gains, dtype=float).tolist()
+	ventilationFlow = np.asarray(ventilationFlow, dtype=float).tolist()
+	lowerSetpoints = np.asarray(lowerSetpoints, dtype=float).tolist()
+	upperSetpoints = np.asarray(upperSetpoints, dtype=float).tolist()
+
+	demand = [0.0] * len(gains)
+	for i in range(0, len(gains)):
+		ambient = ambientTemperature[i]
+
+		# Ventilation losses depend on the zone temperature, VentilationFlow given in M3/h
+		gain = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambient - zoneTemperature) )
+
+		if exact:
+			if zoneTemperature < lowerSetpoints[i] or zoneTemperature > upperSetpoints[i]:
+				# Heat content of the zone and floor at the end of the interval without any demand
+				heat = 	cZone * (a00 * zoneTemperature + a01 * floorTemperature + b00 * ambient + b01 * gain) + \
+						cFloor * (a10 * zoneTemperature + a11 * floorTemperature + b10 * ambient + b11 * gain)
+				if zoneTemperature < lowerSetpoints[i]:
+					setpoint = lowerSetpoints[i]
+				else:
+					setpoint = upperSetpoints[i]
+				floorSetpoint = setpoint + rFloor * ( ( (setpoint - ambient) / rEnvelope ) - gain )
+				d = ( cZone * setpoint + cFloor * floorSetpoint - heat ) / bDemand
+				if zoneTemperature < lowerSetpoints[i]:
+					demand[i] = min(maxPower, max(0.0, d))
+				else:
+					demand[i] = max(minPower, min(0.0, d))
+
+			d = demand[i]
+			zoneTemperature, floorTemperature = 	a00 * zoneTemperature + a01 * floorTemperature + b00 * ambient + b01 * gain + b02 * d, \
+													a10 * zoneTemperature + a11 * floorTemperature + b10 * ambient + b11 * gain + b12 * d
+			continue
+
+		# Calculate the loss in heat energy
+		heatLoss = ( (ambient - zoneTemperature) / rEnvelope ) + gain
+
+		# Calculate how much heat we should add/subtract, considering the capacity of both the zone and floor
+		if zoneTemperature < lowerSetpoints[i]:
+			heatLoss -= (floorTemperature - zoneTemperature) * floorCapacity
+			demand[i] = min(maxPower, max(0.0, ( (lowerSetpoints[i] - zoneTemperature) * capacity ) - heatLoss ) )
+		elif zoneTemperature > upperSetpoints[i]:
+			heatLoss += (floorTemperature - zoneTemperature) * floorCapacity
+			demand[i] = max(minPower, min(0.0, ( (upperSetpoints[i] - zoneTemperature) * capacity ) - heatLoss ) )
+
+		d = demand[i]
+		zoneTemperature, floorTemperature = 	a00 * zoneTemperature + a01 * floorTemperature + b00 * ambient + b01 * gain + b02 * d, \
+												a10 * zoneTemperature + a11 * floorTemperature + b10 * ambient + b11 * gain + b12 * d
+
+	return demand
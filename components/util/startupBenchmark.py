@@ -0,0 +1,50 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Benchmark of the import and start-up time of DEMKit, but not a unit test!
+# Each measurement runs in a fresh interpreter. Run from the components folder with the conf folder on the PYTHONPATH
+
+import os
+import subprocess
+import sys
+
+runs = 5
+
+def measure(code):
+	# Returns the best wall time in seconds, as printed by the code
+	best = None
+	env = dict(os.environ)
+	env['PYTHONPATH'] = os.pathsep.join(sys.path)
+	for i in range(0, runs):
+		out = subprocess.run([sys.executable, '-c', "import time\nt = time.time()\n" + code + "\nprint(time.time() - t)"],
+							 capture_output=True, text=True, env=env)
+		if out.returncode != 0:
+			print(out.stderr)
+			return None
+		t = float(out.stdout.strip().split("\n")[-1])
+		best = t if best is None else min(best, t)
+	return best
+
+cases = [
+	("import core.core (lazy components)", "import core.core"),
+	("import core.core + all components", "import core.core\nimport core.components\nfor n in core.components.components: getattr(core.components, n)"),
+	("import SimHost", "from hosts.simHost import SimHost"),
+	("SimHost with 10 hosts created", "from hosts.simHost import SimHost\nfor i in range(0, 10): SimHost('host' + str(i))"),
+	("simple model: SimHost, SunEnv, LoadDev", "import core.components as c\nfrom hosts.simHost import SimHost\nh = SimHost('host')\nc.SunEnv('sun', h)\nc.LoadDev('load', h)"),
+]
+
+for (name, code) in cases:
+	t = measure(code)
+	print("%-45s %s" % (name, "failed" if t is None else "%.3f s" % t))
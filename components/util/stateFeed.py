@@ -0,0 +1,233 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Publish/subscribe feed of state changes of a running host
+# Clients subscribe to patterns "entity/variable" (wildcards allowed, e.g. "pv*/consumption" or "*/soc").
+# After each tick, the host publishes the values that changed since they were last sent to a subscription.
+# Updates are coalesced per subscription, only the latest value of a variable is kept, in a bounded buffer,
+# and delivered at most once per minInterval seconds. Slow clients hence never slow down the host.
+# The feed is served as Server-Sent Events (SSE), by serve() or by the /feed route of the REST API.
+# Enable with host.stateFeedPort = <port> or use host.getStateFeed() directly.
+
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import threading
+import time as tm
+
+class Subscription():
+	def __init__(self, feed, patterns, minInterval=0.5, maxBuffer=1000):
+		self.feed = feed
+		self.patterns = list(patterns)
+		self.minInterval = minInterval		# Seconds between deliveries
+		self.maxBuffer = maxBuffer			# Maximum number of pending variables
+
+		self.pending = OrderedDict()		# "entity/var" -> value, latest value only
+		self.last = {}						# Last delivered values, to detect changes
+		self.time = None					# Host time of the latest update
+		self.lastDelivery = 0.0
+		self.dropped = 0
+		self.closed = False
+
+		self.targets = []					# Resolved (entity, key, var), see StateFeed.resolve()
+		self.targetsValid = False
+
+		self.condition = threading.Condition()
+
+	def offer(self, key, value, time):
+		with self.condition:
+			if key in self.pending:
+				self.pending[key] = value
+			else:
+				if len(self.pending) >= self.maxBuffer:
+					self.pending.popitem(last=False)
+					self.dropped += 1
+				self.pending[key] = value
+			self.time = time
+			self.condition.notify()
+
+	def get(self, timeout=None):
+		# Blocks until updates are available and the rate limit allows delivery
+		# Returns a dict {'time': host time, 'values': {key: value}}, or None on a timeout or when closed
+		deadline = None if timeout is None else tm.time() + timeout
+		with self.condition:
+			while not self.closed:
+				wait = None if deadline is None else deadline - tm.time()
+				if len(self.pending) > 0:
+					wait = self.lastDelivery + self.minInterval - tm.time()
+					if wait <= 0:
+						values = dict(self.pending)
+						self.pending.clear()
+						self.lastDelivery = tm.time()
+						return {'time': self.time, 'values': values}
+					if deadline is not None:
+						wait = min(wait, deadline - tm.time())
+
+				if wait is not None and wait <= 0:
+					return None
+				self.condition.wait(wait)
+
+		return None
+
+	def matches(self, entity, var):
+		key = entity + "/" + var
+		for p in self.patterns:
+			if fnmatchcase(key, p):
+				return True
+		return False
+
+	def close(self):
+		self.feed.unsubscribe(self)
+		with self.condition:
+			self.closed = True
+			self.condition.notify_all()
+
+
+class StateFeed():
+	def __init__(self, host):
+		self.host = host
+
+		self.subscriptions = []
+		self.lock = threading.Lock()
+		self.entityCount = -1
+
+		self.server = None
+		self.keepAlive = 15.0	# Seconds between SSE comments on idle connections
+
+	def subscribe(self, patterns, minInterval=0.5, maxBuffer=1000):
+		if isinstance(patterns, str):
+			patterns = patterns.split(',')
+
+		sub = Subscription(self, patterns, minInterval, maxBuffer)
+		self.lock.acquire()
+		self.subscriptions.append(sub)
+		self.lock.release()
+		return sub
+
+	def unsubscribe(self, sub):
+		self.lock.acquire()
+		if sub in self.subscriptions:
+			self.subscriptions.remove(sub)
+		self.lock.release()
+
+	def publish(self, time):
+		# Called by the host after each tick
+		self.lock.acquire()
+		subscriptions = list(self.subscriptions)
+		self.lock.release()
+		if len(subscriptions) == 0:
+			return
+
+		if len(self.host.entities) != self.entityCount:
+			# Entities were added or removed
+			self.entityCount = len(self.host.entities)
+			for sub in subscriptions:
+				sub.targetsValid = False
+
+		# Each variable is read and converted only once, even when many clients subscribed to it
+		values = {}
+		for sub in subscriptions:
+			if not sub.targetsValid:
+				self.resolve(sub)
+
+			for (entity, key, var) in sub.targets:
+				if key not in values:
+					try:
+						values[key] = self.host.jsonValue(getattr(entity, var))
+					except:
+						values[key] = None
+
+				value = values[key]
+				if key not in sub.last or sub.last[key] != value:
+					sub.last[key] = value
+					sub.offer(key, value, time)
+
+	def resolve(self, sub):
+		targets = []
+		for e in [self.host] + list(self.host.entities):
+			for var in self.variables(e, sub.patterns):
+				if sub.matches(e.name, var):
+					targets.append((e, e.name + "/" + var, var))
+		sub.targets = targets
+		sub.targetsValid = True
+
+	def variables(self, entity, patterns):
+		# Candidate variables of the entity, avoids going through all attributes for explicit variable names
+		names = set()
+		for p in patterns:
+			var = p.split("/", 1)[-1]
+			if any(c in var for c in "*?["):
+				return [k for k in vars(entity).keys() if not k.startswith("_")]
+			names.add(var)
+		return [v for v in names if hasattr(entity, v)]
+
+	# SSE server
+	def serve(self, port, address='0.0.0.0'):
+		feed = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				url = urlparse(self.path)
+				if url.path != '/feed':
+					self.send_error(404)
+					return
+
+				params = parse_qs(url.query)
+				sub = feed.subscribe(params.get('patterns', ['*/*'])[0], float(params.get('interval', [0.5])[0]), int(params.get('buffer', [1000])[0]))
+
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/event-stream')
+				self.send_header('Cache-Control', 'no-cache')
+				self.end_headers()
+
+				try:
+					for chunk in feed.stream(sub):
+						self.wfile.write(chunk.encode('utf-8'))
+						self.wfile.flush()
+				except Exception:
+					pass	# Client disconnected
+				finally:
+					sub.close()
+
+			def log_message(self, format, *args):
+				pass
+
+		self.server = ThreadingHTTPServer((address, port), Handler)
+		self.server.daemon_threads = True
+		threading.Thread(target=self.server.serve_forever, name="StateFeed", daemon=True).start()
+		return self.server.server_address[1]
+
+	def stream(self, sub):
+		# Generator of SSE messages for a subscription, starts with a comment such that the headers are sent directly
+		yield ": subscribed\n\n"
+		while not sub.closed:
+			update = sub.get(self.keepAlive)
+			if update is None:
+				yield ": keep-alive\n\n"
+			else:
+				yield "event: state\ndata: " + json.dumps(update) + "\n\n"
+
+	def stop(self):
+		self.lock.acquire()
+		subscriptions = list(self.subscriptions)
+		self.lock.release()
+		for sub in subscriptions:
+			sub.close()
+
+		if self.server is not None:
+			self.server.shutdown()
+			self.server = None
@@ -0,0 +1,82 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Small test of the StateFeed with a local SSE client, but not a unit test!
+# Run from the components folder with the components folder on the PYTHONPATH
+
+import http.client
+import json
+import threading
+import time
+
+from util.stateFeed import StateFeed
+
+# Minimal stand-in for a host with a few entities
+class Entity():
+	def __init__(self, name):
+		self.name = name
+		self.consumption = 0.0
+		self.soc = 0.0
+
+class Host():
+	def __init__(self):
+		self.name = "host"
+		self.entities = [Entity("dev" + str(i)) for i in range(0, 100)]
+
+	def jsonValue(self, value):
+		return value
+
+host = Host()
+feed = StateFeed(host)
+port = feed.serve(0, '127.0.0.1')
+
+received = []
+def client():
+	conn = http.client.HTTPConnection('127.0.0.1', port)
+	conn.request('GET', '/feed?patterns=dev1*/consumption,dev5/soc&interval=0.2')
+	r = conn.getresponse()
+	while True:
+		line = r.readline().decode()
+		if line.startswith('data: '):
+			received.append((time.time(), json.loads(line[6:])))
+
+threading.Thread(target=client, daemon=True).start()
+while len(feed.subscriptions) == 0:
+	time.sleep(0.01)
+
+# Simulate 100 fast ticks of 10ms
+start = time.time()
+ticks = 100
+for t in range(0, ticks):
+	for e in host.entities:
+		e.consumption = float(t)
+	host.entities[5].soc = float(t // 50)
+	feed.publish(t)
+	time.sleep(0.01)
+duration = time.time() - start
+time.sleep(0.5)
+
+print("Ticks:", ticks, "in", round(duration, 2), "s, messages received:", len(received))
+for (t, msg) in received:
+	print("  time", msg['time'], "variables", len(msg['values']))
+
+# Coalesced: at most one message per interval, containing only subscribed variables
+assert(len(received) <= duration / 0.2 + 2)
+assert(all(set(msg['values'].keys()) <= set(["dev1/consumption"] + ["dev1" + str(i) + "/consumption" for i in range(0, 10)] + ["dev5/soc"]) for (t, msg) in received))
+# The latest values arrive
+assert(received[-1][1]['values']["dev1/consumption"] == float(ticks - 1))
+print("Feed delivers coalesced updates")
+
+feed.stop()